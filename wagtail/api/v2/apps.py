@@ -18,3 +18,11 @@ class WagtailAPIV2AppConfig(AppConfig):
                 register_signal_handlers()
             else:
                 raise ImproperlyConfigured("The setting 'WAGTAILAPI_USE_FRONTENDCACHE' is True but 'wagtail.contrib.wagtailfrontendcache' is not in INSTALLED_APPS.")
+
+        # Install signal handlers to keep track of the content versions used for ETags
+        # and response caching
+        from wagtail.api.v2.response_cache import get_response_cache
+        from wagtail.api.v2.versions import conditional_requests_enabled
+        if conditional_requests_enabled() or get_response_cache() is not None:
+            from wagtail.api.v2.signal_handlers import register_content_version_signal_handlers
+            register_content_version_signal_handlers()
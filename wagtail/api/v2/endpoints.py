@@ -1,27 +1,43 @@
 from __future__ import absolute_import, unicode_literals
 
+import hashlib
+import time
 from collections import OrderedDict
+from functools import partial
 
 from django.apps import apps
 from django.conf.urls import url
 from django.core.exceptions import FieldDoesNotExist
 from django.core.urlresolvers import reverse
 from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.encoding import force_bytes
+from django.utils.http import http_date, quote_etag
+from django.utils.lru_cache import lru_cache
 from modelcluster.fields import ParentalKey
 from rest_framework import status
 from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
-from wagtail.wagtailcore.models import Page
+from wagtail.wagtailcore.models import Page, PageViewRestriction, Site, get_page_models
 
 from .filters import (
     FieldsFilter, OrderingFilter, RestrictedChildOfFilter, RestrictedDescendantOfFilter,
     SearchFilter)
 from .pagination import WagtailPagination
-from .serializers import BaseSerializer, PageSerializer, get_serializer_class
+from .response_cache import (
+    cache_response, get_cached_response, get_response_cache, get_response_cache_key)
+from .serializers import BaseSerializer, PageSerializer, get_related_lookups, get_serializer_class
 from .utils import (
-    BadRequestError, filter_page_type, page_models_from_string, parse_fields_parameter)
+    BadRequestError, filter_page_type, freeze_fields_config, page_models_from_string,
+    pages_for_site, parse_fields_parameter)
+from .versions import conditional_requests_enabled, get_content_versions
+
+# The maximum number of serializer classes to keep. A class is made for each combination
+# of endpoint, model and fields parameter that is requested, so the number kept is
+# limited to stop requests with many different fields parameters from using up memory
+SERIALIZER_CLASS_CACHE_SIZE = 1000
 
 
 class BaseAPIEndpoint(GenericViewSet):
@@ -35,12 +51,17 @@ class BaseAPIEndpoint(GenericViewSet):
 
     pagination_class = WagtailPagination
     base_serializer_class = BaseSerializer
+
+    # Set to True to store responses in the cache configured by WAGTAILAPI_RESPONSE_CACHE
+    cache_responses = False
     filter_backends = []
     model = None  # Set on subclass
 
     known_query_parameters = frozenset([
         'limit',
         'offset',
+        'cursor',
+        'count',
         'fields',
         'order',
         'search',
@@ -72,18 +93,144 @@ class BaseAPIEndpoint(GenericViewSet):
         return self.model.objects.all().order_by('id')
 
     def listing_view(self, request):
+        not_modified_response = self.get_not_modified_response(request)
+        if not_modified_response is not None:
+            return not_modified_response
+
+        cached_response = self.get_cached_response(request)
+        if cached_response is not None:
+            return cached_response
+
         queryset = self.get_queryset()
         self.check_query_parameters(queryset)
+        queryset = self.optimize_queryset(queryset)
         queryset = self.filter_queryset(queryset)
         queryset = self.paginate_queryset(queryset)
-        serializer = self.get_serializer(queryset, many=True)
+        objects = self.prefetch_objects(queryset)
+        serializer = self.get_serializer(objects, many=True)
         return self.get_paginated_response(serializer.data)
 
     def detail_view(self, request, pk):
+        not_modified_response = self.get_not_modified_response(request)
+        if not_modified_response is not None:
+            return not_modified_response
+
+        cached_response = self.get_cached_response(request)
+        if cached_response is not None:
+            return cached_response
+
         instance = self.get_object()
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
+    @classmethod
+    def get_content_version_models(cls, router):
+        """
+        Returns the models that this endpoint's responses are made from. The ETags
+        and cache keys of the responses change whenever an object of one of these
+        models changes.
+        """
+        return cls.get_field_models(router, cls.model)
+
+    def get_content_versions(self):
+        if not hasattr(self, '_content_versions'):
+            self._content_versions = get_content_versions(self.get_content_version_models(self.request.wagtailapi_router))
+
+        return self._content_versions
+
+    def get_not_modified_response(self, request):
+        """
+        Works out the ETag and last modified time of the response, and returns a
+        304 (not modified) response if the client already has an up to date copy
+        of it, before any of the response is made.
+        """
+        self.etag = self.last_modified = None
+
+        if not conditional_requests_enabled():
+            return
+
+        versions = self.get_content_versions()
+        if versions is None:
+            return
+
+        self.etag = hashlib.sha1(force_bytes(repr((
+            request.build_absolute_uri(),
+            request.accepted_media_type,
+            versions,
+        )))).hexdigest()
+
+        # Last-Modified only has whole seconds, so it wouldn't change if the content
+        # changed again within the second of the last change. Leave it out until that
+        # second has passed, so that clients rely on the ETag until then
+        newest_version = max(versions)
+        if time.time() >= int(newest_version) + 1:
+            self.last_modified = int(newest_version)
+
+        return get_conditional_response(request, etag=self.etag, last_modified=self.last_modified)
+
+    def get_cached_response(self, request):
+        """
+        Returns the response from the response cache, if it's there. Otherwise, the
+        response is stored in the cache once it has been made.
+        """
+        self.response_cache_key = None
+
+        if not self.cache_responses or get_response_cache() is None:
+            return
+
+        # Only JSON is cached, as the browsable API's pages are made for each user.
+        # Randomly ordered listings are meant to change each time
+        if request.accepted_renderer.format != 'json' or request.GET.get('order') == 'random':
+            return
+
+        versions = self.get_content_versions()
+        if versions is None:
+            return
+
+        key = get_response_cache_key(request, versions)
+        cached_response = get_cached_response(key)
+        if cached_response is None:
+            self.response_cache_key = key
+
+        return cached_response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super(BaseAPIEndpoint, self).finalize_response(request, response, *args, **kwargs)
+
+        if getattr(self, 'etag', None) is not None and response.status_code in (200, 304):
+            response['ETag'] = quote_etag(self.etag)
+            if self.last_modified is not None:
+                response['Last-Modified'] = http_date(self.last_modified)
+
+        if getattr(self, 'response_cache_key', None) is not None and response.status_code == 200:
+            response.add_post_render_callback(partial(cache_response, self.response_cache_key))
+
+        return response
+
+    def optimize_queryset(self, queryset):
+        """
+        Adds select_related and prefetch_related lookups to the listing queryset for
+        the related objects used by the requested fields, so that they are fetched
+        for all of the objects in a listing at once.
+        """
+        select_related, prefetch_related = get_related_lookups(self.get_serializer_class())
+
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+
+        return queryset
+
+    def prefetch_objects(self, objects):
+        """
+        Called with the objects in a page of listing results before they are
+        serialized. Endpoints can override this to fetch anything else that the
+        requested fields need for all of the objects at once.
+        """
+        return objects
+
     def handle_exception(self, exc):
         if isinstance(exc, Http404):
             data = {'message': str(exc)}
@@ -157,6 +304,54 @@ class BaseAPIEndpoint(GenericViewSet):
     def get_nested_default_fields(cls, model):
         return cls.nested_default_fields[:]
 
+    @classmethod
+    def get_field_models(cls, router, model):
+        """
+        Returns the given model and all of the models that the API fields of its
+        objects can be read from, following relations to the fields of the related
+        objects.
+        """
+        return _get_cached_field_models(cls, router, model)
+
+    @classmethod
+    def _find_field_models(cls, router, model, models):
+        if model in models:
+            return
+
+        models.add(model)
+
+        relations = []
+        for field_name in cls.get_available_fields(model):
+            try:
+                field = model._meta.get_field(field_name)
+            except FieldDoesNotExist:
+                if field_name not in cls.body_fields and field_name not in cls.meta_fields:
+                    # Properties and methods may read any of the model's own relations
+                    parent_links = set(model._meta.parents.values())
+                    relations.extend(
+                        field for field in model._meta.local_fields + model._meta.local_many_to_many
+                        if field.is_relation and field not in parent_links
+                    )
+                continue
+
+            if field.is_relation:
+                relations.append(field)
+
+        for field in relations:
+            related_model = field.related_model
+            if related_model is None:
+                # Generic foreign keys can point at anything
+                continue
+
+            # Objects linking tags to the model are saved without saving the model
+            through = getattr(field, 'through', None)
+            if through is not None:
+                models.add(through)
+
+            endpoint_class = router.get_model_endpoint(related_model)
+            endpoint_class = endpoint_class[1] if endpoint_class else BaseAPIEndpoint
+            endpoint_class._find_field_models(router, related_model, models)
+
     def check_query_parameters(self, queryset):
         """
         Ensure that only valid query paramters are included in the URL.
@@ -171,6 +366,17 @@ class BaseAPIEndpoint(GenericViewSet):
 
     @classmethod
     def _get_serializer_class(cls, router, model, fields_config, show_details=False, nested=False):
+        """
+        Returns the serializer class for the given model and fields configuration (as
+        returned by parse_fields_parameter). Classes are only built the first time
+        they are needed.
+        """
+        return _get_cached_serializer_class(
+            cls, router, model, freeze_fields_config(fields_config), show_details, nested
+        )
+
+    @classmethod
+    def _build_serializer_class(cls, router, model, fields_config, show_details=False, nested=False):
         # Get all available fields
         body_fields = cls.get_body_fields(model)
         meta_fields = cls.get_meta_fields(model)
@@ -330,6 +536,20 @@ class BaseAPIEndpoint(GenericViewSet):
         return reverse(url_name, args=(pk, ))
 
 
+@lru_cache(maxsize=None)
+def _get_cached_field_models(endpoint_class, router, model):
+    models = set()
+    endpoint_class._find_field_models(router, model, models)
+    return frozenset(models)
+
+
+@lru_cache(maxsize=SERIALIZER_CLASS_CACHE_SIZE)
+def _get_cached_serializer_class(endpoint_class, router, model, fields_config, show_details, nested):
+    return endpoint_class._build_serializer_class(
+        router, model, fields_config, show_details=show_details, nested=nested
+    )
+
+
 class PagesAPIEndpoint(BaseAPIEndpoint):
     base_serializer_class = PageSerializer
     filter_backends = [
@@ -368,6 +588,7 @@ class PagesAPIEndpoint(BaseAPIEndpoint):
     detail_only_fields = ['parent']
     name = 'pages'
     model = Page
+    cache_responses = True
 
     def get_queryset(self):
         request = self.request
@@ -397,6 +618,40 @@ class PagesAPIEndpoint(BaseAPIEndpoint):
 
         return queryset
 
+    @classmethod
+    def get_content_version_models(cls, router):
+        # Only public pages are served, and their URLs depend on the sites. Any type of
+        # page can be serialised by the detail view
+        models = {PageViewRestriction, Site}
+        for model in [Page] + get_page_models():
+            models.update(cls.get_field_models(router, model))
+
+        return models
+
+    def prefetch_objects(self, pages):
+        pages = list(pages)
+
+        if 'parent' in self.get_serializer_class().Meta.fields:
+            # Find the parents of all the pages, and which of them can be shown
+            parent_paths = set(page.path[:-page.steplen] for page in pages if page.depth > 1)
+            parents = {
+                parent.path: parent
+                for parent in Page.objects.filter(path__in=parent_paths)
+            }
+            visible_parent_ids = set(
+                pages_for_site(self.request.site)
+                .filter(path__in=parent_paths).values_list('id', flat=True)
+            )
+
+            for page in pages:
+                parent = parents.get(page.path[:-page.steplen])
+                if parent is not None and parent.id not in visible_parent_ids:
+                    parent = None
+
+                page._wagtailapi_parent = parent
+
+        return pages
+
     def get_object(self):
         base = super(PagesAPIEndpoint, self).get_object()
         return base.specific
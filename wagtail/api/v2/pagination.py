@@ -1,12 +1,35 @@
 from __future__ import absolute_import, unicode_literals
 
+import base64
+import binascii
+import json
 from collections import OrderedDict
 
 from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q, QuerySet
+from django.utils import six
+from django.utils.encoding import force_bytes, force_text
 from rest_framework.pagination import BasePagination
 from rest_framework.response import Response
 
-from .utils import BadRequestError
+from .utils import BadRequestError, parse_boolean
+
+
+def encode_cursor(values):
+    return force_text(base64.urlsafe_b64encode(force_bytes(json.dumps(values))))
+
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(force_text(base64.urlsafe_b64decode(force_bytes(cursor))))
+    except (TypeError, ValueError, binascii.Error):
+        raise BadRequestError("cursor is not valid")
+
+    if not isinstance(values, list) or len(values) != 2:
+        raise BadRequestError("cursor is not valid")
+
+    return values
 
 
 class WagtailPagination(BasePagination):
@@ -29,18 +52,123 @@ class WagtailPagination(BasePagination):
         except (ValueError, AssertionError):
             raise BadRequestError("limit must be a positive integer")
 
+        try:
+            count = parse_boolean(request.GET.get('count', 'true'))
+        except ValueError:
+            raise BadRequestError("count must be either true or false")
+
+        self.view = view
+        self.total_count = queryset.count() if count else None
+
+        if 'cursor' in request.GET:
+            if 'offset' in request.GET:
+                raise BadRequestError("offset cannot be used with cursor")
+
+            return self.paginate_queryset_by_cursor(queryset, request.GET['cursor'], limit)
+
         start = offset
         stop = offset + limit
 
-        self.view = view
-        self.total_count = queryset.count()
         return queryset[start:stop]
 
+    def get_cursor_ordering(self, queryset):
+        """
+        Returns the field that the queryset is ordered by, and whether it's in
+        descending order.
+        """
+        if not isinstance(queryset, QuerySet):
+            raise BadRequestError("cursor cannot be used with search")
+
+        order_by = list(queryset.query.order_by or queryset.model._meta.ordering or ['pk'])
+        if len(order_by) != 1 or not isinstance(order_by[0], six.string_types) or order_by[0] == '?':
+            raise BadRequestError("cursor cannot be used with this ordering")
+
+        field_name = order_by[0]
+        descending = field_name.startswith('-')
+        if descending:
+            field_name = field_name[1:]
+
+        if not queryset.query.standard_ordering:
+            descending = not descending
+
+        if field_name == 'pk':
+            field = queryset.model._meta.pk
+        else:
+            try:
+                field = queryset.model._meta.get_field(field_name)
+            except FieldDoesNotExist:
+                raise BadRequestError("cursor cannot be used with this ordering")
+
+        # Keys must be comparable, and NULLs are sorted differently by each database
+        if not field.primary_key and (not field.concrete or field.is_relation or field.null):
+            raise BadRequestError("cursor cannot be used when ordering by '%s'" % field_name)
+
+        return field, descending
+
+    def paginate_queryset_by_cursor(self, queryset, cursor, limit):
+        """
+        Returns the `limit` results that come after the given cursor (or the first
+        results if the cursor is empty).
+
+        Results are ordered by the field they were ordered by and then by primary key,
+        so each cursor holds the values of both of these for the last result it
+        follows. Finding the next results is then an indexed lookup, rather than a
+        scan through all of the results that came before them.
+        """
+        field, descending = self.get_cursor_ordering(queryset)
+        field_name = 'pk' if field.primary_key else field.name
+        pk_field = queryset.model._meta.pk
+        prefix = '-' if descending else ''
+        lookup = 'lt' if descending else 'gt'
+
+        queryset = queryset.order_by(prefix + field_name, prefix + 'pk')
+        if not queryset.query.standard_ordering:
+            queryset = queryset.reverse()
+
+        if cursor:
+            value, pk = decode_cursor(cursor)
+
+            try:
+                value = field.to_python(value)
+                pk = pk_field.to_python(pk)
+            except ValidationError:
+                raise BadRequestError("cursor is not valid")
+
+            queryset = queryset.filter(
+                Q(**{field_name + '__' + lookup: value}) |
+                Q(**{field_name: value, 'pk__' + lookup: pk})
+            )
+
+        if limit == 0:
+            self.next_cursor = None
+            return []
+
+        # Fetch one extra result to find out if there are any more
+        results = list(queryset[:limit + 1])
+
+        if len(results) > limit:
+            results = results[:limit]
+            last_result = results[-1]
+            self.next_cursor = encode_cursor([
+                field.value_to_string(last_result),
+                pk_field.value_to_string(last_result),
+            ])
+        else:
+            self.next_cursor = None
+
+        return results
+
     def get_paginated_response(self, data):
+        meta = OrderedDict()
+
+        if self.total_count is not None:
+            meta['total_count'] = self.total_count
+
+        if hasattr(self, 'next_cursor'):
+            meta['next_cursor'] = self.next_cursor
+
         data = OrderedDict([
-            ('meta', OrderedDict([
-                ('total_count', self.total_count),
-            ])),
+            ('meta', meta),
             ('items', data),
         ])
         return Response(data)
@@ -0,0 +1,77 @@
+"""
+An optional cache for API responses.
+
+When the WAGTAILAPI_RESPONSE_CACHE setting names a cache alias, the rendered JSON of
+the responses of the pages, images and documents endpoints is stored in that cache,
+so that popular listings and objects don't need to be fetched from the database and
+serialized again. Keys are made from the URL of the request (with its parameters in a
+normalised order), the hostname it was made to and the content versions (see
+wagtail.api.v2.versions) of the models that the endpoint reads from, so a stored
+response stops being used once objects of those models are saved or deleted.
+Changes that the versions don't notice are served from the cache until the
+response expires.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.http import HttpResponse
+from django.utils.encoding import force_bytes
+
+# Parameters that don't change the response
+IGNORED_QUERY_PARAMETERS = frozenset([
+    # Used by jQuery for cache-busting
+    '_',
+])
+
+
+def get_response_cache():
+    """
+    Returns the cache configured by WAGTAILAPI_RESPONSE_CACHE, or None if response
+    caching is disabled.
+    """
+    alias = getattr(settings, 'WAGTAILAPI_RESPONSE_CACHE', None)
+    if alias is None:
+        return None
+    return caches[alias]
+
+
+def get_response_cache_key(request, versions):
+    query = sorted(
+        (name, values) for name, values in request.GET.lists()
+        if name not in IGNORED_QUERY_PARAMETERS
+    )
+
+    description = repr((
+        request.build_absolute_uri(request.path),
+        query,
+        request.accepted_media_type,
+        versions,
+    ))
+    digest = hashlib.sha1(force_bytes(description)).hexdigest()
+
+    return 'wagtailapi_response:%s' % digest
+
+
+def get_cached_response(key):
+    cache = get_response_cache()
+    cached_response = cache.get(key)
+    if cached_response is None:
+        return
+
+    content_type, content = cached_response
+    return HttpResponse(content, content_type=content_type)
+
+
+def cache_response(key, response):
+    """
+    Stores the content of the given rendered response in the response cache.
+    """
+    get_response_cache().set(
+        key,
+        (response['Content-Type'], response.content),
+        getattr(settings, 'WAGTAILAPI_RESPONSE_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+    )
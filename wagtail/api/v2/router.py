@@ -6,6 +6,8 @@ from django.conf.urls import include, url
 
 from wagtail.utils.urlpatterns import decorate_urlpatterns
 
+from .versions import register_router
+
 
 class WagtailAPIRouter(object):
     """
@@ -30,6 +32,16 @@ class WagtailAPIRouter(object):
             if issubclass(model, class_.model):
                 return name, class_
 
+    def get_content_version_models(self):
+        """
+        Returns the models that the responses of all of the endpoints are made from
+        """
+        models = set()
+        for class_ in self._endpoints.values():
+            models.update(class_.get_content_version_models(self))
+
+        return models
+
     def get_model_listing_urlpath(self, model):
         """
         Returns a URL path (excluding scheme and hostname) to the listing
@@ -78,6 +90,9 @@ class WagtailAPIRouter(object):
 
         decorate_urlpatterns(urlpatterns, self.wrap_view)
 
+        # Keep the content versions of the models that the endpoints serve
+        register_router(self)
+
         return urlpatterns
 
     @property
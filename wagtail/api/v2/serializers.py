@@ -3,6 +3,8 @@ from __future__ import absolute_import, unicode_literals
 from collections import OrderedDict
 
 from django.core.urlresolvers import NoReverseMatch
+from django.utils.lru_cache import lru_cache
+from modelcluster.contrib.taggit import ClusterTaggableManager
 from modelcluster.models import get_all_child_relations
 from rest_framework import relations, serializers
 from rest_framework.fields import Field, SkipField
@@ -68,7 +70,7 @@ class PageHtmlUrlField(Field):
 
     def to_representation(self, page):
         try:
-            return page.full_url
+            return page.get_full_url(self.context['request'])
         except NoReverseMatch:
             return None
 
@@ -126,6 +128,11 @@ class PageParentField(relations.RelatedField):
     The representation is the same as the RelatedField class.
     """
     def get_attribute(self, instance):
+        # Page listings look up the parents of all of their pages at once
+        # (see PagesAPIEndpoint.prefetch_objects)
+        if hasattr(instance, '_wagtailapi_parent'):
+            return instance._wagtailapi_parent
+
         parent = instance.get_parent()
 
         site_pages = pages_for_site(self.context['request'].site)
@@ -133,7 +140,7 @@ class PageParentField(relations.RelatedField):
             return parent
 
     def to_representation(self, value):
-        serializer_class = get_serializer_class(value.__class__, ['id', 'type', 'detail_url', 'html_url', 'title'], meta_fields=['type', 'detail_url', 'html_url'], base=PageSerializer)
+        serializer_class = get_parent_page_serializer_class(value.__class__)
         serializer = serializer_class(context=self.context)
         return serializer.to_representation(value)
 
@@ -241,7 +248,9 @@ class TagsField(Field):
     "tags": ["bird", "wagtail"]
     """
     def to_representation(self, value):
-        return list(value.all().order_by('name').values_list('name', flat=True))
+        # Sort the tags here rather than in the database so that tags fetched with
+        # prefetch_related don't need to be fetched again
+        return sorted(tag.name for tag in value.all())
 
 
 class BaseSerializer(serializers.ModelSerializer):
@@ -347,3 +356,56 @@ def get_serializer_class(model_, fields_, meta_fields, child_serializer_classes=
         'meta_fields': list(meta_fields),
         'child_serializer_classes': child_serializer_classes or {},
     })
+
+
+@lru_cache(maxsize=None)
+def get_parent_page_serializer_class(model):
+    return get_serializer_class(model, ['id', 'type', 'detail_url', 'html_url', 'title'], meta_fields=['type', 'detail_url', 'html_url'], base=PageSerializer)
+
+
+def get_related_lookups(serializer_class, prefix='', prefetch=False):
+    """
+    Works out how to fetch the related objects that the given serializer class uses
+    along with the objects it serializes. Returns a tuple of lists of select_related
+    and prefetch_related lookups.
+
+    Foreign keys are selected in the same query, and child relations, tags and other
+    many-to-many relations (along with anything nested inside them) are prefetched.
+    """
+    model = serializer_class.Meta.model
+    select_related = []
+    prefetch_related = []
+
+    for field_name in serializer_class.Meta.fields:
+        child_serializer_class = serializer_class.child_serializer_classes.get(field_name)
+        if child_serializer_class is None:
+            continue
+
+        field = model._meta.get_field(field_name)
+        if isinstance(field, ClusterTaggableManager):
+            # These tags are read through the relation to the tagged item model (so
+            # that unsaved tags are included), so that relation is the one to prefetch
+            tagged_items = field.through._meta.get_field('content_object').rel.get_accessor_name()
+            prefetch_related.append(prefix + tagged_items + '__tag')
+            continue
+
+        if field.concrete and (field.many_to_one or field.one_to_one):
+            child_prefetch = prefetch
+        elif field.many_to_many or field.one_to_many:
+            child_prefetch = True
+        else:
+            continue
+
+        lookup = prefix + field_name
+        if child_prefetch:
+            prefetch_related.append(lookup)
+        else:
+            select_related.append(lookup)
+
+        child_select_related, child_prefetch_related = get_related_lookups(
+            child_serializer_class, lookup + '__', prefetch=child_prefetch
+        )
+        select_related.extend(child_select_related)
+        prefetch_related.extend(child_prefetch_related)
+
+    return select_related, prefetch_related
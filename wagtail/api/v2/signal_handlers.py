@@ -1,7 +1,7 @@
 from __future__ import absolute_import, unicode_literals
 
 from django.core.urlresolvers import reverse
-from django.db.models.signals import post_delete, post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 
 from wagtail.contrib.wagtailfrontendcache.utils import purge_url_from_cache
 from wagtail.wagtailcore.models import get_page_models
@@ -10,6 +10,7 @@ from wagtail.wagtaildocs.models import get_document_model
 from wagtail.wagtailimages import get_image_model
 
 from .utils import get_base_url
+from .versions import content_changed
 
 
 def purge_page_from_cache(instance, **kwargs):
@@ -55,3 +56,26 @@ def unregister_signal_handlers():
     post_delete.disconnect(purge_image_from_cache, sender=Image)
     post_save.disconnect(purge_document_from_cache, sender=Document)
     post_delete.disconnect(purge_document_from_cache, sender=Document)
+
+
+def record_content_change(sender, instance, **kwargs):
+    content_changed(type(instance))
+
+
+def record_many_to_many_change(sender, instance, action, model, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        # Both sides of the relation can include it in their responses
+        content_changed(type(instance))
+        content_changed(model)
+
+
+def register_content_version_signal_handlers():
+    post_save.connect(record_content_change)
+    post_delete.connect(record_content_change)
+    m2m_changed.connect(record_many_to_many_change)
+
+
+def unregister_content_version_signal_handlers():
+    post_save.disconnect(record_content_change)
+    post_delete.disconnect(record_content_change)
+    m2m_changed.disconnect(record_many_to_many_change)
@@ -505,3 +505,32 @@ class TestImageCacheInvalidation(TestCase):
         get_image_model().objects.get(id=5).delete()
 
         purge.assert_any_call('http://api.example.com/api/v2beta/images/5/')
+
+
+@override_settings(WAGTAILAPI_RESPONSE_CACHE='default')
+class TestImageResponseCache(TestCase):
+    fixtures = ['demosite.json']
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestImageResponseCache, cls).setUpClass()
+        signal_handlers.register_content_version_signal_handlers()
+
+    @classmethod
+    def tearDownClass(cls):
+        super(TestImageResponseCache, cls).tearDownClass()
+        signal_handlers.unregister_content_version_signal_handlers()
+
+    def get_response(self):
+        return self.client.get(reverse('wagtailapi_v2:images:listing'))
+
+    def test_saving_image_invalidates_cache(self):
+        self.get_response()
+
+        image = get_image_model().objects.get(id=5)
+        image.title = "New title"
+        image.save()
+        response = self.get_response()
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertIn("New title", [image['title'] for image in content['items']])
@@ -2,16 +2,28 @@ from __future__ import absolute_import, unicode_literals
 
 import collections
 import json
+import time
 
 import mock
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
+from django.db import connection
 from django.test import TestCase
-from django.test.utils import override_settings
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils.http import http_date
+from taggit.models import Tag
 
 from wagtail.api.v2 import signal_handlers
+from wagtail.api.v2.endpoints import (
+    SERIALIZER_CLASS_CACHE_SIZE, PagesAPIEndpoint, _get_cached_serializer_class)
+from wagtail.api.v2.utils import BadRequestError, parse_fields_parameter
 from wagtail.tests.demosite import models
 from wagtail.tests.testapp.models import StreamPage
-from wagtail.wagtailcore.models import Page
+from wagtail.tests.urls import api_router
+from wagtail.wagtailcore.models import Page, PageViewRestriction, Site
+from wagtail.wagtaildocs.models import get_document_model
+from wagtail.wagtailimages import get_image_model
+from wagtail.wagtailsearch.models import Query
 
 
 def get_total_page_count():
@@ -352,6 +364,28 @@ class TestPageListing(TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(content, {'message': "'title' does not support nested fields"})
 
+    def get_query_count(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_response(**params)
+
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_all_fields_query_count_does_not_depend_on_limit(self):
+        # Make the first request to fill the caches
+        self.get_response(fields='*')
+
+        self.assertEqual(self.get_query_count(fields='*', limit=2), self.get_query_count(fields='*', limit=20))
+
+    def test_all_specific_fields_query_count_does_not_depend_on_limit(self):
+        # Blog entries have tags, child relations and an image
+        self.get_response(type='demosite.BlogEntryPage', fields='*')
+
+        self.assertEqual(
+            self.get_query_count(type='demosite.BlogEntryPage', fields='*', limit=2),
+            self.get_query_count(type='demosite.BlogEntryPage', fields='*', limit=20)
+        )
+
 
     # FILTERING
 
@@ -681,6 +715,110 @@ class TestPageListing(TestCase):
         self.assertEqual(content, {'message': "offset must be a positive integer"})
 
 
+    # CURSOR
+
+    def get_page_id_list_by_cursor(self, **params):
+        page_id_list = []
+        cursor = ''
+
+        while cursor is not None:
+            response = self.get_response(cursor=cursor, limit=3, **params)
+            content = json.loads(response.content.decode('UTF-8'))
+            self.assertEqual(response.status_code, 200)
+
+            page_id_list.extend(self.get_page_id_list(content))
+            cursor = content['meta']['next_cursor']
+
+        return page_id_list
+
+    def test_cursor(self):
+        response = self.get_response()
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(self.get_page_id_list_by_cursor(), self.get_page_id_list(content))
+
+    def test_cursor_with_ordering(self):
+        response = self.get_response(order='-title')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(self.get_page_id_list_by_cursor(order='-title'), self.get_page_id_list(content))
+
+    def test_cursor_with_type(self):
+        response = self.get_response(type='demosite.BlogEntryPage', order='date')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(
+            self.get_page_id_list_by_cursor(type='demosite.BlogEntryPage', order='date'),
+            self.get_page_id_list(content)
+        )
+
+    def test_cursor_meta(self):
+        response = self.get_response(cursor='', limit=3)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(content['meta']['total_count'], get_total_page_count())
+        self.assertTrue(content['meta']['next_cursor'])
+
+    def test_cursor_with_zero_limit(self):
+        response = self.get_response(cursor='', limit=0)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(content['items'], [])
+        self.assertIsNone(content['meta']['next_cursor'])
+
+    def test_cursor_with_offset_gives_error(self):
+        response = self.get_response(cursor='', offset=3)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "offset cannot be used with cursor"})
+
+    def test_invalid_cursor_gives_error(self):
+        response = self.get_response(cursor='abc')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "cursor is not valid"})
+
+    def test_cursor_with_nullable_ordering_gives_error(self):
+        response = self.get_response(cursor='', order='first_published_at')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "cursor cannot be used when ordering by 'first_published_at'"})
+
+    def test_cursor_with_random_ordering_gives_error(self):
+        response = self.get_response(cursor='', order='random')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "cursor cannot be used with this ordering"})
+
+    def test_cursor_with_search_gives_error(self):
+        response = self.get_response(cursor='', search='blog')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "cursor cannot be used with search"})
+
+
+    # COUNT
+
+    def test_count_false(self):
+        response = self.get_response(count='false')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertNotIn('total_count', content['meta'])
+        self.assertEqual(len(content['items']), min(20, get_total_page_count()))
+
+    def test_count_not_boolean_gives_error(self):
+        response = self.get_response(count='abc')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "count must be either true or false"})
+
+
     # SEARCH
 
     def test_search_for_blog(self):
@@ -985,6 +1123,51 @@ class TestPageDetail(TestCase):
         self.assertEqual(content, {'message': "'title' does not support nested fields"})
 
 
+class TestPageSerializerClassCache(TestCase):
+    def get_serializer_class(self, fields, **kwargs):
+        return PagesAPIEndpoint._get_serializer_class(
+            api_router, models.BlogEntryPage, parse_fields_parameter(fields), **kwargs
+        )
+
+    def test_serializer_class_is_reused(self):
+        serializer_class = self.get_serializer_class('body,-slug')
+
+        self.assertIs(self.get_serializer_class('body,-slug'), serializer_class)
+        self.assertIn('body', serializer_class.Meta.fields)
+        self.assertNotIn('slug', serializer_class.Meta.fields)
+
+    def test_different_fields_give_different_classes(self):
+        self.assertIsNot(self.get_serializer_class('body'), self.get_serializer_class('date'))
+
+    def test_detail_and_listing_classes_are_different(self):
+        detail_serializer_class = self.get_serializer_class('', show_details=True)
+        listing_serializer_class = self.get_serializer_class('')
+
+        self.assertIsNot(detail_serializer_class, listing_serializer_class)
+        self.assertIn('parent', detail_serializer_class.Meta.fields)
+        self.assertNotIn('parent', listing_serializer_class.Meta.fields)
+
+    def test_nested_serializer_classes_are_reused(self):
+        serializer_class = self.get_serializer_class('carousel_items(image)')
+        other_serializer_class = self.get_serializer_class('title,carousel_items(image)')
+
+        self.assertIsNot(serializer_class, other_serializer_class)
+        self.assertIs(
+            serializer_class.child_serializer_classes['carousel_items'],
+            other_serializer_class.child_serializer_classes['carousel_items']
+        )
+
+    def test_invalid_fields_are_not_cached(self):
+        with self.assertRaises(BadRequestError):
+            self.get_serializer_class('foo')
+
+        with self.assertRaises(BadRequestError):
+            self.get_serializer_class('foo')
+
+    def test_cache_is_bounded(self):
+        self.assertEqual(_get_cached_serializer_class.cache_info().maxsize, SERIALIZER_CLASS_CACHE_SIZE)
+
+
 class TestPageDetailWithStreamField(TestCase):
     fixtures = ['test.json']
 
@@ -1080,3 +1263,241 @@ class TestPageCacheInvalidation(TestCase):
         Page.objects.get(id=2).save_revision()
 
         purge.assert_not_called()
+
+
+@override_settings(WAGTAILAPI_CONDITIONAL_REQUESTS=True)
+class TestPageConditionalRequests(TestCase):
+    fixtures = ['demosite.json']
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestPageConditionalRequests, cls).setUpClass()
+        signal_handlers.register_content_version_signal_handlers()
+
+    @classmethod
+    def tearDownClass(cls):
+        super(TestPageConditionalRequests, cls).tearDownClass()
+        signal_handlers.unregister_content_version_signal_handlers()
+
+    def get_response(self, url=None, params=None, **headers):
+        return self.client.get(url or reverse('wagtailapi_v2:pages:listing'), params or {}, **headers)
+
+    def respond_later(self, seconds=2):
+        # Responds as if the given number of seconds had passed since the last change
+        return mock.patch('wagtail.api.v2.endpoints.time', mock.Mock(time=lambda: time.time() + seconds))
+
+    def test_listing_has_etag_and_last_modified(self):
+        with self.respond_later():
+            response = self.get_response()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+
+    def test_no_last_modified_within_second_of_change(self):
+        cache.clear()
+        with mock.patch('wagtail.api.v2.versions.time') as versions_time:
+            with mock.patch('wagtail.api.v2.endpoints.time') as endpoints_time:
+                # A client fetched the listing at 1500000000.1, and the content changed
+                # again at 1500000000.2
+                versions_time.time.return_value = 1500000000.2
+                Page.objects.get(id=2).save()
+
+                # Until the second has passed, Last-Modified would be the same as the
+                # client's copy, so it's not used
+                endpoints_time.time.return_value = 1500000000.5
+                response = self.get_response(HTTP_IF_MODIFIED_SINCE=http_date(1500000000))
+
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn('Last-Modified', response)
+
+                # Later changes are in later seconds
+                endpoints_time.time.return_value = 1500000001.5
+                response = self.get_response()
+
+                self.assertEqual(response['Last-Modified'], http_date(1500000000))
+
+    def test_if_none_match(self):
+        etag = self.get_response()['ETag']
+
+        with mock.patch.object(PagesAPIEndpoint, 'get_queryset') as get_queryset:
+            response = self.get_response(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        # The response wasn't made again
+        self.assertFalse(get_queryset.called)
+
+    def test_if_modified_since(self):
+        with self.respond_later():
+            last_modified = self.get_response()['Last-Modified']
+
+            response = self.get_response(HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_detail_if_none_match(self):
+        url = reverse('wagtailapi_v2:pages:detail', args=(16, ))
+        etag = self.get_response(url)['ETag']
+
+        response = self.get_response(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_depends_on_query(self):
+        etag = self.get_response()['ETag']
+
+        response = self.get_response(params={'fields': 'title'}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_changes_when_page_is_published(self):
+        etag = self.get_response()['ETag']
+
+        Page.objects.get(id=2).save_revision().publish()
+        response = self.get_response(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_changes_when_image_is_changed(self):
+        etag = self.get_response()['ETag']
+
+        get_image_model().objects.first().save()
+        response = self.get_response(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_changes_when_view_restriction_is_added(self):
+        url = reverse('wagtailapi_v2:pages:detail', args=(5, ))
+        etag = self.get_response(url)['ETag']
+
+        PageViewRestriction.objects.create(page_id=5, restriction_type='password', password='test')
+        response = self.get_response(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_etag_changes_when_version_is_lost(self):
+        etag = self.get_response()['ETag']
+
+        cache.clear()
+        response = self.get_response(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(WAGTAILAPI_CONDITIONAL_REQUESTS=False)
+    def test_disabled(self):
+        response = self.get_response()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+
+@override_settings(WAGTAILAPI_RESPONSE_CACHE='default')
+class TestPageResponseCache(TestCase):
+    fixtures = ['demosite.json']
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestPageResponseCache, cls).setUpClass()
+        signal_handlers.register_content_version_signal_handlers()
+
+    @classmethod
+    def tearDownClass(cls):
+        super(TestPageResponseCache, cls).tearDownClass()
+        signal_handlers.unregister_content_version_signal_handlers()
+
+    def get_response(self, url=None, **params):
+        return self.client.get(url or reverse('wagtailapi_v2:pages:listing'), params)
+
+    def test_listing_is_cached(self):
+        response = self.get_response(fields='title')
+
+        with mock.patch.object(PagesAPIEndpoint, 'get_queryset') as get_queryset:
+            cached_response = self.get_response(fields='title')
+
+        self.assertFalse(get_queryset.called)
+        self.assertEqual(cached_response.status_code, 200)
+        self.assertEqual(cached_response['Content-Type'], 'application/json')
+        self.assertEqual(cached_response.content, response.content)
+
+    def test_detail_is_cached(self):
+        url = reverse('wagtailapi_v2:pages:detail', args=(16, ))
+        response = self.get_response(url)
+
+        with mock.patch.object(PagesAPIEndpoint, 'get_object') as get_object:
+            cached_response = self.get_response(url)
+
+        self.assertFalse(get_object.called)
+        self.assertEqual(cached_response.content, response.content)
+
+    def test_query_string_is_normalised(self):
+        response = self.client.get(reverse('wagtailapi_v2:pages:listing') + '?fields=title&limit=2')
+
+        with mock.patch.object(PagesAPIEndpoint, 'get_queryset') as get_queryset:
+            cached_response = self.client.get(reverse('wagtailapi_v2:pages:listing') + '?limit=2&fields=title&_=123')
+
+        self.assertFalse(get_queryset.called)
+        self.assertEqual(cached_response.content, response.content)
+
+    def test_random_ordering_is_not_cached(self):
+        self.get_response(order='random')
+
+        with mock.patch.object(PagesAPIEndpoint, 'get_queryset', side_effect=BadRequestError("not cached")):
+            response = self.get_response(order='random')
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_publishing_invalidates_cache(self):
+        self.get_response(fields='title')
+
+        page = Page.objects.get(id=2)
+        page.title = "New title"
+        page.save_revision().publish()
+        response = self.get_response(fields='title')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertIn("New title", [page['title'] for page in content['items']])
+
+    def test_adding_view_restriction_invalidates_cache(self):
+        url = reverse('wagtailapi_v2:pages:detail', args=(5, ))
+        self.get_response(url)
+
+        PageViewRestriction.objects.create(page_id=5, restriction_type='password', password='test')
+        response = self.get_response(url)
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_changing_related_object_invalidates_cache(self):
+        url = reverse('wagtailapi_v2:pages:detail', args=(16, ))
+        self.get_response(url)
+
+        # Tags are read from the blog entry through its tagged items
+        tag = Tag.objects.get(id=4)
+        tag.name = "New tag"
+        tag.save()
+        response = self.get_response(url)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertIn("New tag", content['tags'])
+
+    def test_saving_unrelated_models_does_not_change_versions(self):
+        with mock.patch('wagtail.api.v2.versions.update_content_version') as update_content_version:
+            Query.get("hello").add_hit()
+            Page.objects.get(id=2).save()
+
+        # Only the page save changes a version
+        update_content_version.assert_called_once_with(Page)
+
+    def test_content_version_models(self):
+        models = PagesAPIEndpoint.get_content_version_models(api_router)
+
+        self.assertIn(PageViewRestriction, models)
+        self.assertIn(Site, models)
+        self.assertIn(Tag, models)
+
+        # The models of properties are followed, as they may read from the relations
+        # of their objects (e.g. the link property of related links)
+        self.assertIn(get_document_model(), models)
@@ -2,7 +2,8 @@ from __future__ import absolute_import, unicode_literals
 
 from unittest import TestCase
 
-from ..utils import FieldsParameterParseError, parse_boolean, parse_fields_parameter
+from ..utils import (
+    FieldsParameterParseError, freeze_fields_config, parse_boolean, parse_fields_parameter)
 
 
 class TestParseFieldsParameter(TestCase):
@@ -237,6 +238,30 @@ class TestParseFieldsParameter(TestCase):
         self.assertEqual(str(e.exception), "'_' must be in the first position")
 
 
+class TestFreezeFieldsConfig(TestCase):
+    def test_freeze(self):
+        frozen = freeze_fields_config(parse_fields_parameter('foo,-bar,baz(a,b(c))'))
+
+        self.assertEqual(frozen, (
+            ('foo', False, None),
+            ('bar', True, None),
+            ('baz', False, (
+                ('a', False, None),
+                ('b', False, (
+                    ('c', False, None),
+                )),
+            )),
+        ))
+        self.assertEqual(hash(frozen), hash(freeze_fields_config(parse_fields_parameter('foo,-bar,baz(a,b(c))'))))
+
+    def test_empty_sub_fields(self):
+        self.assertEqual(freeze_fields_config([('foo', False, [])]), (('foo', False, None), ))
+
+    def test_empty(self):
+        self.assertEqual(freeze_fields_config([]), ())
+        self.assertEqual(freeze_fields_config(None), ())
+
+
 class TestParseBoolean(TestCase):
     # GOOD STUFF
 
@@ -218,6 +218,18 @@ def parse_fields_parameter(fields_str):
     return fields
 
 
+def freeze_fields_config(fields_config):
+    """
+    Converts the lists in a fields configuration returned by parse_fields_parameter
+    into tuples, so that it can be used as a dictionary key. Empty lists of nested
+    fields are converted to None.
+    """
+    return tuple(
+        (field_name, negated, freeze_fields_config(sub_fields) if sub_fields else None)
+        for field_name, negated, sub_fields in fields_config or ()
+    )
+
+
 def parse_boolean(value):
     """
     Parses strings into booleans using the following mapping (case-sensitive):
@@ -0,0 +1,133 @@
+"""
+Tracking changes to the content served by the API.
+
+When WAGTAILAPI_CONDITIONAL_REQUESTS is True or WAGTAILAPI_RESPONSE_CACHE is set, the
+time that objects of each model were last saved or deleted is kept in the default
+cache as the "content version" of that model. Endpoints declare the models that their
+responses are read from (see BaseAPIEndpoint.get_content_version_models), and derive
+the ETag and Last-Modified headers of their responses from the versions of those
+models, so that clients that send them back with If-None-Match or If-Modified-Since
+are told that nothing has changed (with a 304 response) without the response having
+to be made again. The versions also form part of the keys of cached responses (see
+wagtail.api.v2.response_cache).
+
+Versions are only kept for the models that the endpoints of the routers in use read
+from (see register_router), so that saving other models costs nothing.
+
+Versions are only changed by the post_save, post_delete and m2m_changed signals, so
+changes made without sending them (such as QuerySet.update() or raw SQL) are not
+noticed until the version is lost from the cache. If a version is missing from the
+cache, it is started again from the current time, which only makes clients fetch the
+content again.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.urlresolvers import get_resolver
+from django.db import router, transaction
+
+CONTENT_VERSION_KEY = 'wagtailapi_content_version:%s.%s'
+
+# The API routers whose URL patterns have been built in this process
+_routers = []
+
+# The version models of all of the models that the routers' endpoints read from
+_versioned_models = None
+
+
+def conditional_requests_enabled():
+    return getattr(settings, 'WAGTAILAPI_CONDITIONAL_REQUESTS', False)
+
+
+def get_version_model(model):
+    """
+    Returns the model whose content version changes when objects of the given model
+    change. This is the first model in its chain of multi-table inheritance, so all
+    page types share the version of Page.
+    """
+    model = model._meta.concrete_model
+
+    while model._meta.parents:
+        model = next(iter(model._meta.parents))
+
+    return model
+
+
+def register_router(api_router):
+    """
+    Records that the content versions of the models that the given router's endpoints
+    read from need to be kept. Called when the router's URL patterns are built.
+    """
+    global _versioned_models
+
+    if api_router not in _routers:
+        _routers.append(api_router)
+        _versioned_models = None
+
+
+def get_versioned_models():
+    """
+    Returns the set of models that content versions are kept for.
+    """
+    global _versioned_models
+
+    if _versioned_models is None:
+        # Load the root URLconf, so that its routers are registered even in processes
+        # that don't serve requests (such as management commands)
+        get_resolver(None).url_patterns
+
+        _versioned_models = set(
+            get_version_model(model)
+            for api_router in _routers
+            for model in api_router.get_content_version_models()
+        )
+
+    return _versioned_models
+
+
+def get_content_version_key(model):
+    return CONTENT_VERSION_KEY % (model._meta.app_label, model._meta.model_name)
+
+
+def get_content_versions(models):
+    """
+    Returns a list of the content versions (the times of the last changes) of the given
+    models, or None if the cache isn't storing them.
+    """
+    keys = sorted(set(get_content_version_key(get_version_model(model)) for model in models))
+    versions = cache.get_many(keys)
+
+    for key in keys:
+        if key not in versions:
+            # Use add() so that concurrent processes agree on a single version
+            cache.add(key, time.time(), None)
+            versions[key] = cache.get(key)
+
+            if versions[key] is None:
+                # The cache is not storing anything (e.g. a dummy cache)
+                return
+
+    return [versions[key] for key in keys]
+
+
+def update_content_version(model):
+    cache.set(get_content_version_key(model), time.time(), None)
+
+
+def content_changed(model):
+    """
+    Records that objects of the given model have just been saved or deleted.
+    """
+    model = get_version_model(model)
+    if model not in get_versioned_models():
+        return
+
+    update_content_version(model)
+
+    if hasattr(transaction, 'on_commit'):
+        # Change the version again once the change is committed, as responses made in
+        # the meantime will still have the content from before the change
+        transaction.on_commit(lambda: update_content_version(model), using=router.db_for_write(model))
@@ -1,6 +1,10 @@
 from __future__ import absolute_import, unicode_literals
 
+import operator
 from collections import OrderedDict
+from functools import reduce
+
+from django.db.models import Case, Count, Q, Value, When
 
 from wagtail.api.v2.endpoints import PagesAPIEndpoint
 from wagtail.api.v2.filters import (
@@ -47,6 +51,10 @@ class PagesAdminAPIEndpoint(PagesAPIEndpoint):
         'has_children'
     ])
 
+    # Admin responses change whenever a draft is saved, and have the types of the
+    # pages added to them after they're made
+    cache_responses = False
+
     def get_queryset(self):
         request = self.request
 
@@ -84,12 +92,35 @@ class PagesAdminAPIEndpoint(PagesAPIEndpoint):
 
         return types
 
+    def prefetch_objects(self, pages):
+        pages = super(PagesAdminAPIEndpoint, self).prefetch_objects(pages)
+
+        if pages and 'descendants' in self.get_serializer_class().Meta.fields:
+            # Count the descendants of all the pages in one query
+            counts = Page.objects.filter(
+                reduce(operator.or_, [Q(path__startswith=page.path) for page in pages])
+            ).aggregate(**{
+                str(i): Count(Case(When(path__startswith=page.path, depth__gt=page.depth, then=Value(1))))
+                for i, page in enumerate(pages)
+            })
+
+            for i, page in enumerate(pages):
+                page._wagtailapi_descendant_count = counts[str(i)]
+
+        return pages
+
+    def add_type_info(self, response):
+        # Not modified (304) responses are returned before any pages are serialised,
+        # and have no data to add the types to
+        if response.status_code != 304:
+            response.data['__types'] = self.get_type_info()
+
+        return response
+
     def listing_view(self, request):
         response = super(PagesAdminAPIEndpoint, self).listing_view(request)
-        response.data['__types'] = self.get_type_info()
-        return response
+        return self.add_type_info(response)
 
     def detail_view(self, request, pk):
         response = super(PagesAdminAPIEndpoint, self).detail_view(request, pk)
-        response.data['__types'] = self.get_type_info()
-        return response
+        return self.add_type_info(response)
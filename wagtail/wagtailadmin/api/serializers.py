@@ -72,8 +72,15 @@ class PageDescendantsField(Field):
         return instance
 
     def to_representation(self, page):
+        # Page listings count the descendants of all of their pages at once
+        # (see PagesAdminAPIEndpoint.prefetch_objects)
+        try:
+            count = page._wagtailapi_descendant_count
+        except AttributeError:
+            count = page.get_descendants().count()
+
         return OrderedDict([
-            ('count', page.get_descendants().count()),
+            ('count', count),
             ('listing_url', get_model_listing_url(self.context, Page) + '?descendant_of=' + str(page.id)),
         ])
 
@@ -3,8 +3,11 @@ from __future__ import absolute_import, unicode_literals
 import collections
 import datetime
 import json
+import time
 
+import mock
 from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
 from django.utils import timezone
 
 from wagtail.api.v2.tests.test_pages import TestPageDetail, TestPageListing
@@ -578,3 +581,36 @@ class TestAdminPageDetailWithStreamField(AdminAPITestCase):
 
         # ForeignKeys in a StreamField shouldn't be translated into dictionary representation
         self.assertEqual(content['body'], [{'type': 'image', 'value': 1}])
+
+
+@override_settings(WAGTAILAPI_CONDITIONAL_REQUESTS=True)
+class TestAdminPageConditionalRequests(AdminAPITestCase):
+    fixtures = ['demosite.json']
+
+    def test_listing_if_none_match(self):
+        url = reverse('wagtailadmin_api_v1:pages:listing')
+        etag = self.client.get(url)['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_detail_if_none_match(self):
+        url = reverse('wagtailadmin_api_v1:pages:detail', args=(16, ))
+        etag = self.client.get(url)['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_listing_if_modified_since(self):
+        url = reverse('wagtailadmin_api_v1:pages:listing')
+
+        # Last-Modified is only sent once the second of the last change has passed
+        with mock.patch('wagtail.api.v2.endpoints.time', mock.Mock(time=lambda: time.time() + 2)):
+            last_modified = self.client.get(url)['Last-Modified']
+
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
@@ -17,7 +17,7 @@ from django.utils.text import capfirst
 # return a SafeText, not SafeBytes; necessary so that it doesn't get re-encoded when the template engine
 # calls force_text, which would cause it to lose its 'safe' flag
 from wagtail.utils.deprecation import RemovedInWagtail111Warning
-from wagtail.wagtailcore.blocks.utils import accepts_kwarg
+from wagtail.wagtailcore.utils import accepts_kwarg
 
 __all__ = ['BaseBlock', 'Block', 'BoundBlock', 'DeclarativeSubBlocksMetaclass', 'BlockWidget', 'BlockField']
 
@@ -1,18 +1,23 @@
 from __future__ import absolute_import, unicode_literals
 
 import collections
+import hashlib
+import json
 
 from django import forms
 from django.contrib.staticfiles.templatetags.staticfiles import static
 from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.forms.utils import ErrorList
 from django.template.loader import render_to_string
 # Must be imported from Django so we get the new implementation of with_metaclass
 from django.utils import six
-from django.utils.encoding import python_2_unicode_compatible
+from django.utils.encoding import force_bytes, python_2_unicode_compatible
 from django.utils.html import format_html_join
 from django.utils.safestring import mark_safe
 
+from wagtail.wagtailcore.render_cache import (
+    get_block_definition_key, get_cached_render, get_render_cache)
 from wagtail.wagtailcore.utils import escape_script
 
 from .base import Block, BoundBlock, DeclarativeSubBlocksMetaclass
@@ -320,6 +325,8 @@ class StreamValue(collections.Sequence):
         self.stream_data = stream_data  # a list of (type_name, value) tuples
         self._bound_blocks = {}  # populated lazily from stream_data as we access items through __getitem__
         self.raw_text = raw_text
+        self.json_text = None  # the JSON that a lazy stream_data was decoded from, if known
+        self._render_cache_source = None
 
     def __getitem__(self, i):
         if i not in self._bound_blocks:
@@ -374,7 +381,37 @@ class StreamValue(collections.Sequence):
         return self.stream_block.render(self, context=context)
 
     def __html__(self):
-        return self.stream_block.render(self)
+        if get_render_cache() is None:
+            return self.stream_block.render(self)
+
+        return mark_safe(get_cached_render(
+            'stream', self._get_render_cache_source(), lambda: self.stream_block.render(self)
+        ))
+
+    def _get_render_cache_source(self):
+        """
+        Returns a string identifying both the content of this stream and the definition
+        of the block that renders it, to be used as the render cache key. Lazy streams
+        can't change, so this is only worked out once for them, from the JSON they were
+        loaded from where possible.
+        """
+        if self._render_cache_source is not None:
+            return self._render_cache_source
+
+        if self.json_text is not None:
+            data = self.json_text
+        elif self.is_lazy:
+            # stream_data is already in its JSONish form; avoid converting it to native values
+            data = json.dumps(self.stream_data, sort_keys=True, cls=DjangoJSONEncoder)
+        else:
+            data = json.dumps(self.stream_block.get_prep_value(self), sort_keys=True, cls=DjangoJSONEncoder)
+
+        source = get_block_definition_key(self.stream_block) + hashlib.sha1(force_bytes(data)).hexdigest()
+
+        if self.is_lazy:
+            self._render_cache_source = source
+
+        return source
 
     def __str__(self):
         return self.__html__()
@@ -1,8 +1,8 @@
 from __future__ import absolute_import, unicode_literals
 
-import inspect
 import re
-import sys
+
+from wagtail.wagtailcore.utils import accepts_kwarg  # NOQA
 
 # helpers for Javascript expression formatting
 
@@ -24,20 +24,3 @@ def js_dict(d):
         for (k, v) in d.items()
     ]
     return "{\n%s\n}" % ',\n'.join(dict_items)
-
-
-def accepts_kwarg(func, kwarg):
-    """
-    Determine whether the callable `func` has a signature that accepts the keyword argument `kwarg`
-    """
-    if sys.version_info >= (3, 3):
-        signature = inspect.signature(func)
-        try:
-            signature.bind_partial(**{kwarg: None})
-            return True
-        except TypeError:
-            return False
-    else:
-        # Fall back on inspect.getargspec, available on Python 2.7 but deprecated since 3.5
-        argspec = inspect.getargspec(func)
-        return (kwarg in argspec.args) or (argspec.keywords is not None)
@@ -83,7 +83,12 @@ class StreamField(models.Field):
                 # but better to handle it just in case...
                 return StreamValue(self.stream_block, [])
 
-            return self.stream_block.to_python(unpacked_value)
+            stream_value = self.stream_block.to_python(unpacked_value)
+
+            # Keep the JSON, so that the stream doesn't need to be encoded again to find
+            # its rendering in the render cache
+            stream_value.json_text = value
+            return stream_value
         else:
             # See if it looks like the standard non-smart representation of a
             # StreamField value: a list of (block_name, value) tuples
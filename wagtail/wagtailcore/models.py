@@ -2,6 +2,9 @@ from __future__ import absolute_import, unicode_literals
 
 import json
 import logging
+import time
+import uuid
+import warnings
 from collections import defaultdict
 from django import VERSION as DJANGO_VERSION
 
@@ -9,13 +12,14 @@ from django.conf import settings
 from django.contrib.auth.models import Group, Permission
 from django.contrib.contenttypes.models import ContentType
 from django.core import checks
-from django.core.cache import cache
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
 from django.core.exceptions import ValidationError
 from django.core.handlers.base import BaseHandler
 from django.core.handlers.wsgi import WSGIRequest
 from django.core.urlresolvers import reverse
 from django.db import connection, models, transaction
-from django.db.models import Case, IntegerField, Q, When
+from django.db.models import Q
 from django.http import Http404
 from django.template.response import TemplateResponse
 # Must be imported from Django so we get the new implementation of with_metaclass
@@ -30,11 +34,12 @@ from modelcluster.models import ClusterableModel, get_all_child_relations
 from treebeard.mp_tree import MP_Node
 
 from wagtail.utils.compat import user_is_authenticated
+from wagtail.utils.deprecation import RemovedInWagtail112Warning
 from wagtail.wagtailcore.query import PageQuerySet, TreeQuerySet
 from wagtail.wagtailcore.signals import page_published, page_unpublished
 from wagtail.wagtailcore.url_routing import RouteResult
 from wagtail.wagtailcore.utils import (
-    WAGTAIL_APPEND_SLASH, camelcase_to_underscore, resolve_model_string)
+    WAGTAIL_APPEND_SLASH, accepts_kwarg, camelcase_to_underscore, resolve_model_string)
 from wagtail.wagtailsearch import index
 
 logger = logging.getLogger('wagtail.core')
@@ -42,10 +47,7 @@ logger = logging.getLogger('wagtail.core')
 PAGE_TEMPLATE_VAR = 'page'
 
 
-MATCH_HOSTNAME_PORT = 0
-MATCH_HOSTNAME_DEFAULT = 1
-MATCH_DEFAULT = 2
-MATCH_HOSTNAME = 3
+SITE_LOOKUP_VERSION_CACHE_KEY = 'wagtail_site_lookup_version'
 
 
 class SiteManager(models.Manager):
@@ -53,6 +55,72 @@ class SiteManager(models.Manager):
         return self.get(hostname=hostname, port=port)
 
 
+class SiteLookupTable(object):
+    """
+    An index of Site records by hostname and port, used by Site.find_for_request
+    to resolve the site for a request without hitting the database
+    """
+    def __init__(self, sites):
+        self.sites_by_hostname_port = {}
+        self.sites_by_hostname = defaultdict(list)
+        self.default_site = None
+
+        for site in sites:
+            self.sites_by_hostname_port[(site.hostname, site.port)] = site
+            self.sites_by_hostname[site.hostname].append(site)
+
+            if site.is_default_site and self.default_site is None:
+                self.default_site = site
+
+    def find(self, hostname, port):
+        """
+        Return the Site for the given hostname and port. Matches are tried in
+        order of precedence:
+
+        * exact hostname and port match
+        * hostname match on the default site
+        * unique hostname match
+        * the default site
+
+        Raises Site.DoesNotExist if none of these match.
+        """
+        try:
+            port = int(port)
+        except (TypeError, ValueError):
+            port = None
+
+        site = self.sites_by_hostname_port.get((hostname, port))
+        if site is not None:
+            return site
+
+        default_site = self.default_site
+        if default_site is not None and default_site.hostname == hostname:
+            return default_site
+
+        hostname_sites = self.sites_by_hostname.get(hostname, [])
+        if len(hostname_sites) == 1:
+            return hostname_sites[0]
+
+        if default_site is not None:
+            return default_site
+
+        raise Site.DoesNotExist()
+
+
+# In-process SiteLookupTable and the time it expires at (or None), keyed on the version
+# it was built for
+_site_lookup_table = {}
+
+# How long the SiteLookupTable is kept for when its version can't be shared with other
+# processes, if the default cache has no default timeout
+SITE_LOOKUP_TABLE_TIMEOUT = 300
+
+
+def _clear_site_lookup_table():
+    _site_lookup_table.clear()
+    cache.delete(SITE_LOOKUP_VERSION_CACHE_KEY)
+
+
 @python_2_unicode_compatible
 class Site(models.Model):
     hostname = models.CharField(verbose_name=_('hostname'), max_length=255, db_index=True)
@@ -117,6 +185,9 @@ class Site(models.Model):
 
         NB this means that high-numbered ports on an extant hostname may
         still be routed to a different hostname which is set as the default
+
+        Sites are looked up in an in-process table (see ``SiteLookupTable``)
+        rather than queried from the database on every request.
         """
 
         try:
@@ -129,42 +200,52 @@ class Site(models.Model):
         except (AttributeError, KeyError):
             port = request.META.get('SERVER_PORT')
 
-        sites = list(Site.objects.annotate(match=Case(
-            # annotate the results by best choice descending
+        return Site.get_lookup_table().find(hostname, port)
 
-            # put exact hostname+port match first
-            When(hostname=hostname, port=port, then=MATCH_HOSTNAME_PORT),
+    @staticmethod
+    def get_lookup_table():
+        """
+        Return the in-process SiteLookupTable, rebuilding it if any process has
+        invalidated it since it was built (see ``Site.clear_lookup_table``), or if
+        it has expired because the default cache can't be shared between processes
+        """
+        version = cache.get(SITE_LOOKUP_VERSION_CACHE_KEY)
+        if version is None:
+            # Use add() so that concurrent processes agree on a single version
+            cache.add(SITE_LOOKUP_VERSION_CACHE_KEY, uuid.uuid4().hex, None)
 
-            # then put hostname+default (better than just hostname or just default)
-            When(hostname=hostname, is_default_site=True, then=MATCH_HOSTNAME_DEFAULT),
+            # If the cache isn't storing anything (e.g. a dummy cache), this is still None
+            version = cache.get(SITE_LOOKUP_VERSION_CACHE_KEY)
 
-            # then match default with different hostname. there is only ever
-            # one default, so order it above (possibly multiple) hostname
-            # matches so we can use sites[0] below to access it
-            When(is_default_site=True, then=MATCH_DEFAULT),
+        lookup_table, expires_at = _site_lookup_table.get(version, (None, None))
+        if lookup_table is None or (expires_at is not None and time.time() >= expires_at):
+            lookup_table = SiteLookupTable(Site.objects.select_related('root_page').order_by('pk'))
 
-            # because of the filter below, if it's not default then its a hostname match
-            default=MATCH_HOSTNAME,
+            # Other processes can't invalidate the table through a dummy or local-memory
+            # cache, so only keep it for as long as the cache would keep things
+            expires_at = None
+            default_cache = caches['default']
+            if version is None or isinstance(default_cache, LocMemCache):
+                expires_at = time.time() + (default_cache.default_timeout or SITE_LOOKUP_TABLE_TIMEOUT)
 
-            output_field=IntegerField(),
-        )).filter(Q(hostname=hostname) | Q(is_default_site=True)).order_by(
-            'match'
-        ).select_related(
-            'root_page'
-        ))
+            # Only ever keep the table for the current version around
+            _site_lookup_table.clear()
+            _site_lookup_table[version] = (lookup_table, expires_at)
 
-        if sites:
-            # if theres a unique match or hostname (with port or default) match
-            if len(sites) == 1 or sites[0].match in (MATCH_HOSTNAME_PORT, MATCH_HOSTNAME_DEFAULT):
-                return sites[0]
+        return lookup_table
 
-            # if there is a default match with a different hostname, see if
-            # there are many hostname matches. if only 1 then use that instead
-            # otherwise we use the default
-            if sites[0].match == MATCH_DEFAULT:
-                return sites[len(sites) == 2]
+    @staticmethod
+    def clear_lookup_table():
+        """
+        Discard the SiteLookupTable in this process, and in all other processes
+        sharing the same cache backend
+        """
+        _clear_site_lookup_table()
 
-        raise Site.DoesNotExist()
+        if hasattr(transaction, 'on_commit'):
+            # Requests served before the change is committed may rebuild the table
+            # from the old sites, so discard it again once the change is committed
+            transaction.on_commit(_clear_site_lookup_table)
 
     @property
     def root_url(self):
@@ -232,6 +313,13 @@ def get_default_page_content_type():
     return ContentType.objects.get_for_model(Page)
 
 
+def _overrides_route(model_class):
+    """
+    Returns True if the given Page subclass has its own implementation of route()
+    """
+    return six.get_unbound_function(model_class.route) is not six.get_unbound_function(Page.route)
+
+
 class BasePageManager(models.Manager):
     def get_queryset(self):
         return PageQuerySet(self.model).order_by('path')
@@ -259,6 +347,7 @@ class PageBase(models.base.ModelBase):
 
         cls._clean_subpage_models = None  # to be filled in on first call to cls.clean_subpage_models
         cls._clean_parent_page_models = None  # to be filled in on first call to cls.clean_parent_page_models
+        cls._get_url_parts_accepts_request = None  # to be filled in on first call to cls._get_url_parts_for_request
 
         # All pages should be creatable unless explicitly set otherwise.
         # This attribute is not inheritable.
@@ -415,6 +504,9 @@ class Page(six.with_metaclass(PageBase, AbstractPage, index.Indexed, Clusterable
             # a page without a parent is the tree root, which always has a url_path of '/'
             self.url_path = '/'
 
+        # Discard any URL precomputed for the old url_path by PageQuerySet.with_urls
+        self.__dict__.pop('_wagtail_cached_url_parts', None)
+
         return self.url_path
 
     @staticmethod
@@ -497,9 +589,11 @@ class Page(six.with_metaclass(PageBase, AbstractPage, index.Indexed, Clusterable
         if update_descendant_url_paths:
             self._update_descendant_url_paths(old_url_path, new_url_path)
 
-        # Check if this is a root page of any sites and clear the 'wagtail_site_root_paths' key if so
+        # Check if this is a root page of any sites and clear the 'wagtail_site_root_paths' key
+        # and the site lookup table (which holds a copy of the root page) if so
         if Site.objects.filter(root_page=self).exists():
             cache.delete('wagtail_site_root_paths')
+            Site.clear_lookup_table()
 
         # Log
         if is_new:
@@ -667,6 +761,50 @@ class Page(six.with_metaclass(PageBase, AbstractPage, index.Indexed, Clusterable
             else:
                 raise Http404
 
+    def route_by_url_path(self, request, path_components):
+        """
+        Equivalent to ``self.specific.route(request, path_components)``, but looks
+        up the pages along the whole path in a single query on ``url_path``
+        rather than one query per path component.
+
+        The per-component ``route`` chain is only used from the first page along
+        the path whose class overrides ``route`` (such as ``RoutablePageMixin``).
+        """
+        url_paths = [self.url_path]
+        for component in path_components:
+            url_paths.append(url_paths[-1] + component + '/')
+
+        pages_by_url_path = {
+            page.url_path: page
+            for page in Page.objects.filter(url_path__in=url_paths, path__startswith=self.path)
+        }
+
+        parent = self
+        for depth, url_path in enumerate(url_paths):
+            page = pages_by_url_path.get(url_path)
+
+            if page is None or page.depth != self.depth + depth:
+                # Either there is no such page, or its url_path is out of sync with
+                # the tree. Fall back to routing the rest of the path one component
+                # at a time.
+                if depth == 0:
+                    return self.specific.route(request, path_components)
+                else:
+                    return parent.route(request, path_components[depth - 1:])
+
+            model_class = page.specific_class
+            if model_class is None or _overrides_route(model_class):
+                return page.specific.route(request, path_components[depth:])
+
+            parent = page
+
+        # All pages along the path use the default routing rules, so the request
+        # is for the last page on the path
+        if parent.live:
+            return RouteResult(parent.specific)
+        else:
+            raise Http404
+
     def get_admin_display_title(self):
         """
         Return the title for this page as it should appear in the admin backend.
@@ -771,7 +909,25 @@ class Page(six.with_metaclass(PageBase, AbstractPage, index.Indexed, Clusterable
         """
         return (not self.is_leaf()) or self.depth == 2
 
-    def get_url_parts(self):
+    def _get_site_root_paths(self, request=None):
+        """
+        Return ``Site.get_site_root_paths()``, using the cached copy on the
+        request object if available, or the copy that ``PageQuerySet.with_urls``
+        worked this page's URL out from.
+        """
+        if request is None:
+            try:
+                return self._wagtail_cached_site_root_paths
+            except AttributeError:
+                return Site.get_site_root_paths()
+
+        try:
+            return request._wagtail_cached_site_root_paths
+        except AttributeError:
+            request._wagtail_cached_site_root_paths = Site.get_site_root_paths()
+            return request._wagtail_cached_site_root_paths
+
+    def get_url_parts(self, request=None):
         """
         Determine the URL for this page and return it as a tuple of
         ``(site_id, site_root_url, page_url_relative_to_site_root)``.
@@ -781,8 +937,17 @@ class Page(six.with_metaclass(PageBase, AbstractPage, index.Indexed, Clusterable
         and ``get_site`` properties and methods; pages with custom URL routing
         should override this method in order to have those operations return
         the custom URLs.
+
+        If a ``request`` is passed, the list of site root paths is cached on it
+        for the remainder of the request. If the URL has already been worked
+        out by ``PageQuerySet.with_urls``, that is returned instead.
         """
-        for (site_id, root_path, root_url) in Site.get_site_root_paths():
+        try:
+            return self._wagtail_cached_url_parts
+        except AttributeError:
+            pass
+
+        for (site_id, root_path, root_url) in self._get_site_root_paths(request):
             if self.url_path.startswith(root_path):
                 page_path = reverse('wagtail_serve', args=(self.url_path[len(root_path):],))
 
@@ -794,10 +959,42 @@ class Page(six.with_metaclass(PageBase, AbstractPage, index.Indexed, Clusterable
 
                 return (site_id, root_url, page_path)
 
-    @property
-    def full_url(self):
-        """Return the full URL (including protocol / domain) to this page, or None if it is not routable"""
-        url_parts = self.get_url_parts()
+    def _get_url_parts_for_request(self, request):
+        """
+        Call get_url_parts, passing on the request if the method accepts it
+        """
+        if request is None:
+            return self.get_url_parts()
+
+        cls = type(self)
+        if 'get_url_parts' in self.__dict__:
+            # get_url_parts has been replaced on this instance
+            accepts_request = accepts_kwarg(self.get_url_parts, 'request')
+        else:
+            if cls._get_url_parts_accepts_request is None:
+                # Inspecting the signature is slow, so only do it once for each page type
+                cls._get_url_parts_accepts_request = accepts_kwarg(self.get_url_parts, 'request')
+
+            accepts_request = cls._get_url_parts_accepts_request
+
+        if not accepts_request:
+            warnings.warn(
+                "The get_url_parts method on %s needs to be updated to accept an optional 'request' "
+                "keyword argument" % type(self),
+                category=RemovedInWagtail112Warning
+            )
+            return self.get_url_parts()
+
+        return self.get_url_parts(request=request)
+
+    def get_full_url(self, request=None):
+        """
+        Return the full URL (including protocol / domain) to this page, or None if it is not routable.
+
+        Passing the current ``request`` allows the list of site root paths to
+        be reused between calls during that request.
+        """
+        url_parts = self._get_url_parts_for_request(request)
 
         if url_parts is None:
             # page is not routable
@@ -807,6 +1004,8 @@ class Page(six.with_metaclass(PageBase, AbstractPage, index.Indexed, Clusterable
 
         return root_url + page_path
 
+    full_url = property(get_full_url)
+
     @property
     def url(self):
         """
@@ -825,19 +1024,22 @@ class Page(six.with_metaclass(PageBase, AbstractPage, index.Indexed, Clusterable
 
         site_id, root_url, page_path = url_parts
 
-        if len(Site.get_site_root_paths()) == 1:
+        if len(self._get_site_root_paths()) == 1:
             # we're only running a single site, so a local URL is sufficient
             return page_path
         else:
             return root_url + page_path
 
-    def relative_url(self, current_site):
+    def relative_url(self, current_site, request=None):
         """
         Return the 'most appropriate' URL for this page taking into account the site we're currently on;
         a local URL if the site matches, or a fully qualified one otherwise.
         Return None if the page is not routable.
+
+        Passing the current ``request`` allows the list of site root paths to
+        be reused between calls during that request.
         """
-        url_parts = self.get_url_parts()
+        url_parts = self._get_url_parts_for_request(request)
 
         if url_parts is None:
             # page is not routable
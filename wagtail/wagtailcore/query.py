@@ -6,10 +6,12 @@ from collections import defaultdict
 from django import VERSION as DJANGO_VERSION
 from django.apps import apps
 from django.contrib.contenttypes.models import ContentType
+from django.core.urlresolvers import reverse
 from django.db.models import CharField, Q
 from django.db.models.functions import Length, Substr
 from treebeard.mp_tree import MP_NodeQuerySet
 
+from wagtail.wagtailcore.utils import WAGTAIL_APPEND_SLASH
 from wagtail.wagtailsearch.queryset import SearchableQuerySetMixin
 
 
@@ -350,6 +352,57 @@ class PageQuerySet(SearchableQuerySetMixin, TreeQuerySet):
         else:
             return self._clone(klass=SpecificQuerySet)
 
+    def with_urls(self, request=None):
+        """
+        This evaluates the QuerySet and returns a list of its pages, with the URL
+        of every page worked out up front in a single pass. Calling ``url``,
+        ``full_url``, ``relative_url`` or ``{% pageurl %}`` on the returned
+        pages doesn't need to look up the site root paths or find the page's
+        site again.
+
+        Pages with custom URL routing still go through their own
+        ``get_url_parts`` method, which receives the precomputed URL from
+        ``super()``.
+        """
+        pages = list(self)
+        if not pages:
+            return pages
+
+        # Index the site root paths by path. Site.get_site_root_paths lists the
+        # most specific (longest) root paths first, so the first site listed
+        # for a given root path is the one get_url_parts would pick
+        all_site_root_paths = pages[0]._get_site_root_paths(request)
+        site_root_paths = {}
+        for site_id, root_path, root_url in all_site_root_paths:
+            site_root_paths.setdefault(root_path, (site_id, root_url))
+
+        for page in pages:
+            url_path = page.url_path
+            url_parts = None
+
+            # Try the page's own path and then each of its ancestors' paths,
+            # most specific first, until one of them is a site root
+            root_path_length = len(url_path)
+            while root_path_length > 0:
+                site = site_root_paths.get(url_path[:root_path_length])
+                if site is not None:
+                    site_id, root_url = site
+                    # The same as get_url_parts, so that the URLs are quoted the same way
+                    page_path = reverse('wagtail_serve', args=(url_path[root_path_length:],))
+
+                    if not WAGTAIL_APPEND_SLASH and page_path != '/':
+                        page_path = page_path.rstrip('/')
+
+                    url_parts = (site_id, root_url, page_path)
+                    break
+
+                root_path_length = url_path.rfind('/', 0, root_path_length - 1) + 1
+
+            page._wagtail_cached_url_parts = url_parts
+            page._wagtail_cached_site_root_paths = all_site_root_paths
+
+        return pages
+
     def in_site(self, site):
         """
         This filters the QuerySet to only contain pages within the specified site.
@@ -0,0 +1,142 @@
+"""
+An optional cache for the rendered HTML of rich text and StreamField content.
+
+Rendering these values can be expensive - rich text needs to look up every page,
+image and document it links to, and StreamField blocks render their own templates -
+but the output only depends on the stored source and on the objects it references.
+When the WAGTAIL_RENDER_CACHE setting names a cache alias, the rendered HTML is
+stored in that cache, keyed on a hash of the source. A generation token, changed
+whenever a page, site, image, document or snippet is saved or deleted (but not when a
+draft of a page is saved), forms part of every key so that renderings that refer to
+them are discarded. Renderings that read from other models, such as blocks whose
+templates query them, are served from the cache until they expire.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import hashlib
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.utils import six
+from django.utils.encoding import force_bytes, force_text
+from django.utils.functional import Promise
+
+RENDER_CACHE_GENERATION_KEY = 'wagtail_render_cache_generation'
+
+_render_state = threading.local()
+
+
+def get_render_cache():
+    """
+    Returns the cache configured by WAGTAIL_RENDER_CACHE, or None if render caching
+    is disabled.
+    """
+    alias = getattr(settings, 'WAGTAIL_RENDER_CACHE', None)
+    if alias is None:
+        return None
+    return caches[alias]
+
+
+def get_render_cache_generation(cache):
+    generation = cache.get(RENDER_CACHE_GENERATION_KEY)
+    if generation is None:
+        # Use add() so that concurrent processes agree on a single token
+        cache.add(RENDER_CACHE_GENERATION_KEY, uuid.uuid4().hex, None)
+        generation = cache.get(RENDER_CACHE_GENERATION_KEY)
+    return generation
+
+
+def invalidate_render_cache():
+    """
+    Discards all cached renderings, by changing the generation token that forms part
+    of their keys. Called whenever an object that rendered HTML may refer to changes.
+    """
+    cache = get_render_cache()
+    if cache is not None:
+        cache.delete(RENDER_CACHE_GENERATION_KEY)
+
+
+def get_cached_render(namespace, source, render):
+    """
+    Returns the result of calling `render`, going through the render cache if it is
+    enabled. `source` is a string that uniquely identifies the content being rendered.
+    """
+    cache = get_render_cache()
+    if cache is None:
+        return render()
+
+    generation = get_render_cache_generation(cache)
+    if generation is None:
+        # The cache is not storing anything (e.g. a dummy cache)
+        return render()
+
+    digest = hashlib.sha1(force_bytes(source)).hexdigest()
+    key = 'wagtail_render:%s:%s:%s' % (namespace, generation, digest)
+
+    html = cache.get(key)
+    if html is None:
+        outer_uncacheable = getattr(_render_state, 'uncacheable', False)
+        _render_state.uncacheable = False
+        try:
+            html = render()
+            uncacheable = _render_state.uncacheable
+        finally:
+            # A rendering that can't be cached can't be cached as part of an enclosing one either
+            _render_state.uncacheable = outer_uncacheable or _render_state.uncacheable
+
+        if not uncacheable:
+            timeout = getattr(settings, 'WAGTAIL_RENDER_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+            cache.set(key, force_text(html), timeout)
+
+    return html
+
+
+def mark_render_uncacheable():
+    """
+    Prevents the rendering currently in progress on this thread (if any) from being
+    stored in the render cache. Used when the output contains temporary content, such
+    as a placeholder for an image rendition that is still being generated.
+    """
+    _render_state.uncacheable = True
+
+
+def _describe_definition(value):
+    # Import here to avoid a circular import
+    from wagtail.wagtailcore.blocks import Block
+
+    if isinstance(value, Block):
+        path, args, kwargs = value.deconstruct()
+        return '%s(%s, %s)' % (path, _describe_definition(args), _describe_definition(kwargs))
+    elif isinstance(value, six.string_types + (Promise,)):
+        # force_text resolves lazy translation strings, whose default repr includes
+        # their memory address and so would differ between processes
+        return repr(force_text(value))
+    elif isinstance(value, dict):
+        return '{%s}' % ', '.join(
+            '%s: %s' % (_describe_definition(key), _describe_definition(value[key]))
+            for key in sorted(value, key=force_text)
+        )
+    elif isinstance(value, six.class_types) or callable(value):
+        # Likewise for classes and functions
+        return '%s.%s' % (value.__module__, getattr(value, '__name__', value.__class__.__name__))
+    elif hasattr(value, '__iter__'):
+        return '[%s]' % ', '.join(_describe_definition(item) for item in value)
+    else:
+        return repr(force_text(value))
+
+
+def get_block_definition_key(block):
+    """
+    Returns a string describing the definition of the given block, for use as part of
+    a render cache key. The result is consistent between processes, and is memoised on
+    the block object.
+    """
+    try:
+        return block._render_cache_definition_key
+    except AttributeError:
+        definition = _describe_definition(block)
+        block._render_cache_definition_key = hashlib.sha1(force_bytes(definition)).hexdigest()
+        return block._render_cache_definition_key
@@ -1,6 +1,7 @@
 from __future__ import absolute_import, unicode_literals
 
 import re  # parsing HTML with regexes LIKE A BOSS.
+from collections import defaultdict
 
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.html import escape
@@ -8,6 +9,7 @@ from django.utils.safestring import mark_safe
 
 from wagtail.wagtailcore import hooks
 from wagtail.wagtailcore.models import Page
+from wagtail.wagtailcore.render_cache import get_cached_render
 from wagtail.wagtailcore.whitelist import Whitelister
 
 
@@ -40,17 +42,59 @@ class PageLinkHandler(object):
             page = Page.objects.get(id=attrs['id'])
 
             if for_editor:
-                editor_attrs = 'data-linktype="page" data-id="%d" ' % page.id
                 parent_page = page.get_parent()
-                if parent_page:
-                    editor_attrs += 'data-parent-id="%d" ' % parent_page.id
+                parent_page_id = parent_page.id if parent_page else None
             else:
-                editor_attrs = ''
+                parent_page_id = None
 
-            return '<a %shref="%s">' % (editor_attrs, escape(page.url))
+            return PageLinkHandler.expand_page(page, parent_page_id, for_editor)
         except Page.DoesNotExist:
             return "<a>"
 
+    @staticmethod
+    def bulk_expand_db_attributes(attrs_list, for_editor):
+        """
+        Expand a list of <a linktype="page"> attribute dicts at once, fetching
+        the pages (and, for the editor, their parents) in a single query each
+        """
+        pages = Page.objects.filter(id__in=set(attrs['id'] for attrs in attrs_list)).with_urls()
+        pages_by_id = {page.id: page for page in pages}
+
+        parent_page_ids = {}
+        if for_editor:
+            parent_paths = {
+                page.path: Page._get_parent_path_from_path(page.path)
+                for page in pages if page.depth > 1
+            }
+            parent_ids_by_path = dict(
+                Page.objects.filter(path__in=parent_paths.values()).values_list('path', 'id')
+            )
+            parent_page_ids = {
+                page.id: parent_ids_by_path.get(parent_paths.get(page.path))
+                for page in pages
+            }
+
+        results = []
+        for attrs in attrs_list:
+            page = pages_by_id.get(int(attrs['id']))
+            if page is None:
+                results.append("<a>")
+            else:
+                results.append(PageLinkHandler.expand_page(page, parent_page_ids.get(page.id), for_editor))
+
+        return results
+
+    @staticmethod
+    def expand_page(page, parent_page_id, for_editor):
+        if for_editor:
+            editor_attrs = 'data-linktype="page" data-id="%d" ' % page.id
+            if parent_page_id:
+                editor_attrs += 'data-parent-id="%d" ' % parent_page_id
+        else:
+            editor_attrs = ''
+
+        return '<a %shref="%s">' % (editor_attrs, escape(page.url))
+
 
 EMBED_HANDLERS = {}
 LINK_HANDLERS = {
@@ -159,26 +203,82 @@ def extract_attrs(attr_string):
     return attributes
 
 
-def expand_db_html(html, for_editor=False):
+def supports_bulk_expansion(handler):
     """
-    Expand database-representation HTML into proper HTML usable in either
-    templates or the rich text editor
+    Determine whether the link or embed handler `handler` can expand many elements at once,
+    through a bulk_expand_db_attributes method. A bulk_expand_db_attributes method inherited
+    from a superclass is ignored if a subclass has overridden expand_db_attributes, so that the
+    overridden behaviour still applies.
     """
-    def replace_a_tag(m):
-        attrs = extract_attrs(m.group(1))
-        if 'linktype' not in attrs:
+    if not hasattr(handler, 'bulk_expand_db_attributes'):
+        return False
+
+    mro = getattr(handler, '__mro__', None)
+    if mro is None:
+        return True
+
+    for cls in mro:
+        if 'bulk_expand_db_attributes' in cls.__dict__:
+            return True
+        elif 'expand_db_attributes' in cls.__dict__:
+            return False
+
+    return True
+
+
+def expand_db_attributes_list(handler, attrs_list, for_editor):
+    """
+    Expand a list of attribute dicts with the given link or embed handler, in one
+    call to bulk_expand_db_attributes if the handler supports it
+    """
+    if supports_bulk_expansion(handler):
+        return handler.bulk_expand_db_attributes(attrs_list, for_editor)
+    else:
+        return [handler.expand_db_attributes(attrs, for_editor) for attrs in attrs_list]
+
+
+def expand_db_elements(html, pattern, type_attribute, get_handler, for_editor):
+    """
+    Replace each element matched by `pattern` with the HTML returned by the handler for
+    the type named in its `type_attribute` attribute. All elements of the same type are
+    passed to their handler together, so that it can fetch the objects they refer to in
+    one go. Elements without a `type_attribute` attribute are left unchanged.
+    """
+    all_attrs = [extract_attrs(m.group(1)) for m in pattern.finditer(html)]
+
+    attrs_by_type = defaultdict(list)
+    for attrs in all_attrs:
+        if type_attribute in attrs:
+            attrs_by_type[attrs[type_attribute]].append(attrs)
+
+    if not attrs_by_type:
+        return html
+
+    expanded_by_type = {
+        element_type: iter(expand_db_attributes_list(get_handler(element_type), attrs_list, for_editor))
+        for element_type, attrs_list in attrs_by_type.items()
+    }
+
+    # pattern.sub visits the same matches, in the same order, as pattern.finditer did above
+    all_attrs = iter(all_attrs)
+
+    def replace_tag(m):
+        attrs = next(all_attrs)
+        if type_attribute not in attrs:
             # return unchanged
             return m.group(0)
-        handler = get_link_handler(attrs['linktype'])
-        return handler.expand_db_attributes(attrs, for_editor)
+        return next(expanded_by_type[attrs[type_attribute]])
 
-    def replace_embed_tag(m):
-        attrs = extract_attrs(m.group(1))
-        handler = get_embed_handler(attrs['embedtype'])
-        return handler.expand_db_attributes(attrs, for_editor)
+    return pattern.sub(replace_tag, html)
 
-    html = FIND_A_TAG.sub(replace_a_tag, html)
-    html = FIND_EMBED_TAG.sub(replace_embed_tag, html)
+
+def expand_db_html(html, for_editor=False):
+    """
+    Expand database-representation HTML into proper HTML usable in either
+    templates or the rich text editor
+    """
+    html = expand_db_elements(html, FIND_A_TAG, 'linktype', get_link_handler, for_editor)
+    html = expand_db_elements(html, FIND_EMBED_TAG, 'embedtype', get_embed_handler, for_editor)
     return html
 
 
@@ -194,7 +294,9 @@ class RichText(object):
         self.source = (source or '')
 
     def __html__(self):
-        return '<div class="rich-text">' + expand_db_html(self.source) + '</div>'
+        return '<div class="rich-text">' + get_cached_render(
+            'richtext', self.source, lambda: expand_db_html(self.source)
+        ) + '</div>'
 
     def __str__(self):
         return mark_safe(self.__html__())
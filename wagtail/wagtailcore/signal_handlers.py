@@ -5,18 +5,24 @@ import logging
 from django.core.cache import cache
 from django.db.models.signals import post_delete, post_save, pre_delete
 
-from wagtail.wagtailcore.models import Page, Site
+from wagtail.wagtailcore.models import Page, Site, get_page_models
+from wagtail.wagtailcore.render_cache import invalidate_render_cache
 
 logger = logging.getLogger('wagtail.core')
 
 
-# Clear the wagtail_site_root_paths from the cache whenever Site records are updated.
+# Clear the wagtail_site_root_paths from the cache and the site lookup table
+# whenever Site records are updated.
 def post_save_site_signal_handler(instance, update_fields=None, **kwargs):
     cache.delete('wagtail_site_root_paths')
+    Site.clear_lookup_table()
+    invalidate_render_cache()
 
 
 def post_delete_site_signal_handler(instance, **kwargs):
     cache.delete('wagtail_site_root_paths')
+    Site.clear_lookup_table()
+    invalidate_render_cache()
 
 
 def pre_delete_page_unpublish(sender, instance, **kwargs):
@@ -30,9 +36,27 @@ def post_delete_page_log_deletion(sender, instance, **kwargs):
     logger.info("Page deleted: \"%s\" id=%d", instance.title, instance.id)
 
 
+# The fields that save_revision updates without changing the live page
+PAGE_DRAFT_FIELDS = frozenset(['latest_revision_created_at', 'has_unpublished_changes'])
+
+
+# Discard cached rich text / StreamField renderings whenever a page changes, as they
+# may contain links to it. Saving a draft only changes these fields, which no rendering
+# depends on.
+def page_changed_invalidate_render_cache(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and PAGE_DRAFT_FIELDS.issuperset(update_fields):
+        return
+
+    invalidate_render_cache()
+
+
 def register_signal_handlers():
     post_save.connect(post_save_site_signal_handler, sender=Site)
     post_delete.connect(post_delete_site_signal_handler, sender=Site)
 
     pre_delete.connect(pre_delete_page_unpublish, sender=Page)
     post_delete.connect(post_delete_page_log_deletion, sender=Page)
+
+    for model in get_page_models():
+        post_save.connect(page_changed_invalidate_render_cache, sender=model)
+        post_delete.connect(page_changed_invalidate_render_cache, sender=model)
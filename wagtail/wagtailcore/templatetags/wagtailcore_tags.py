@@ -7,6 +7,7 @@ from django.utils.safestring import mark_safe
 
 from wagtail import __version__
 from wagtail.wagtailcore.models import Page
+from wagtail.wagtailcore.render_cache import get_cached_render
 from wagtail.wagtailcore.rich_text import RichText, expand_db_html
 
 register = template.Library()
@@ -18,7 +19,8 @@ def pageurl(context, page):
     Outputs a page's URL as relative (/foo/bar/) if it's within the same site as the
     current page, or absolute (http://example.com/foo/bar/) if not.
     """
-    return page.relative_url(context['request'].site)
+    request = context['request']
+    return page.relative_url(request.site, request)
 
 
 @register.simple_tag(takes_context=True)
@@ -27,7 +29,8 @@ def slugurl(context, slug):
     page = Page.objects.filter(slug=slug).first()
 
     if page:
-        return page.relative_url(context['request'].site)
+        request = context['request']
+        return page.relative_url(request.site, request)
     else:
         return None
 
@@ -45,7 +48,7 @@ def richtext(value):
     elif value is None:
         html = ''
     else:
-        html = expand_db_html(value)
+        html = get_cached_render('richtext', value, lambda: expand_db_html(value))
 
     return mark_safe('<div class="rich-text">' + html + '</div>')
 
@@ -7,6 +7,7 @@ import pytz
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.http import Http404, HttpRequest
 from django.test import Client, TestCase
@@ -89,10 +90,17 @@ class TestValidation(TestCase):
 
 
 @override_settings(ALLOWED_HOSTS=['localhost', 'events.example.com', 'about.example.com', 'unknown.site.com'])
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'wagtail-site-routing-tests',
+    }
+})
 class TestSiteRouting(TestCase):
     fixtures = ['test.json']
 
     def setUp(self):
+        cache.clear()
         self.default_site = Site.objects.get(is_default_site=True)
         events_page = Page.objects.get(url_path='/home/events/')
         about_page = Page.objects.get(url_path='/home/about-us/')
@@ -107,11 +115,18 @@ class TestSiteRouting(TestCase):
         self.unrecognised_port = '8000'
         self.unrecognised_hostname = 'unknown.site.com'
 
+        # Sites are matched against an in-process lookup table, which only
+        # needs to be loaded from the database once
+        Site.get_lookup_table()
+
+    def tearDown(self):
+        Site.clear_lookup_table()
+
     def test_no_host_header_routes_to_default_site(self):
         # requests without a Host: header should be directed to the default site
         request = HttpRequest()
         request.path = '/'
-        with self.assertNumQueries(1):
+        with self.assertNumQueries(0):
             self.assertEqual(Site.find_for_request(request), self.default_site)
 
     def test_valid_headers_route_to_specific_site(self):
@@ -120,7 +135,7 @@ class TestSiteRouting(TestCase):
         request.path = '/'
         request.META['HTTP_HOST'] = self.events_site.hostname
         request.META['SERVER_PORT'] = self.events_site.port
-        with self.assertNumQueries(1):
+        with self.assertNumQueries(0):
             self.assertEqual(Site.find_for_request(request), self.events_site)
 
     def test_ports_in_request_headers_are_respected(self):
@@ -129,7 +144,7 @@ class TestSiteRouting(TestCase):
         request.path = '/'
         request.META['HTTP_HOST'] = self.alternate_port_events_site.hostname
         request.META['SERVER_PORT'] = self.alternate_port_events_site.port
-        with self.assertNumQueries(1):
+        with self.assertNumQueries(0):
             self.assertEqual(Site.find_for_request(request), self.alternate_port_events_site)
 
     def test_unrecognised_host_header_routes_to_default_site(self):
@@ -138,7 +153,7 @@ class TestSiteRouting(TestCase):
         request.path = '/'
         request.META['HTTP_HOST'] = self.unrecognised_hostname
         request.META['SERVER_PORT'] = '80'
-        with self.assertNumQueries(1):
+        with self.assertNumQueries(0):
             self.assertEqual(Site.find_for_request(request), self.default_site)
 
     def test_unrecognised_port_and_default_host_routes_to_default_site(self):
@@ -147,7 +162,7 @@ class TestSiteRouting(TestCase):
         request.path = '/'
         request.META['HTTP_HOST'] = self.default_site.hostname
         request.META['SERVER_PORT'] = self.unrecognised_port
-        with self.assertNumQueries(1):
+        with self.assertNumQueries(0):
             self.assertEqual(Site.find_for_request(request), self.default_site)
 
     def test_unrecognised_port_and_unrecognised_host_routes_to_default_site(self):
@@ -157,7 +172,7 @@ class TestSiteRouting(TestCase):
         request.path = '/'
         request.META['HTTP_HOST'] = self.unrecognised_hostname
         request.META['SERVER_PORT'] = self.unrecognised_port
-        with self.assertNumQueries(1):
+        with self.assertNumQueries(0):
             self.assertEqual(Site.find_for_request(request), self.default_site)
 
     def test_unrecognised_port_on_known_hostname_routes_there_if_no_ambiguity(self):
@@ -167,7 +182,7 @@ class TestSiteRouting(TestCase):
         request.path = '/'
         request.META['HTTP_HOST'] = self.about_site.hostname
         request.META['SERVER_PORT'] = self.unrecognised_port
-        with self.assertNumQueries(1):
+        with self.assertNumQueries(0):
             self.assertEqual(Site.find_for_request(request), self.about_site)
 
     def test_unrecognised_port_on_known_hostname_routes_to_default_site_if_ambiguity(self):
@@ -178,7 +193,7 @@ class TestSiteRouting(TestCase):
         request.path = '/'
         request.META['HTTP_HOST'] = self.events_site.hostname
         request.META['SERVER_PORT'] = self.unrecognised_port
-        with self.assertNumQueries(1):
+        with self.assertNumQueries(0):
             self.assertEqual(Site.find_for_request(request), self.default_site)
 
     def test_port_in_http_host_header_is_ignored(self):
@@ -187,7 +202,7 @@ class TestSiteRouting(TestCase):
         request.path = '/'
         request.META['HTTP_HOST'] = "%s:%s" % (self.events_site.hostname, self.events_site.port)
         request.META['SERVER_PORT'] = self.alternate_port_events_site.port
-        with self.assertNumQueries(1):
+        with self.assertNumQueries(0):
             self.assertEqual(Site.find_for_request(request), self.alternate_port_events_site)
 
 
@@ -331,6 +346,71 @@ class TestRouting(TestCase):
         with self.assertRaises(Http404):
             homepage.route(request, ['events', 'tentative-unpublished-event'])
 
+    def test_route_by_url_path(self):
+        homepage = Page.objects.get(url_path='/home/')
+        underpants_page = EventPage.objects.get(url_path='/home/secret-plans/steal-underpants/')
+
+        request = HttpRequest()
+        request.path = '/secret-plans/steal-underpants/'
+
+        # One query to find the pages along the path, and one to fetch the specific page
+        with self.assertNumQueries(2):
+            (found_page, args, kwargs) = homepage.route_by_url_path(request, ['secret-plans', 'steal-underpants'])
+
+        self.assertEqual(found_page, underpants_page)
+        self.assertIsInstance(found_page, EventPage)
+
+    def test_route_by_url_path_to_root(self):
+        homepage = Page.objects.get(url_path='/home/')
+
+        request = HttpRequest()
+        request.path = '/'
+        (found_page, args, kwargs) = homepage.route_by_url_path(request, [])
+        self.assertEqual(found_page, homepage)
+
+    def test_route_by_url_path_uses_custom_route_methods(self):
+        homepage = Page.objects.get(url_path='/home/')
+        christmas_page = EventPage.objects.get(url_path='/home/events/christmas/')
+        saint_patrick_page = SingleEventPage.objects.get(url_path='/home/events/saint-patrick/')
+
+        request = HttpRequest()
+        request.path = '/events/christmas/'
+        (found_page, args, kwargs) = homepage.route_by_url_path(request, ['events', 'christmas'])
+        self.assertEqual(found_page, christmas_page)
+
+        # SingleEventPage's route method accepts an extra path component
+        request.path = '/events/saint-patrick/pointless-suffix/'
+        (found_page, args, kwargs) = homepage.route_by_url_path(
+            request, ['events', 'saint-patrick', 'pointless-suffix']
+        )
+        self.assertEqual(found_page, saint_patrick_page)
+
+    def test_route_by_url_path_with_stale_url_path(self):
+        homepage = Page.objects.get(url_path='/home/')
+        underpants_page = EventPage.objects.get(url_path='/home/secret-plans/steal-underpants/')
+        Page.objects.filter(url_path='/home/secret-plans/').update(url_path='/home/secret-plans-old/')
+
+        request = HttpRequest()
+        request.path = '/secret-plans/steal-underpants/'
+        (found_page, args, kwargs) = homepage.route_by_url_path(request, ['secret-plans', 'steal-underpants'])
+        self.assertEqual(found_page, underpants_page)
+
+    def test_route_by_url_path_to_unknown_page_returns_404(self):
+        homepage = Page.objects.get(url_path='/home/')
+
+        request = HttpRequest()
+        request.path = '/secret-plans/quinquagesima/'
+        with self.assertRaises(Http404):
+            homepage.route_by_url_path(request, ['secret-plans', 'quinquagesima'])
+
+    def test_route_by_url_path_to_unpublished_page_returns_404(self):
+        homepage = Page.objects.get(url_path='/home/')
+
+        request = HttpRequest()
+        request.path = '/events/tentative-unpublished-event/'
+        with self.assertRaises(Http404):
+            homepage.route_by_url_path(request, ['events', 'tentative-unpublished-event'])
+
 
 class TestServeView(TestCase):
     fixtures = ['test.json']
@@ -1,6 +1,7 @@
 from __future__ import absolute_import, unicode_literals
 
-from django.test import TestCase
+from django.core.urlresolvers import NoReverseMatch, clear_url_caches
+from django.test import TestCase, override_settings
 
 from wagtail.tests.testapp.models import EventPage, SimplePage, SingleEventPage
 from wagtail.wagtailcore.models import Page, PageViewRestriction, Site
@@ -676,3 +677,101 @@ class TestFirstCommonAncestor(TestCase):
     def test_empty_queryset_strict(self):
         with self.assertRaises(Page.DoesNotExist):
             Page.objects.none().first_common_ancestor(strict=True)
+
+
+class TestWithUrls(TestCase):
+    fixtures = ['test.json']
+
+    def setUp(self):
+        # need to clear urlresolver caches before/after tests, because we override
+        # ROOT_URLCONF in some tests here
+        clear_url_caches()
+
+    def tearDown(self):
+        clear_url_caches()
+
+    def assertUrlPartsMatch(self, queryset):
+        pages = queryset.with_urls()
+        self.assertEqual(len(pages), queryset.count())
+
+        for page in pages:
+            expected_page = Page.objects.get(id=page.id)
+            self.assertEqual(page.get_url_parts(), expected_page.get_url_parts())
+
+    def test_with_urls(self):
+        self.assertUrlPartsMatch(Page.objects.all())
+
+    def test_with_urls_with_multiple_sites(self):
+        events_page = Page.objects.get(url_path='/home/events/')
+        Site.objects.create(hostname='events.example.com', root_page=events_page)
+        Site.objects.create(hostname='events.example.com', port=8080, root_page=events_page)
+
+        self.assertUrlPartsMatch(Page.objects.all())
+
+        christmas_page = Page.objects.all().filter(url_path='/home/events/christmas/').with_urls()[0]
+        self.assertEqual(christmas_page.url, 'http://events.example.com/christmas/')
+
+    @override_settings(ROOT_URLCONF='wagtail.tests.non_root_urls')
+    def test_with_urls_with_non_root_urls(self):
+        self.assertUrlPartsMatch(Page.objects.all())
+
+        christmas_page = Page.objects.all().filter(url_path='/home/events/christmas/').with_urls()[0]
+        self.assertEqual(christmas_page.url, '/site/events/christmas/')
+
+    def add_page_with_url_path(self, url_path):
+        page = Page.objects.get(url_path='/home/events/').add_child(
+            instance=Page(title="Test", slug='test-%d' % Page.objects.count())
+        )
+
+        # Slugs like these don't pass validation, but can be made by custom
+        # set_url_path methods
+        Page.objects.filter(id=page.id).update(url_path=url_path)
+        return Page.objects.get(id=page.id)
+
+    def test_with_urls_quotes_paths_like_url(self):
+        for slug in ['caf\xe9', 'stra\xdfe', '\u65e5\u672c\u8a9e', 'under_score', 'a-b']:
+            self.add_page_with_url_path('/home/events/%s/' % slug)
+
+        pages = Page.objects.filter(title="Test").with_urls()
+        self.assertEqual(len(pages), 5)
+        for page in pages:
+            self.assertEqual(page.url, Page.objects.get(id=page.id).url)
+
+        page = Page.objects.get(url_path='/home/events/caf\xe9/')
+        self.assertEqual(page.url, '/events/caf%C3%A9/')
+
+    def test_with_urls_rejects_paths_like_url(self):
+        page = self.add_page_with_url_path('/home/events/a+b@c/')
+
+        # The wagtail_serve URL pattern doesn't match reserved characters
+        with self.assertRaises(NoReverseMatch):
+            page.url
+        with self.assertRaises(NoReverseMatch):
+            Page.objects.filter(id=page.id).with_urls()
+
+    def test_with_urls_on_specific_pages(self):
+        pages = Page.objects.filter(url_path__startswith='/home/events/').specific().with_urls()
+        urls = {page.title: page.relative_url(Site.objects.get()) for page in pages}
+
+        self.assertEqual(urls['Christmas'], '/events/christmas/')
+
+        # SingleEventPage's custom get_url_parts method is still applied
+        self.assertEqual(urls['Saint Patrick'], '/events/saint-patrick/pointless-suffix/')
+
+    def test_with_urls_does_not_query_site_root_paths_again(self):
+        site = Site.objects.get()
+        pages = Page.objects.live().with_urls()
+
+        with self.assertNumQueries(0):
+            for page in pages:
+                page.relative_url(site)
+
+    def test_changing_url_path_discards_precomputed_url(self):
+        page = Page.objects.filter(url_path='/home/events/christmas/').with_urls()[0]
+        page.slug = 'xmas'
+        page.set_url_path(page.get_parent())
+
+        self.assertEqual(page.relative_url(Site.objects.get()), '/events/xmas/')
+
+    def test_with_urls_on_empty_queryset(self):
+        self.assertEqual(Page.objects.none().with_urls(), [])
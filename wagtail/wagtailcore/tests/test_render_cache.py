@@ -0,0 +1,197 @@
+from __future__ import absolute_import, unicode_literals
+
+import json
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from mock import patch
+
+from wagtail.tests.testapp.models import Advert, StreamModel
+from wagtail.wagtailcore import blocks
+from wagtail.wagtailcore.models import Page, Site
+from wagtail.wagtailcore.render_cache import (
+    get_block_definition_key, get_cached_render, mark_render_uncacheable)
+from wagtail.wagtailcore.rich_text import RichText
+from wagtail.wagtailcore.templatetags.wagtailcore_tags import richtext
+from wagtail.wagtailimages.models import Image
+from wagtail.wagtailimages.tests.utils import get_test_image_file
+
+
+class TestRenderCacheDisabled(TestCase):
+    def test_render_is_called_every_time(self):
+        calls = []
+
+        def render():
+            calls.append(1)
+            return '<p>hello</p>'
+
+        self.assertEqual(get_cached_render('test', 'hello', render), '<p>hello</p>')
+        self.assertEqual(get_cached_render('test', 'hello', render), '<p>hello</p>')
+        self.assertEqual(len(calls), 2)
+
+
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'wagtail-render-cache-tests-default',
+        },
+        'renders': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'wagtail-render-cache-tests',
+        },
+    },
+    WAGTAIL_RENDER_CACHE='renders',
+)
+class TestRenderCache(TestCase):
+    fixtures = ['test.json']
+
+    def setUp(self):
+        caches['renders'].clear()
+
+        # Warm up the site root paths cache, so that it doesn't affect query counts
+        Site.get_site_root_paths()
+
+        self.events_page = Page.objects.get(url_path='/home/events/')
+        self.source = '<p><a linktype="page" id="%d">Events</a></p>' % self.events_page.id
+
+    def test_get_cached_render(self):
+        calls = []
+
+        def render():
+            calls.append(1)
+            return '<p>hello</p>'
+
+        self.assertEqual(get_cached_render('test', 'hello', render), '<p>hello</p>')
+        self.assertEqual(get_cached_render('test', 'hello', render), '<p>hello</p>')
+        self.assertEqual(len(calls), 1)
+
+        # Different source and different namespaces are cached separately
+        get_cached_render('test', 'goodbye', render)
+        get_cached_render('other', 'hello', render)
+        self.assertEqual(len(calls), 3)
+
+    def test_mark_render_uncacheable(self):
+        calls = []
+
+        def render_inner():
+            calls.append('inner')
+            mark_render_uncacheable()
+            return '<p>placeholder</p>'
+
+        def render_outer():
+            calls.append('outer')
+            return '<div>%s</div>' % get_cached_render('test', 'inner', render_inner)
+
+        get_cached_render('test', 'outer', render_outer)
+        get_cached_render('test', 'outer', render_outer)
+
+        # Neither the inner rendering nor the one containing it are cached
+        self.assertEqual(calls, ['outer', 'inner', 'outer', 'inner'])
+
+        # Other renderings are unaffected
+        get_cached_render('test', 'hello', lambda: calls.append('hello') or '<p>hello</p>')
+        get_cached_render('test', 'hello', lambda: calls.append('hello') or '<p>hello</p>')
+        self.assertEqual(calls.count('hello'), 1)
+
+    def test_rich_text(self):
+        html = RichText(self.source).__html__()
+        self.assertEqual(html, '<div class="rich-text"><p><a href="/events/">Events</a></p></div>')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(RichText(self.source).__html__(), html)
+
+    def test_richtext_filter(self):
+        html = richtext(self.source)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(richtext(self.source), html)
+
+    def test_page_change_invalidates(self):
+        RichText(self.source).__html__()
+
+        self.events_page.slug = 'whats-on'
+        self.events_page.save()
+
+        self.assertEqual(
+            RichText(self.source).__html__(),
+            '<div class="rich-text"><p><a href="/whats-on/">Events</a></p></div>'
+        )
+
+    def test_saving_draft_does_not_invalidate(self):
+        RichText(self.source).__html__()
+
+        self.events_page.slug = 'whats-on'
+        self.events_page.save_revision()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                RichText(self.source).__html__(),
+                '<div class="rich-text"><p><a href="/events/">Events</a></p></div>'
+            )
+
+    def test_snippet_change_invalidates(self):
+        RichText(self.source).__html__()
+
+        Advert.objects.create(url='http://www.example.com', text="Test advert")
+
+        with patch('wagtail.wagtailcore.rich_text.expand_db_html', return_value='') as expand_db_html:
+            RichText(self.source).__html__()
+
+        self.assertTrue(expand_db_html.called)
+
+    def test_image_change_invalidates(self):
+        RichText(self.source).__html__()
+
+        Image.objects.create(title='Test image', file=get_test_image_file())
+
+        with patch('wagtail.wagtailcore.rich_text.expand_db_html', return_value='') as expand_db_html:
+            RichText(self.source).__html__()
+
+        self.assertTrue(expand_db_html.called)
+
+    def test_stream_value(self):
+        instance = StreamModel.objects.create(body=json.dumps([
+            {'type': 'text', 'value': 'foo'},
+            {'type': 'rich_text', 'value': self.source},
+        ]))
+        instance = StreamModel.objects.get(pk=instance.pk)
+        html = instance.body.__html__()
+
+        # The key is made from the JSON loaded from the database, without encoding the
+        # stream again
+        instance = StreamModel.objects.get(pk=instance.pk)
+        with self.assertNumQueries(0), patch('wagtail.wagtailcore.blocks.stream_block.json.dumps') as dumps:
+            self.assertEqual(instance.body.__html__(), html)
+
+        self.assertFalse(dumps.called)
+
+        self.assertIn('<a href="/events/">Events</a>', html)
+
+        # Non-lazy stream values with the same content share the cached rendering
+        stream_block = instance.body.stream_block
+        value = stream_block.to_python([
+            {'type': 'text', 'value': 'foo'},
+            {'type': 'rich_text', 'value': self.source},
+        ])
+        with patch.object(stream_block, 'render') as render:
+            self.assertEqual(value.__html__(), html)
+
+        self.assertFalse(render.called)
+
+    def test_block_definition_key(self):
+        block = blocks.StreamBlock([
+            ('heading', blocks.CharBlock(label="Heading")),
+            ('paragraph', blocks.RichTextBlock()),
+        ])
+        same_block = blocks.StreamBlock([
+            ('heading', blocks.CharBlock(label="Heading")),
+            ('paragraph', blocks.RichTextBlock()),
+        ])
+        different_block = blocks.StreamBlock([
+            ('heading', blocks.CharBlock(label="Title")),
+            ('paragraph', blocks.RichTextBlock()),
+        ])
+
+        self.assertEqual(get_block_definition_key(block), get_block_definition_key(same_block))
+        self.assertNotEqual(get_block_definition_key(block), get_block_definition_key(different_block))
@@ -4,9 +4,10 @@ from bs4 import BeautifulSoup
 from django.test import TestCase
 from mock import patch
 
-from wagtail.wagtailcore.models import Page
+from wagtail.wagtailcore.models import Page, Site
 from wagtail.wagtailcore.rich_text import (
-    DbWhitelister, PageLinkHandler, RichText, expand_db_html, extract_attrs)
+    LINK_HANDLERS, DbWhitelister, PageLinkHandler, RichText, expand_db_html, extract_attrs,
+    supports_bulk_expansion)
 
 
 class TestPageLinkHandler(TestCase):
@@ -53,6 +54,49 @@ class TestPageLinkHandler(TestCase):
         )
         self.assertEqual(result, '<a href="None">')
 
+    def test_bulk_expand_db_attributes(self):
+        events_page_id = Page.objects.get(url_path='/home/events/').pk
+        christmas_page_id = Page.objects.get(url_path='/home/events/christmas/').pk
+
+        # Warm up the site root paths cache
+        Site.get_site_root_paths()
+
+        # One query for the pages, and one for the site root paths
+        with self.assertNumQueries(2):
+            result = PageLinkHandler.bulk_expand_db_attributes(
+                [{'id': str(events_page_id)}, {'id': '0'}, {'id': str(christmas_page_id)}, {'id': '1'}],
+                False
+            )
+
+        self.assertEqual(result, [
+            '<a href="/events/">',
+            '<a>',
+            '<a href="/events/christmas/">',
+            '<a href="None">',
+        ])
+
+    def test_bulk_expand_db_attributes_for_editor(self):
+        events_page_id = Page.objects.get(url_path='/home/events/').pk
+        christmas_page_id = Page.objects.get(url_path='/home/events/christmas/').pk
+
+        # Warm up the site root paths cache
+        Site.get_site_root_paths()
+
+        # One query for the pages, one for their parents, and one for the site root paths
+        with self.assertNumQueries(3):
+            result = PageLinkHandler.bulk_expand_db_attributes(
+                [{'id': str(events_page_id)}, {'id': str(christmas_page_id)}, {'id': '1'}],
+                True
+            )
+
+        self.assertEqual(result, [
+            '<a data-linktype="page" data-id="%d" data-parent-id="2" href="/events/">' % events_page_id,
+            '<a data-linktype="page" data-id="%d" data-parent-id="%d" href="/events/christmas/">' % (
+                christmas_page_id, events_page_id
+            ),
+            '<a data-linktype="page" data-id="1" href="None">',
+        ])
+
 
 class TestDbWhiteLister(TestCase):
     def test_clean_tag_node_div(self):
@@ -123,6 +167,64 @@ class TestExpandDbHtml(TestCase):
         self.assertIn('test html', result)
 
 
+class TestExpandDbHtmlBulk(TestCase):
+    fixtures = ['test.json']
+
+    def test_expand_db_html_fetches_pages_in_bulk(self):
+        html = ''.join(
+            '<p><a linktype="page" id="%d">%s</a></p>' % (page.id, page.title)
+            for page in Page.objects.filter(url_path__startswith='/home/events/')
+        )
+
+        # Warm up the site root paths cache
+        Site.get_site_root_paths()
+
+        # One query for the pages, and one for the site root paths
+        with self.assertNumQueries(2):
+            result = expand_db_html(html)
+
+        self.assertIn('<a href="/events/christmas/">Christmas</a>', result)
+        self.assertIn('<a href="/events/final-event/">Ameristralia Day</a>', result)
+
+    def test_expand_db_html_preserves_order(self):
+        html = (
+            '<a linktype="page" id="4">Christmas</a>'
+            '<a href="http://example.com">External</a>'
+            '<a linktype="page" id="3">Events</a>'
+            '<a linktype="page" id="4">Christmas again</a>'
+        )
+        result = expand_db_html(html)
+        self.assertEqual(
+            result,
+            '<a href="/events/christmas/">Christmas</a>'
+            '<a href="http://example.com">External</a>'
+            '<a href="/events/">Events</a>'
+            '<a href="/events/christmas/">Christmas again</a>'
+        )
+
+    def test_supports_bulk_expansion(self):
+        class CustomPageLinkHandler(PageLinkHandler):
+            @staticmethod
+            def expand_db_attributes(attrs, for_editor):
+                return '<a href="/custom/">'
+
+        class CustomBulkPageLinkHandler(CustomPageLinkHandler):
+            @staticmethod
+            def bulk_expand_db_attributes(attrs_list, for_editor):
+                return ['<a href="/custom-bulk/">' for attrs in attrs_list]
+
+        self.assertTrue(supports_bulk_expansion(PageLinkHandler))
+        self.assertTrue(supports_bulk_expansion(CustomBulkPageLinkHandler))
+
+        # A subclass that only overrides expand_db_attributes must not have
+        # its override bypassed by the inherited bulk method
+        self.assertFalse(supports_bulk_expansion(CustomPageLinkHandler))
+
+        with patch.dict(LINK_HANDLERS, {'page': CustomPageLinkHandler}):
+            result = expand_db_html('<a linktype="page" id="4">Christmas</a>')
+        self.assertEqual(result, '<a href="/custom/">Christmas</a>')
+
+
 class TestRichTextValue(TestCase):
     fixtures = ['test.json']
 
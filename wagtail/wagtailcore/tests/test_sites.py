@@ -1,10 +1,14 @@
 from __future__ import absolute_import, unicode_literals
 
+import time
+
+import mock
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.http.request import HttpRequest
 from django.test import TestCase, override_settings
 
-from wagtail.wagtailcore.models import Page, Site
+from wagtail.wagtailcore.models import SITE_LOOKUP_VERSION_CACHE_KEY, Page, Site
 
 
 class TestSiteNaturalKey(TestCase):
@@ -124,3 +128,184 @@ class TestDefaultSite(TestCase):
         with self.assertRaises(Site.MultipleObjectsReturned):
             # If there already are multiple default sites, you're in trouble
             site.clean_fields()
+
+
+@override_settings(
+    ALLOWED_HOSTS=['example.com', 'other.com', 'unknown.com'],
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'wagtail-site-lookup-tests',
+        }
+    }
+)
+class TestSiteLookupTable(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.default_site = Site.objects.get()
+        self.root_page = Page.objects.get(pk=2)
+
+    def tearDown(self):
+        Site.clear_lookup_table()
+
+    def get_request(self, hostname, port=80):
+        request = HttpRequest()
+        request.META = {'SERVER_NAME': hostname, 'SERVER_PORT': port}
+        return request
+
+    def later(self, seconds):
+        return mock.patch('wagtail.wagtailcore.models.time', mock.Mock(time=lambda: time.time() + seconds))
+
+    def test_find_for_request_does_not_query_database(self):
+        # Warm up the lookup table
+        Site.find_for_request(self.get_request('example.com'))
+
+        with self.assertNumQueries(0):
+            site = Site.find_for_request(self.get_request('example.com'))
+
+        self.assertEqual(site, self.default_site)
+
+        # The root page is loaded along with the site
+        with self.assertNumQueries(0):
+            self.assertEqual(site.root_page.id, self.default_site.root_page_id)
+
+    def test_hostname_and_port(self):
+        site = Site.objects.create(hostname='example.com', port=8080, root_page=self.root_page)
+        Site.objects.create(hostname='example.com', port=80, root_page=self.root_page)
+
+        self.assertEqual(Site.find_for_request(self.get_request('example.com', 8080)), site)
+
+    def test_hostname_and_default(self):
+        Site.objects.create(hostname='example.com', port=8080, root_page=self.root_page)
+        self.default_site.hostname = 'example.com'
+        self.default_site.save()
+
+        self.assertEqual(Site.find_for_request(self.get_request('example.com', 8081)), self.default_site)
+
+    def test_unique_hostname(self):
+        site = Site.objects.create(hostname='example.com', port=8080, root_page=self.root_page)
+
+        self.assertEqual(Site.find_for_request(self.get_request('example.com')), site)
+
+    def test_ambiguous_hostname_falls_back_to_default(self):
+        Site.objects.create(hostname='example.com', port=8080, root_page=self.root_page)
+        Site.objects.create(hostname='example.com', port=8081, root_page=self.root_page)
+
+        self.assertEqual(Site.find_for_request(self.get_request('example.com')), self.default_site)
+
+    def test_no_match_without_default(self):
+        self.default_site.is_default_site = False
+        self.default_site.save()
+
+        with self.assertRaises(Site.DoesNotExist):
+            Site.find_for_request(self.get_request('example.com'))
+
+    def test_invalidated_on_save(self):
+        self.assertEqual(Site.find_for_request(self.get_request('other.com')), self.default_site)
+
+        site = Site.objects.create(hostname='other.com', root_page=self.root_page)
+
+        self.assertEqual(Site.find_for_request(self.get_request('other.com')), site)
+
+    def test_invalidated_on_delete(self):
+        site = Site.objects.create(hostname='other.com', root_page=self.root_page)
+        self.assertEqual(Site.find_for_request(self.get_request('other.com')), site)
+
+        site.delete()
+
+        self.assertEqual(Site.find_for_request(self.get_request('other.com')), self.default_site)
+
+    def test_invalidated_on_root_page_save(self):
+        site = Site.find_for_request(self.get_request('example.com'))
+        self.assertEqual(site.root_page.title, "Welcome to your new Wagtail site!")
+
+        root_page = Page.objects.get(id=site.root_page_id)
+        root_page.title = "New title"
+        root_page.save()
+
+        site = Site.find_for_request(self.get_request('example.com'))
+        self.assertEqual(site.root_page.title, "New title")
+
+    def test_invalidated_by_other_process(self):
+        site = Site.objects.create(hostname='other.com', root_page=self.root_page)
+        self.assertEqual(Site.find_for_request(self.get_request('other.com')), site)
+
+        # Bulk updates don't send signals, so this process doesn't notice the change
+        Site.objects.filter(id=site.id).update(hostname='example.com')
+        self.assertEqual(Site.find_for_request(self.get_request('other.com')), site)
+
+        # Another process invalidating the table replaces the version key in the shared cache
+        cache.delete(SITE_LOOKUP_VERSION_CACHE_KEY)
+        self.assertEqual(Site.find_for_request(self.get_request('other.com')), self.default_site)
+
+    def test_invalidated_again_on_commit(self):
+        with mock.patch('django.db.transaction.on_commit') as on_commit:
+            Site.objects.create(hostname='other.com', root_page=self.root_page)
+
+        # Requests served before the change is committed may rebuild the table with the
+        # old sites, so it is discarded again when the transaction commits
+        Site.find_for_request(self.get_request('other.com'))
+        self.assertIsNotNone(cache.get(SITE_LOOKUP_VERSION_CACHE_KEY))
+
+        for call in on_commit.call_args_list:
+            call[0][0]()
+
+        self.assertIsNone(cache.get(SITE_LOOKUP_VERSION_CACHE_KEY))
+
+    @override_settings(CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        }
+    })
+    def test_dummy_cache(self):
+        # Warm up the lookup table
+        Site.find_for_request(self.get_request('example.com'))
+
+        # The table is kept in this process, even though the cache doesn't store its version
+        with self.assertNumQueries(0):
+            self.assertEqual(Site.find_for_request(self.get_request('example.com')), self.default_site)
+
+        site = Site.objects.create(hostname='other.com', root_page=self.root_page)
+
+        self.assertEqual(Site.find_for_request(self.get_request('other.com')), site)
+
+    def test_does_not_expire_with_shared_cache(self):
+        Site.find_for_request(self.get_request('example.com'))
+
+        # The version in the shared cache is enough to tell when the table is out of date
+        with self.later(3600), self.assertNumQueries(1):
+            Site.find_for_request(self.get_request('example.com'))
+
+    @override_settings(CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+            'TIMEOUT': 60,
+        }
+    })
+    def test_expires_with_dummy_cache(self):
+        site = Site.objects.create(hostname='other.com', root_page=self.root_page)
+        self.assertEqual(Site.find_for_request(self.get_request('other.com')), site)
+
+        # Other processes can't tell this one about changes through a dummy cache
+        Site.objects.filter(id=site.id).update(hostname='example.com')
+        self.assertEqual(Site.find_for_request(self.get_request('other.com')), site)
+
+        # So the table is rebuilt once the cache's timeout has passed
+        with self.later(61):
+            self.assertEqual(Site.find_for_request(self.get_request('other.com')), self.default_site)
+
+    @override_settings(CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'test-site-lookup-table',
+        }
+    })
+    def test_expires_with_local_memory_cache(self):
+        site = Site.objects.create(hostname='other.com', root_page=self.root_page)
+        self.assertEqual(Site.find_for_request(self.get_request('other.com')), site)
+
+        Site.objects.filter(id=site.id).update(hostname='example.com')
+        self.assertEqual(Site.find_for_request(self.get_request('other.com')), site)
+
+        with self.later(301):
+            self.assertEqual(Site.find_for_request(self.get_request('other.com')), self.default_site)
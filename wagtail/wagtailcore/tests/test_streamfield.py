@@ -114,6 +114,41 @@ class TestLazyStreamField(TestCase):
             assert instance.body[1].value is None
             assert instance.body[2].value.title == 'Test image 3'
 
+    def test_children_converted_on_access(self):
+        instance = StreamModel.objects.get(pk=self.with_image.pk)
+
+        self.assertEqual(len(instance.body), 2)
+
+        # No children have been converted to their native values yet
+        self.assertEqual(instance.body._bound_blocks, {})
+
+        self.assertEqual(instance.body[1].value, 'foo')
+        self.assertEqual(list(instance.body._bound_blocks.keys()), [1])
+
+    def test_malformed_child_falls_back_on_raw_text(self):
+        json_text = '[{"type": "text", "value": "foo"}, {"type": "text", "value": }]'
+        instance = StreamModel.objects.create(body=json_text)
+        instance = StreamModel.objects.get(pk=instance.pk)
+
+        self.assertEqual(len(instance.body), 0)
+        self.assertEqual(instance.body.raw_text, json_text)
+
+    def test_unknown_block_types_are_skipped(self):
+        instance = StreamModel.objects.create(body=json.dumps([
+            {'type': 'text', 'value': 'foo'},
+            {'type': 'oldblock', 'value': 'bar'},
+            {'type': 'text', 'value': 'baz'}]))
+        instance = StreamModel.objects.get(pk=instance.pk)
+
+        self.assertEqual(len(instance.body), 2)
+        self.assertEqual(instance.body[1].value, 'baz')
+
+    def test_null_body(self):
+        instance = StreamModel.objects.create(body='null')
+        instance = StreamModel.objects.get(pk=instance.pk)
+
+        self.assertEqual(len(instance.body), 0)
+
 
 class TestSystemCheck(TestCase):
     def tearDown(self):
@@ -1,10 +1,16 @@
 from __future__ import absolute_import, unicode_literals
 
+import warnings
+
+import mock
 from django.core.cache import cache
+from django.template import Context, Template
 from django.test import TestCase
+from django.test.client import RequestFactory
 from django.utils.safestring import SafeText
 
 from wagtail.tests.testapp.models import SimplePage
+from wagtail.utils.deprecation import RemovedInWagtail112Warning
 from wagtail.wagtailcore.models import Page, Site
 from wagtail.wagtailcore.templatetags.wagtailcore_tags import richtext
 from wagtail.wagtailcore.utils import resolve_model_string
@@ -25,6 +31,45 @@ class TestPageUrlTags(TestCase):
         self.assertContains(response,
                             '<a href="/events/">Back to events index</a>')
 
+    def test_pageurl_caches_site_root_paths_on_request(self):
+        page = Page.objects.get(url_path='/home/events/christmas/')
+        request = RequestFactory().get('/')
+        request.site = Site.objects.get()
+        template = Template('{% load wagtailcore_tags %}{% pageurl page %}')
+
+        self.assertEqual(template.render(Context({'page': page, 'request': request})), '/events/christmas/')
+        self.assertEqual(request._wagtail_cached_site_root_paths, [(1, '/home/', 'http://localhost')])
+
+        # Further URLs within the same request don't need to look up the site root paths
+        with self.assertNumQueries(0):
+            self.assertEqual(template.render(Context({'page': page, 'request': request})), '/events/christmas/')
+
+    def test_pageurl_with_old_style_get_url_parts(self):
+        page = Page.objects.get(url_path='/home/events/christmas/')
+        page.get_url_parts = lambda: (1, 'http://localhost', '/custom-url/')
+        request = RequestFactory().get('/')
+        request.site = Site.objects.get()
+        template = Template('{% load wagtailcore_tags %}{% pageurl page %}')
+
+        with warnings.catch_warnings(record=True) as ws:
+            warnings.simplefilter('always')
+            result = template.render(Context({'page': page, 'request': request}))
+
+        self.assertEqual(result, '/custom-url/')
+        self.assertEqual(len(ws), 1)
+        self.assertIs(ws[0].category, RemovedInWagtail112Warning)
+
+    def test_get_url_parts_signature_is_inspected_once(self):
+        page = Page.objects.get(url_path='/home/events/christmas/')
+        request = RequestFactory().get('/')
+        request.site = Site.objects.get()
+        page.relative_url(request.site, request)
+
+        with mock.patch('wagtail.wagtailcore.models.accepts_kwarg') as accepts_kwarg:
+            self.assertEqual(page.relative_url(request.site, request), '/events/christmas/')
+
+        self.assertFalse(accepts_kwarg.called)
+
 
 class TestSiteRootPathsCache(TestCase):
     fixtures = ['test.json']
@@ -16,3 +16,4 @@ class DocumentsAPIEndpoint(BaseAPIEndpoint):
     nested_default_fields = BaseAPIEndpoint.nested_default_fields + ['title', 'download_url']
     name = 'documents'
     model = get_document_model()
+    cache_responses = True
@@ -15,12 +15,30 @@ class DocumentLinkHandler(object):
         Document = get_document_model()
         try:
             doc = Document.objects.get(id=attrs['id'])
+            return DocumentLinkHandler.expand_document(doc, for_editor)
+        except Document.DoesNotExist:
+            return "<a>"
+
+    @staticmethod
+    def bulk_expand_db_attributes(attrs_list, for_editor):
+        Document = get_document_model()
+        docs = Document.objects.in_bulk(set(attrs['id'] for attrs in attrs_list))
 
-            if for_editor:
-                editor_attrs = 'data-linktype="document" data-id="%d" ' % doc.id
+        results = []
+        for attrs in attrs_list:
+            doc = docs.get(int(attrs['id']))
+            if doc is None:
+                results.append("<a>")
             else:
-                editor_attrs = ''
+                results.append(DocumentLinkHandler.expand_document(doc, for_editor))
 
-            return '<a %shref="%s">' % (editor_attrs, escape(doc.url))
-        except Document.DoesNotExist:
-            return "<a>"
+        return results
+
+    @staticmethod
+    def expand_document(doc, for_editor):
+        if for_editor:
+            editor_attrs = 'data-linktype="document" data-id="%d" ' % doc.id
+        else:
+            editor_attrs = ''
+
+        return '<a %shref="%s">' % (editor_attrs, escape(doc.url))
@@ -1,8 +1,9 @@
 from __future__ import absolute_import, unicode_literals
 
-from django.db.models.signals import post_delete
+from django.db.models.signals import post_delete, post_save
 
-from wagtail.wagtaildocs.models import Document
+from wagtail.wagtailcore.render_cache import invalidate_render_cache
+from wagtail.wagtaildocs.models import Document, get_document_model
 
 
 # Receive the post_delete signal and delete the file associated with the model instance.
@@ -11,5 +12,13 @@ def post_delete_document_file_cleanup(sender, instance, **kwargs):
     instance.file.delete(False)
 
 
+def document_changed_invalidate_render_cache(sender, instance, **kwargs):
+    invalidate_render_cache()
+
+
 def register_signal_handlers():
     post_delete.connect(post_delete_document_file_cleanup, sender=Document)
+
+    document_model = get_document_model()
+    post_save.connect(document_changed_invalidate_render_cache, sender=document_model)
+    post_delete.connect(document_changed_invalidate_render_cache, sender=document_model)
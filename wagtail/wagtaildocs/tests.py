@@ -1186,6 +1186,19 @@ class TestDocumentRichTextLinkHandler(TestCase):
         self.assertEqual(result,
                          '<a href="/documents/1/test.pdf">')
 
+    def test_bulk_expand_db_attributes(self):
+        with self.assertNumQueries(1):
+            result = DocumentLinkHandler.bulk_expand_db_attributes(
+                [{'id': '1'}, {'id': '0'}, {'id': '1'}],
+                True
+            )
+
+        self.assertEqual(result, [
+            '<a data-linktype="document" data-id="1" href="/documents/1/test.pdf">',
+            '<a>',
+            '<a data-linktype="document" data-id="1" href="/documents/1/test.pdf">',
+        ])
+
 
 class TestEditOnlyPermissions(TestCase, WagtailTestUtils):
     def setUp(self):
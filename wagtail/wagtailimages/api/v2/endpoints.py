@@ -16,3 +16,4 @@ class ImagesAPIEndpoint(BaseAPIEndpoint):
     nested_default_fields = BaseAPIEndpoint.nested_default_fields + ['title']
     name = 'images'
     model = get_image_model()
+    cache_responses = True
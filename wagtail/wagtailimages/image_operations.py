@@ -7,6 +7,10 @@ from wagtail.wagtailimages.rect import Rect
 
 
 class Operation(object):
+    # Set to True on operations that only ever scale the image uniformly, or leave it
+    # unchanged. See Filter.is_uniform_scale.
+    uniform_scale = False
+
     def __init__(self, method, *args):
         self.method = method
         self.args = args
@@ -31,6 +35,8 @@ class Operation(object):
 
 
 class DoNothingOperation(Operation):
+    uniform_scale = True
+
     def construct(self):
         pass
 
@@ -145,6 +151,8 @@ class FillOperation(Operation):
 
 
 class MinMaxOperation(Operation):
+    uniform_scale = True
+
     def construct(self, size):
         # Get width and height
         width_str, height_str = size.split('x')
@@ -187,6 +195,8 @@ class MinMaxOperation(Operation):
 
 
 class WidthHeightOperation(Operation):
+    uniform_scale = True
+
     def construct(self, size):
         self.size = int(size)
 
@@ -219,6 +229,8 @@ class WidthHeightOperation(Operation):
 
 
 class JPEGQualityOperation(Operation):
+    uniform_scale = True
+
     def construct(self, quality):
         self.quality = int(quality)
 
@@ -230,6 +242,8 @@ class JPEGQualityOperation(Operation):
 
 
 class FormatOperation(Operation):
+    uniform_scale = True
+
     def construct(self, fmt):
         self.format = fmt
 
@@ -0,0 +1,163 @@
+from __future__ import absolute_import, unicode_literals
+
+import itertools
+import time
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from wagtail.wagtailimages import get_image_model
+from wagtail.wagtailimages.exceptions import InvalidFilterSpecError
+from wagtail.wagtailimages.models import Filter, SourceImageIOError
+
+
+def generate_image_renditions(job):
+    """
+    Generates the renditions with the given filter specs for one image. Runs in a
+    worker process, so takes and returns plain data.
+    """
+    image_id, filter_specs = job
+
+    image = get_image_model().objects.prefetch_renditions(*filter_specs).filter(id=image_id).first()
+    if image is None:
+        # Deleted since the job was created
+        return image_id, 0, None
+
+    try:
+        image.get_renditions(*filter_specs)
+    except SourceImageIOError:
+        return image_id, 0, "source image could not be opened"
+    except Exception as e:
+        return image_id, 0, "%s: %s" % (e.__class__.__name__, e)
+
+    return image_id, len(filter_specs), None
+
+
+class Command(BaseCommand):
+
+    help = (
+        "Generates any missing renditions of images with the given filter specs. Existing renditions "
+        "are skipped, so an interrupted run can be resumed by running the command again."
+    )
+
+    progress_interval = 100
+
+    # The number of jobs given to each worker process at a time. Jobs are handed to the
+    # pool in chunks, so that images are only checked for missing renditions shortly
+    # before they are needed, rather than all at once by the pool's task feeder
+    jobs_per_worker = 10
+
+    def add_arguments(self, parser):
+        parser.add_argument('filter_specs', nargs='+', metavar='filter_spec')
+        parser.add_argument(
+            '--collection', action='store', dest='collection', type=int, default=None,
+            help="Only generate renditions of images in the collection with this ID")
+        parser.add_argument(
+            '--tag', action='append', dest='tags', default=[],
+            help="Only generate renditions of images with this tag (may be given more than once)")
+        parser.add_argument(
+            '--workers', action='store', dest='workers', type=int, default=1,
+            help="The number of processes to generate renditions in")
+        parser.add_argument(
+            '--batch-size', action='store', dest='batch_size', type=int, default=100,
+            help="The number of images to check for missing renditions at a time")
+
+    def get_images(self, collection=None, tags=None):
+        images = get_image_model().objects.order_by('id')
+
+        if collection is not None:
+            images = images.filter(collection_id=collection)
+
+        if tags:
+            images = images.filter(tags__name__in=tags).distinct()
+
+        return images
+
+    def get_jobs(self, images, filters, batch_size):
+        """
+        Yields an (image id, filter specs) pair for every image that is missing any of
+        the renditions, checking for existing renditions a batch of images at a time.
+        """
+        last_id = 0
+        while True:
+            batch = list(images.filter(id__gt=last_id).prefetch_renditions(*filters)[:batch_size])
+            if not batch:
+                return
+
+            for image in batch:
+                missing_specs = [
+                    filter.spec for filter in filters
+                    if image.get_prefetched_rendition(filter.spec, filter.get_cache_key(image)) is None
+                ]
+
+                self.images_checked += 1
+                if missing_specs:
+                    yield image.id, missing_specs
+
+            last_id = batch[-1].id
+
+    def handle(self, *args, **options):
+        filters = [Filter(spec=filter_spec) for filter_spec in options['filter_specs']]
+        for filter in filters:
+            try:
+                filter.operations
+            except InvalidFilterSpecError as e:
+                raise CommandError("Invalid filter spec '%s': %s" % (filter.spec, e))
+
+        images = self.get_images(options['collection'], options['tags'])
+        image_count = images.count()
+        self.images_checked = 0
+        jobs = self.get_jobs(images, filters, options['batch_size'])
+
+        if options['workers'] > 1:
+            # Worker processes must open their own database connections, rather than
+            # sharing ours
+            connections.close_all()
+            pool = Pool(options['workers'])
+        else:
+            pool = None
+
+        chunk_size = max(options['workers'], 1) * self.jobs_per_worker
+        start_time = time.time()
+        job_count = 0
+        reported_job_count = 0
+        rendition_count = 0
+        error_count = 0
+
+        try:
+            while True:
+                chunk = list(itertools.islice(jobs, chunk_size))
+                if not chunk:
+                    break
+
+                if pool is not None:
+                    results = pool.imap_unordered(generate_image_renditions, chunk)
+                else:
+                    results = (generate_image_renditions(job) for job in chunk)
+
+                for image_id, generated_count, error in results:
+                    job_count += 1
+                    rendition_count += generated_count
+                    if error:
+                        error_count += 1
+                        self.stderr.write("Image %d: %s" % (image_id, error))
+
+                # Every image checked so far has been processed once the chunk is done
+                if options['verbosity'] >= 1 and job_count - reported_job_count >= self.progress_interval:
+                    reported_job_count = job_count
+                    elapsed = time.time() - start_time
+                    self.stdout.write("Checked %d/%d images, generated %d renditions (%.1f per second)" % (
+                        self.images_checked, image_count, rendition_count, rendition_count / elapsed if elapsed else 0
+                    ))
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+        elapsed = time.time() - start_time
+        self.stdout.write("Checked %d images, generated %d renditions in %.1f seconds (%.1f per second)" % (
+            self.images_checked, rendition_count, elapsed, rendition_count / elapsed if elapsed else 0
+        ))
+        if error_count:
+            self.stdout.write("%d images could not be processed" % error_count)
@@ -0,0 +1,80 @@
+from __future__ import absolute_import, unicode_literals
+
+import time
+from collections import OrderedDict
+
+from django.core.management.base import BaseCommand
+
+from wagtail.wagtailimages import get_image_model
+from wagtail.wagtailimages.models import QueuedRendition, SourceImageIOError
+
+
+class Command(BaseCommand):
+
+    help = "Generates the image renditions queued by DatabaseRenditionQueue"
+
+    batch_size = 100
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', action='store', dest='interval', type=float, default=None,
+            help="Keep running, checking the queue every INTERVAL seconds while it is empty")
+
+    def claim(self, queued_renditions):
+        """
+        Takes the given renditions off the queue, and returns the ones that were still
+        on it. Each is deleted separately, so that when several workers read the same
+        renditions from the queue, each rendition is only generated by the worker that
+        deleted it.
+        """
+        claimed_renditions = []
+        for queued_rendition in queued_renditions:
+            deleted = QueuedRendition.objects.filter(id=queued_rendition.id).delete()
+
+            # Django 1.8 doesn't return the number of objects deleted
+            if deleted is None or deleted[0]:
+                claimed_renditions.append(queued_rendition)
+
+        return claimed_renditions
+
+    def process_batch(self):
+        queued_renditions = list(QueuedRendition.objects.order_by('created_at', 'id')[:self.batch_size])
+
+        # Failed renditions are taken off the queue too; they will be queued again the
+        # next time they are requested
+        claimed_renditions = self.claim(queued_renditions)
+
+        # Load and decode each image once, however many of its renditions are queued
+        filter_specs_by_image = OrderedDict()
+        for queued_rendition in claimed_renditions:
+            filter_specs_by_image.setdefault(queued_rendition.image_id, []).append(queued_rendition.filter_spec)
+
+        images = get_image_model().objects.in_bulk(list(filter_specs_by_image.keys()))
+
+        for image_id, filter_specs in filter_specs_by_image.items():
+            image = images.get(image_id)
+            if image is None:
+                # The image has been deleted since its renditions were queued
+                continue
+
+            try:
+                image.get_renditions(*filter_specs)
+            except SourceImageIOError:
+                self.stderr.write("Image %d: source image could not be opened" % image_id)
+            except Exception as e:
+                self.stderr.write("Image %d: failed to generate '%s': %s" % (image_id, ', '.join(filter_specs), e))
+
+        return len(queued_renditions)
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+
+        while True:
+            count = self.process_batch()
+            if count:
+                if options['verbosity'] >= 2:
+                    self.stdout.write("Processed %d queued renditions" % count)
+            elif interval is None:
+                break
+            else:
+                time.sleep(interval)
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.8 on 2026-10-16 22:13
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailimages', '0019_delete_filter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedRendition',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image_id', models.IntegerField(db_index=True)),
+                ('filter_spec', models.CharField(max_length=255)),
+                ('focal_point_key', models.CharField(blank=True, default='', max_length=16)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='queuedrendition',
+            unique_together=set([('image_id', 'filter_spec', 'focal_point_key')]),
+        ),
+    ]
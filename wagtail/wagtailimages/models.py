@@ -8,6 +8,8 @@ from contextlib import contextmanager
 import django
 from django.conf import settings
 from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
 from django.core.files import File
 from django.core.urlresolvers import reverse
 from django.db import models
@@ -38,7 +40,33 @@ class SourceImageIOError(IOError):
 
 
 class ImageQuerySet(SearchableQuerySetMixin, models.QuerySet):
-    pass
+    def prefetch_renditions(self, *filters):
+        """
+        Prefetches the renditions of each image that were made with the given filters
+        (either Filter objects or spec strings), or all renditions if none are given.
+        get_rendition can then find these renditions without querying the database.
+        """
+        renditions = self.model.get_rendition_model().objects.all()
+        if filters:
+            renditions = renditions.filter(filter_spec__in=[
+                filter.spec if isinstance(filter, Filter) else filter
+                for filter in filters
+            ])
+
+        return self.prefetch_related(
+            models.Prefetch('renditions', queryset=renditions, to_attr='prefetched_renditions')
+        )
+
+
+def get_rendition_cache():
+    """
+    Returns the cache configured by WAGTAILIMAGES_RENDITION_CACHE, or None if rendition
+    caching is disabled.
+    """
+    alias = getattr(settings, 'WAGTAILIMAGES_RENDITION_CACHE', None)
+    if alias is None:
+        return None
+    return caches[alias]
 
 
 def get_upload_to(instance, filename):
@@ -258,45 +286,163 @@ class AbstractImage(CollectionMember, index.Indexed, models.Model):
         if isinstance(filter, string_types):
             filter = Filter(spec=filter)
 
+        rendition = self.find_rendition(filter)
+        if rendition is None:
+            rendition = self.create_rendition(filter)
+
+        return rendition
+
+    def find_rendition(self, filter):
+        """
+        Returns the existing rendition of this image for the given filter, or None if it
+        has not been generated yet.
+        """
+        if isinstance(filter, string_types):
+            filter = Filter(spec=filter)
+
         cache_key = filter.get_cache_key(self)
         Rendition = self.get_rendition_model()
 
+        rendition = self.get_prefetched_rendition(filter.spec, cache_key)
+        if rendition is not None:
+            return rendition
+
+        rendition = Rendition.get_from_cache(self, filter.spec, cache_key)
+        if rendition is not None:
+            return rendition
+
         try:
             rendition = self.renditions.get(
                 filter_spec=filter.spec,
                 focal_point_key=cache_key,
             )
         except Rendition.DoesNotExist:
-            # Generate the rendition image
-            generated_image = filter.run(self, BytesIO())
+            return None
 
-            # Generate filename
-            input_filename = os.path.basename(self.file.name)
-            input_filename_without_extension, input_extension = os.path.splitext(input_filename)
+        rendition.add_to_cache()
+        return rendition
 
-            # A mapping of image formats to extensions
-            FORMAT_EXTENSIONS = {
-                'jpeg': '.jpg',
-                'png': '.png',
-                'gif': '.gif',
-            }
+    def create_rendition(self, filter, generated_image=None):
+        """
+        Generates the rendition of this image for the given filter. If another process
+        has created the same rendition in the meantime, that one is returned instead.
 
-            output_extension = filter.spec.replace('|', '.') + FORMAT_EXTENSIONS[generated_image.format_name]
-            if cache_key:
-                output_extension = cache_key + '.' + output_extension
+        `generated_image` may be given if the filter has already been run.
+        """
+        if isinstance(filter, string_types):
+            filter = Filter(spec=filter)
 
-            # Truncate filename to prevent it going over 60 chars
-            output_filename_without_extension = input_filename_without_extension[:(59 - len(output_extension))]
-            output_filename = output_filename_without_extension + '.' + output_extension
+        cache_key = filter.get_cache_key(self)
 
-            rendition, created = self.renditions.get_or_create(
-                filter_spec=filter.spec,
-                focal_point_key=cache_key,
-                defaults={'file': File(generated_image.f, name=output_filename)}
-            )
+        # Generate the rendition image
+        if generated_image is None:
+            generated_image = filter.run(self, BytesIO())
+
+        # Generate filename
+        input_filename = os.path.basename(self.file.name)
+        input_filename_without_extension, input_extension = os.path.splitext(input_filename)
+
+        # A mapping of image formats to extensions
+        FORMAT_EXTENSIONS = {
+            'jpeg': '.jpg',
+            'png': '.png',
+            'gif': '.gif',
+        }
+
+        output_extension = filter.spec.replace('|', '.') + FORMAT_EXTENSIONS[generated_image.format_name]
+        if cache_key:
+            output_extension = cache_key + '.' + output_extension
+
+        # Truncate filename to prevent it going over 60 chars
+        output_filename_without_extension = input_filename_without_extension[:(59 - len(output_extension))]
+        output_filename = output_filename_without_extension + '.' + output_extension
+
+        rendition, created = self.renditions.get_or_create(
+            filter_spec=filter.spec,
+            focal_point_key=cache_key,
+            defaults={'file': File(generated_image.f, name=output_filename)}
+        )
 
+        rendition.add_to_cache()
         return rendition
 
+    def get_renditions(self, *filters):
+        """
+        Returns the renditions of this image for the given filters (either Filter objects
+        or spec strings), as a dict keyed by filter spec. Any that don't exist yet are
+        generated from a single opened copy of the original image.
+        """
+        filters = [
+            Filter(spec=filter) if isinstance(filter, string_types) else filter
+            for filter in filters
+        ]
+
+        renditions = {}
+        missing_filters = []
+        for filter in filters:
+            rendition = self.find_rendition(filter)
+            if rendition is None:
+                missing_filters.append(filter)
+            else:
+                renditions[filter.spec] = rendition
+
+        if missing_filters:
+            with self.get_willow_image() as willow:
+                original_format = willow.format_name
+                willow = willow.auto_orient()
+
+                for filter, generated_image in self.generate_rendition_images(willow, original_format, missing_filters):
+                    renditions[filter.spec] = self.create_rendition(filter, generated_image)
+
+        return renditions
+
+    def generate_rendition_images(self, willow, original_format, filters):
+        """
+        Runs each of the given filters on an opened and oriented copy of this image, and
+        yields (filter, generated image) pairs. Filters that only scale the image are run
+        largest first, and each is resized from the smallest result so far that is larger
+        than it, rather than from the original.
+        """
+        scaled_filters = []
+        for filter in filters:
+            if filter.is_uniform_scale:
+                env = {
+                    'original-format': original_format,
+                }
+                output_size = filter.apply_operations(_ImageSize(*willow.get_size()), self, env).get_size()
+                scaled_filters.append((filter, output_size, env))
+            else:
+                yield filter, filter.run_on_willow(willow, original_format, self, BytesIO())
+
+        scaled_filters.sort(key=lambda item: item[1][0] * item[1][1], reverse=True)
+
+        # Uniformly scaled copies of the image, from largest to smallest
+        scaled_images = [willow]
+        for filter, output_size, env in scaled_filters:
+            width, height = output_size
+            larger_images = [
+                scaled_image for scaled_image in scaled_images
+                if scaled_image.get_size()[0] >= width and scaled_image.get_size()[1] >= height
+            ]
+            source = larger_images[-1] if larger_images else willow
+
+            if source.get_size() == output_size:
+                scaled_image = source
+            else:
+                scaled_image = source.resize(output_size)
+                scaled_images.append(scaled_image)
+
+            yield filter, filter.save_output(scaled_image, env, original_format, BytesIO())
+
+    def get_prefetched_rendition(self, filter_spec, focal_point_key):
+        """
+        Returns the matching rendition from those loaded by ImageQuerySet.prefetch_renditions,
+        or None if it was not prefetched.
+        """
+        for rendition in getattr(self, 'prefetched_renditions', []):
+            if rendition.filter_spec == filter_spec and rendition.focal_point_key == focal_point_key:
+                return rendition
+
     def is_portrait(self):
         return (self.width < self.height)
 
@@ -335,6 +481,27 @@ class Image(AbstractImage):
     )
 
 
+class _ImageSize(object):
+    """
+    Stands in for a Willow image when working out the size of a rendition, for
+    operations that only need to know the size of the image they are applied to
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+    def get_size(self):
+        return (self.width, self.height)
+
+    def resize(self, size):
+        return _ImageSize(*size)
+
+    def crop(self, rect):
+        left, top, right, bottom = rect
+        return _ImageSize(right - left, bottom - top)
+
+
 class Filter(object):
     """
     Represents one or more operations that can be applied to an Image to produce a rendition
@@ -370,42 +537,84 @@ class Filter(object):
             # Fix orientation of image
             willow = willow.auto_orient()
 
-            env = {
-                'original-format': original_format,
-            }
-            for operation in self.operations:
-                willow = operation.run(willow, image, env) or willow
+            return self.run_on_willow(willow, original_format, image, output)
+
+    def run_on_willow(self, willow, original_format, image, output):
+        """
+        Applies this filter to an image that has already been opened and oriented, and
+        writes the result to `output`. `willow` is not modified.
+        """
+        env = {
+            'original-format': original_format,
+        }
+        willow = self.apply_operations(willow, image, env)
+
+        return self.save_output(willow, env, original_format, output)
+
+    def apply_operations(self, willow, image, env):
+        for operation in self.operations:
+            willow = operation.run(willow, image, env) or willow
+
+        return willow
 
-            # Find the output format to use
-            if 'output-format' in env:
-                # Developer specified an output format
-                output_format = env['output-format']
+    def save_output(self, willow, env, original_format, output):
+        """
+        Writes `willow` to `output`, in the format chosen by the filter's operations
+        (recorded in `env`) or else the format of the original image
+        """
+        # Find the output format to use
+        if 'output-format' in env:
+            # Developer specified an output format
+            output_format = env['output-format']
+        else:
+            # Default to outputting in original format
+            output_format = original_format
+
+            # Convert BMP files to PNG
+            if original_format == 'bmp':
+                output_format = 'png'
+
+            # Convert unanimated GIFs to PNG as well
+            if original_format == 'gif' and not willow.has_animation():
+                output_format = 'png'
+
+        if output_format == 'jpeg':
+            # Allow changing of JPEG compression quality
+            if 'jpeg-quality' in env:
+                quality = env['jpeg-quality']
+            elif hasattr(settings, 'WAGTAILIMAGES_JPEG_QUALITY'):
+                quality = settings.WAGTAILIMAGES_JPEG_QUALITY
             else:
-                # Default to outputting in original format
-                output_format = original_format
-
-                # Convert BMP files to PNG
-                if original_format == 'bmp':
-                    output_format = 'png'
-
-                # Convert unanimated GIFs to PNG as well
-                if original_format == 'gif' and not willow.has_animation():
-                    output_format = 'png'
-
-            if output_format == 'jpeg':
-                # Allow changing of JPEG compression quality
-                if 'jpeg-quality' in env:
-                    quality = env['jpeg-quality']
-                elif hasattr(settings, 'WAGTAILIMAGES_JPEG_QUALITY'):
-                    quality = settings.WAGTAILIMAGES_JPEG_QUALITY
-                else:
-                    quality = 85
+                quality = 85
+
+            return willow.save_as_jpeg(output, quality=quality, progressive=True, optimize=True)
+        elif output_format == 'png':
+            return willow.save_as_png(output)
+        elif output_format == 'gif':
+            return willow.save_as_gif(output)
+
+    def get_output_size(self, image):
+        """
+        Returns the (width, height) of the rendition that this filter would produce for
+        the given image, without opening the image file. Returns None if one of the
+        operations needs more than the size of the image to run.
+        """
+        size = _ImageSize(image.width, image.height)
+        try:
+            size = self.apply_operations(size, image, {})
+        except (AttributeError, KeyError):
+            return None
 
-                return willow.save_as_jpeg(output, quality=quality, progressive=True, optimize=True)
-            elif output_format == 'png':
-                return willow.save_as_png(output)
-            elif output_format == 'gif':
-                return willow.save_as_gif(output)
+        return size.get_size()
+
+    @cached_property
+    def is_uniform_scale(self):
+        """
+        True if all of this filter's operations do nothing but scale the image uniformly.
+        The result of such a filter can be produced by resizing any larger uniformly
+        scaled copy of the image, rather than the original.
+        """
+        return all(getattr(operation, 'uniform_scale', False) for operation in self.operations)
 
     def get_cache_key(self, image):
         vary_parts = []
@@ -480,6 +689,58 @@ class AbstractRendition(models.Model):
     def __html__(self):
         return self.img_tag()
 
+    @staticmethod
+    def construct_cache_key(image_id, filter_spec, focal_point_key):
+        spec_hash = hashlib.sha1(filter_spec.encode('utf-8')).hexdigest()
+        return 'wagtail_rendition:%s:%s:%s' % (image_id, spec_hash, focal_point_key)
+
+    @classmethod
+    def get_from_cache(cls, image, filter_spec, focal_point_key):
+        """
+        Returns the rendition of the given image from the rendition cache, or None if it
+        is not cached (or rendition caching is disabled).
+        """
+        cache = get_rendition_cache()
+        if cache is None:
+            return None
+
+        values = cache.get(cls.construct_cache_key(image.pk, filter_spec, focal_point_key))
+        if values is None:
+            return None
+
+        field_names = [field.attname for field in cls._meta.concrete_fields]
+        if set(values) != set(field_names):
+            # Cached by a version of this model with different fields
+            return None
+
+        rendition = cls.from_db(image._state.db, field_names, [values[name] for name in field_names])
+        rendition.image = image
+        return rendition
+
+    def add_to_cache(self):
+        cache = get_rendition_cache()
+        if cache is None:
+            return
+
+        # Store the field values rather than the instance, which would also pickle the image
+        values = {}
+        for field in self._meta.concrete_fields:
+            value = getattr(self, field.attname)
+            if isinstance(field, models.FileField):
+                value = value.name
+            values[field.attname] = value
+
+        timeout = getattr(settings, 'WAGTAILIMAGES_RENDITION_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+        cache.set(self.get_cache_key(), values, timeout)
+
+    def delete_from_cache(self):
+        cache = get_rendition_cache()
+        if cache is not None:
+            cache.delete(self.get_cache_key())
+
+    def get_cache_key(self):
+        return self.construct_cache_key(self.image_id, self.filter_spec, self.focal_point_key)
+
     def get_upload_to(self, filename):
         folder_name = 'images'
         filename = self.file.field.storage.get_valid_name(filename)
@@ -516,3 +777,20 @@ class Rendition(AbstractRendition):
         unique_together = (
             ('image', 'filter_spec', 'focal_point_key'),
         )
+
+
+class QueuedRendition(models.Model):
+    """
+    A rendition waiting to be generated by the process_rendition_queue management command.
+    See wagtail.wagtailimages.rendition_queue.DatabaseRenditionQueue.
+    """
+    # Not a foreign key, as the image model is swappable
+    image_id = models.IntegerField(db_index=True)
+    filter_spec = models.CharField(max_length=255)
+    focal_point_key = models.CharField(max_length=16, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = (
+            ('image_id', 'filter_spec', 'focal_point_key'),
+        )
@@ -0,0 +1,152 @@
+"""
+Rendition queues generate image renditions outside of the request that needs them.
+
+By default, a missing rendition is generated while the page that uses it is being
+rendered. When the WAGTAILIMAGES_RENDITION_QUEUE setting is configured, the image
+template tags instead hand missing renditions to a queue and output a placeholder
+showing the original image, so that a page with many new renditions isn't held up
+by generating them all.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import logging
+import threading
+from multiprocessing.pool import ThreadPool
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils.module_loading import import_string
+
+from wagtail.wagtailimages.models import QueuedRendition, SourceImageIOError
+
+logger = logging.getLogger('wagtail.images')
+
+
+class InvalidRenditionQueueError(ImproperlyConfigured):
+    pass
+
+
+class BaseRenditionQueue(object):
+    def __init__(self, params):
+        pass
+
+    def enqueue(self, image, filter):
+        """
+        Arranges for the rendition of `image` with `filter` to be generated. This is
+        only called when the rendition does not already exist.
+        """
+        raise NotImplementedError
+
+
+class ThreadPoolRenditionQueue(BaseRenditionQueue):
+    """
+    Generates renditions in a pool of threads within the current process. Requests for
+    a rendition that is already being generated are ignored, and renditions of the same
+    image that are requested before work on it has started are generated together.
+    """
+
+    def __init__(self, params):
+        super(ThreadPoolRenditionQueue, self).__init__(params)
+        self.workers = params.pop('WORKERS', 2)
+        self.pool = None
+        self.in_progress = set()
+        self.waiting_filters = {}
+        self.lock = threading.Lock()
+
+    def get_pool(self):
+        # Start the threads when they are first needed, rather than on import
+        with self.lock:
+            if self.pool is None:
+                self.pool = ThreadPool(self.workers)
+            return self.pool
+
+    def enqueue(self, image, filter):
+        key = (image.pk, filter.spec, filter.get_cache_key(image))
+
+        with self.lock:
+            if key in self.in_progress:
+                return
+            self.in_progress.add(key)
+
+            if image.pk in self.waiting_filters:
+                # Add to the job for this image that hasn't started yet
+                self.waiting_filters[image.pk].append((key, filter))
+                return
+
+            self.waiting_filters[image.pk] = [(key, filter)]
+
+        self.get_pool().apply_async(self.generate, (image, ))
+
+    def generate(self, image):
+        with self.lock:
+            keys_and_filters = self.waiting_filters.pop(image.pk)
+
+        filter_specs = ', '.join(filter.spec for key, filter in keys_and_filters)
+        try:
+            image.get_renditions(*[filter for key, filter in keys_and_filters])
+        except SourceImageIOError:
+            logger.warning("Unable to generate renditions '%s' of image %s: source image could not be opened", filter_specs, image.pk)
+        except Exception:
+            logger.exception("Unable to generate renditions '%s' of image %s", filter_specs, image.pk)
+        finally:
+            with self.lock:
+                for key, filter in keys_and_filters:
+                    self.in_progress.discard(key)
+
+            # This thread is not part of a request, so nothing else will close its connection
+            close_old_connections()
+
+
+class DatabaseRenditionQueue(BaseRenditionQueue):
+    """
+    Records missing renditions in the database, to be generated by running the
+    process_rendition_queue management command. Each rendition is only recorded once,
+    however many times it is requested.
+    """
+
+    def enqueue(self, image, filter):
+        try:
+            with transaction.atomic():
+                QueuedRendition.objects.get_or_create(
+                    image_id=image.pk,
+                    filter_spec=filter.spec,
+                    focal_point_key=filter.get_cache_key(image),
+                )
+        except IntegrityError:
+            # Queued by another request in the meantime
+            pass
+
+
+def get_rendition_queue():
+    """
+    Returns the queue configured by WAGTAILIMAGES_RENDITION_QUEUE, or None if renditions
+    are generated on demand.
+    """
+    global _rendition_queue
+
+    queue_settings = getattr(settings, 'WAGTAILIMAGES_RENDITION_QUEUE', None)
+    if queue_settings is None:
+        return None
+
+    with _rendition_queue_lock:
+        # Keep the same queue for as long as the settings are unchanged, so that thread pools
+        # and their record of renditions in progress are shared by every request
+        if _rendition_queue is not None and _rendition_queue[0] == queue_settings:
+            return _rendition_queue[1]
+
+        params = queue_settings.copy()
+        backend = params.pop('BACKEND')
+
+        try:
+            queue_class = import_string(backend)
+        except ImportError as e:
+            raise InvalidRenditionQueueError("Could not find rendition queue '%s': %s" % (backend, e))
+
+        queue = queue_class(params)
+        _rendition_queue = (queue_settings, queue)
+        return queue
+
+
+_rendition_queue = None
+_rendition_queue_lock = threading.Lock()
@@ -36,6 +36,29 @@ class ImageEmbedHandler(object):
         except Image.DoesNotExist:
             return "<img>"
 
+        return ImageEmbedHandler.expand_image(image, attrs, for_editor)
+
+    @staticmethod
+    def bulk_expand_db_attributes(attrs_list, for_editor):
+        """
+        Given a list of attribute dicts from <embed> tags, return the real HTML
+        representation of each one, fetching all of the images in a single query.
+        """
+        Image = get_image_model()
+        images = Image.objects.in_bulk(set(attrs['id'] for attrs in attrs_list))
+
+        results = []
+        for attrs in attrs_list:
+            image = images.get(int(attrs['id']))
+            if image is None:
+                results.append("<img>")
+            else:
+                results.append(ImageEmbedHandler.expand_image(image, attrs, for_editor))
+
+        return results
+
+    @staticmethod
+    def expand_image(image, attrs, for_editor):
         image_format = get_image_format(attrs['format'])
 
         if for_editor:
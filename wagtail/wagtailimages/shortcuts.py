@@ -1,19 +1,39 @@
 # coding=utf-8
 from __future__ import absolute_import, unicode_literals
 
-from wagtail.wagtailimages.models import SourceImageIOError
+from django.utils.six import string_types
+
+from wagtail.wagtailcore.render_cache import mark_render_uncacheable
+from wagtail.wagtailimages.models import Filter, SourceImageIOError
+from wagtail.wagtailimages.rendition_queue import get_rendition_queue
 
 
 def get_rendition_or_not_found(image, specs):
     """
     Tries to get / create the rendition for the image or renders a not-found image if it does not exist.
 
+    If WAGTAILIMAGES_RENDITION_QUEUE is configured, renditions that don't exist yet are
+    passed to the queue to be generated, and a placeholder showing the original image
+    is returned in the meantime.
+
     :param image: AbstractImage
     :param specs: str or Filter
     :return: Rendition
     """
     try:
-        return image.get_rendition(specs)
+        queue = get_rendition_queue()
+        if queue is None:
+            return image.get_rendition(specs)
+
+        if isinstance(specs, string_types):
+            specs = Filter(spec=specs)
+
+        rendition = image.find_rendition(specs)
+        if rendition is None:
+            queue.enqueue(image, specs)
+            rendition = get_placeholder_rendition(image, specs)
+
+        return rendition
     except SourceImageIOError:
         # Image file is (probably) missing from /media/original_images - generate a dummy
         # rendition so that we just output a broken image, rather than crashing out completely
@@ -22,3 +42,25 @@ def get_rendition_or_not_found(image, specs):
         rendition = Rendition(image=image, width=0, height=0)
         rendition.file.name = 'not-found'
         return rendition
+
+
+def get_placeholder_rendition(image, filter):
+    """
+    Returns an unsaved rendition that displays the original image at the size the given
+    filter will produce, for use while the real rendition is being generated.
+    """
+    # The page being rendered should not be cached with the placeholder in it
+    mark_render_uncacheable()
+
+    size = filter.get_output_size(image)
+    if size is None:
+        # Leave the browser to size the image
+        width, height = None, None
+    else:
+        width, height = size
+
+    Rendition = image.renditions.model
+    rendition = Rendition(image=image, filter_spec=filter.spec, width=width, height=height)
+    rendition.file.name = image.file.name
+    rendition.file.storage = image.file.storage
+    return rendition
@@ -1,8 +1,10 @@
 from __future__ import absolute_import, unicode_literals
 
 from django.conf import settings
-from django.db.models.signals import post_delete, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 
+from wagtail.wagtailcore.render_cache import invalidate_render_cache
+from wagtail.wagtailimages import get_image_model
 from wagtail.wagtailimages.models import Image, Rendition
 
 
@@ -19,7 +21,20 @@ def pre_save_image_feature_detection(instance, **kwargs):
             instance.set_focal_point(instance.get_suggested_focal_point())
 
 
+def image_changed_invalidate_render_cache(instance, **kwargs):
+    invalidate_render_cache()
+
+
+def post_delete_rendition_cache_cleanup(instance, **kwargs):
+    instance.delete_from_cache()
+
+
 def register_signal_handlers():
     pre_save.connect(pre_save_image_feature_detection, sender=Image)
     post_delete.connect(post_delete_file_cleanup, sender=Image)
     post_delete.connect(post_delete_file_cleanup, sender=Rendition)
+
+    image_model = get_image_model()
+    post_save.connect(image_changed_invalidate_render_cache, sender=image_model)
+    post_delete.connect(image_changed_invalidate_render_cache, sender=image_model)
+    post_delete.connect(post_delete_rendition_cache_cleanup, sender=image_model.get_rendition_model())
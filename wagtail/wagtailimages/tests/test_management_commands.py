@@ -0,0 +1,129 @@
+from __future__ import absolute_import, unicode_literals
+
+from django.core import management
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils.six import StringIO
+from mock import patch
+
+from wagtail.wagtailcore.models import Collection
+from wagtail.wagtailimages.models import Rendition
+
+from .utils import Image, get_test_image_file
+
+
+class FakePool(object):
+    chunks = []
+
+    def __init__(self, processes):
+        self.processes = processes
+
+    def imap_unordered(self, func, iterable):
+        self.chunks.append(list(iterable))
+        return map(func, iterable)
+
+    def terminate(self):
+        pass
+
+    def join(self):
+        pass
+
+
+class TestGenerateRenditionsCommand(TestCase):
+    def setUp(self):
+        self.collection = Collection.get_first_root_node().add_child(name="Gallery")
+
+        self.images = [
+            Image.objects.create(
+                title="Test image %d" % i,
+                file=get_test_image_file(),
+            )
+            for i in range(3)
+        ]
+        self.images[0].collection = self.collection
+        self.images[0].save()
+        self.images[1].tags.add('gallery')
+
+    def run_command(self, *args, **options):
+        output = StringIO()
+        management.call_command('generate_renditions', *args, stdout=output, stderr=StringIO(), **options)
+        output.seek(0)
+
+        return output.read()
+
+    def get_filter_specs(self, image):
+        return sorted(Rendition.objects.filter(image=image).values_list('filter_spec', flat=True))
+
+    def test_generates_renditions(self):
+        output = self.run_command('width-400', 'fill-100x100')
+
+        for image in self.images:
+            self.assertEqual(self.get_filter_specs(image), ['fill-100x100', 'width-400'])
+        self.assertIn("Checked 3 images, generated 6 renditions", output)
+
+    def test_decodes_each_image_once(self):
+        with patch.object(Image, 'get_willow_image', side_effect=Image.get_willow_image, autospec=True) as get_willow_image:
+            self.run_command('width-400', 'fill-100x100', 'max-50x50')
+
+        self.assertEqual(get_willow_image.call_count, 3)
+
+    def test_skips_existing_renditions(self):
+        self.images[0].get_rendition('width-400')
+        self.images[1].get_rendition('width-400')
+        self.images[1].get_rendition('height-100')
+
+        output = self.run_command('width-400', 'height-100')
+
+        for image in self.images:
+            self.assertEqual(self.get_filter_specs(image), ['height-100', 'width-400'])
+        self.assertIn("generated 3 renditions", output)
+
+        # Running the command again does nothing
+        output = self.run_command('width-400', 'height-100')
+        self.assertIn("generated 0 renditions", output)
+
+    def test_collection(self):
+        self.run_command('width-400', collection=self.collection.id)
+
+        self.assertEqual(self.get_filter_specs(self.images[0]), ['width-400'])
+        self.assertEqual(self.get_filter_specs(self.images[1]), [])
+        self.assertEqual(self.get_filter_specs(self.images[2]), [])
+
+    def test_tag(self):
+        self.run_command('width-400', tags=['gallery'])
+
+        self.assertEqual(self.get_filter_specs(self.images[0]), [])
+        self.assertEqual(self.get_filter_specs(self.images[1]), ['width-400'])
+        self.assertEqual(self.get_filter_specs(self.images[2]), [])
+
+    def test_batches(self):
+        self.run_command('width-400', batch_size=2)
+
+        for image in self.images:
+            self.assertEqual(self.get_filter_specs(image), ['width-400'])
+
+    @patch('wagtail.wagtailimages.management.commands.generate_renditions.connections')
+    @patch('wagtail.wagtailimages.management.commands.generate_renditions.Pool', FakePool)
+    def test_workers(self, connections):
+        self.run_command('width-400', workers=4)
+
+        self.assertTrue(connections.close_all.called)
+        for image in self.images:
+            self.assertEqual(self.get_filter_specs(image), ['width-400'])
+
+    @patch('wagtail.wagtailimages.management.commands.generate_renditions.Command.progress_interval', 1)
+    @patch('wagtail.wagtailimages.management.commands.generate_renditions.Command.jobs_per_worker', 1)
+    @patch('wagtail.wagtailimages.management.commands.generate_renditions.connections')
+    @patch('wagtail.wagtailimages.management.commands.generate_renditions.Pool', FakePool)
+    def test_workers_are_given_jobs_in_chunks(self, connections):
+        FakePool.chunks = []
+        output = self.run_command('width-400', workers=2, batch_size=1)
+
+        # Images are only checked for missing renditions as each chunk is needed
+        self.assertEqual([len(chunk) for chunk in FakePool.chunks], [2, 1])
+        self.assertIn("Checked 2/3 images, generated 2 renditions", output)
+        self.assertIn("Checked 3/3 images, generated 3 renditions", output)
+
+    def test_invalid_filter_spec(self):
+        with self.assertRaises(CommandError):
+            self.run_command('width-400', 'nonsense-100')
@@ -4,17 +4,21 @@ import unittest
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group, Permission
+from django.core.cache import caches
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.urlresolvers import reverse
 from django.db.utils import IntegrityError
+from django.template import Context, Template
 from django.test import TestCase
 from django.test.utils import override_settings
+from mock import patch
 from willow.image import Image as WillowImage
+from willow.plugins.pillow import PillowImage
 
 from wagtail.tests.testapp.models import EventPage, EventPageCarouselItem
 from wagtail.tests.utils import WagtailTestUtils
 from wagtail.wagtailcore.models import Collection, GroupCollectionPermission, Page
-from wagtail.wagtailimages.models import Rendition, SourceImageIOError
+from wagtail.wagtailimages.models import Filter, Rendition, SourceImageIOError
 from wagtail.wagtailimages.rect import Rect
 
 from .utils import Image, get_test_image_file
@@ -147,6 +151,50 @@ class TestImageQuerySet(TestCase):
             }
             self.assertTrue('aardvark' in results['Test image 0'])
 
+    def test_prefetch_renditions(self):
+        for i in range(0, 3):
+            image = Image.objects.create(
+                title="Test image %d" % i,
+                file=get_test_image_file(),
+            )
+            image.get_rendition('width-400')
+            image.get_rendition('height-100')
+            image.get_rendition('fill-100x100')
+
+        template = Template(
+            '{% load wagtailimages_tags %}'
+            '{% for image in images %}{% image image width-400 %}{% image image height-100 %}{% endfor %}'
+        )
+
+        # One query for the images and one for their renditions
+        with self.assertNumQueries(2):
+            images = Image.objects.order_by('title').prefetch_renditions('width-400', Filter(spec='height-100'))
+            html = template.render(Context({'images': images}))
+
+        self.assertEqual(html.count('<img'), 6)
+        self.assertIn('alt="Test image 2"', html)
+
+        # Only the requested renditions are prefetched
+        image = images[0]
+        self.assertEqual(
+            sorted(rendition.filter_spec for rendition in image.prefetched_renditions),
+            ['height-100', 'width-400']
+        )
+
+    def test_prefetch_all_renditions(self):
+        image = Image.objects.create(
+            title="Test image",
+            file=get_test_image_file(),
+        )
+        image.get_rendition('width-400')
+        image.get_rendition('height-100')
+
+        image = Image.objects.prefetch_renditions().get(id=image.id)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(image.get_rendition('width-400').width, 400)
+            self.assertEqual(image.get_rendition('height-100').height, 100)
+
 
 class TestImagePermissions(TestCase):
     def setUp(self):
@@ -244,6 +292,115 @@ class TestRenditions(TestCase):
         rendition = self.image.get_rendition('width-400')
         self.assertEqual(rendition.alt, "Test image")
 
+    def test_get_renditions(self):
+        existing_rendition = self.image.get_rendition('width-400')
+
+        with patch.object(Image, 'get_willow_image', side_effect=Image.get_willow_image, autospec=True) as get_willow_image:
+            renditions = self.image.get_renditions('width-400', 'max-100x100', Filter(spec='min-120x120'))
+
+        # The image is only opened once, to generate the missing renditions
+        self.assertEqual(get_willow_image.call_count, 1)
+
+        self.assertEqual(set(renditions.keys()), {'width-400', 'max-100x100', 'min-120x120'})
+        self.assertEqual(renditions['width-400'], existing_rendition)
+        self.assertEqual((renditions['max-100x100'].width, renditions['max-100x100'].height), (100, 75))
+        self.assertEqual((renditions['min-120x120'].width, renditions['min-120x120'].height), (160, 120))
+
+        # The new renditions are saved
+        self.assertEqual(self.image.get_rendition('max-100x100'), renditions['max-100x100'])
+
+    def test_get_renditions_resizes_from_larger_renditions(self):
+        resized_from = {}
+        original_resize = PillowImage.resize
+
+        def resize(willow, size):
+            resized_from[tuple(size)] = willow.get_size()
+            return original_resize(willow, size)
+
+        with patch.object(PillowImage, 'resize', side_effect=resize, autospec=True):
+            renditions = self.image.get_renditions(
+                'width-100', 'width-400', 'fill-200x200', 'max-200x200|format-png', 'original'
+            )
+
+        # The smallest larger rendition is used as the source of each resize
+        self.assertEqual(resized_from, {
+            (400, 300): (640, 480),
+            (200, 150): (400, 300),
+            (100, 75): (200, 150),
+            (200, 200): (480, 480),
+        })
+
+        # The results are the same size as when generated separately
+        for filter_spec, rendition in renditions.items():
+            self.assertEqual(
+                (rendition.width, rendition.height),
+                Filter(spec=filter_spec).get_output_size(self.image)
+            )
+
+        self.assertTrue(renditions['max-200x200|format-png'].file.name.endswith('.png'))
+        self.assertTrue(renditions['width-400'].file.name.endswith('.png'))
+
+
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        },
+        'renditions': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    },
+    WAGTAILIMAGES_RENDITION_CACHE='renditions',
+)
+class TestRenditionCache(TestCase):
+    def setUp(self):
+        caches['renditions'].clear()
+
+        self.image = Image.objects.create(
+            title="Test image",
+            file=get_test_image_file(),
+        )
+
+    def test_rendition_served_from_cache(self):
+        rendition = self.image.get_rendition('width-400')
+
+        image = Image.objects.get(id=self.image.id)
+        with self.assertNumQueries(0):
+            cached_rendition = image.get_rendition('width-400')
+            self.assertEqual(cached_rendition.alt, "Test image")
+
+        self.assertEqual(cached_rendition, rendition)
+        self.assertEqual(cached_rendition.url, rendition.url)
+        self.assertEqual(cached_rendition.width, 400)
+        self.assertEqual(cached_rendition.height, 300)
+
+    def test_cache_keyed_on_focal_point(self):
+        fill_filter = Filter(spec='fill-100x100')
+        self.image.get_rendition(fill_filter)
+
+        self.image.set_focal_point(Rect(100, 100, 200, 200))
+        focal_point_key = fill_filter.get_cache_key(self.image)
+        self.assertIsNone(Rendition.get_from_cache(self.image, 'fill-100x100', focal_point_key))
+
+        rendition = self.image.get_rendition(fill_filter)
+        self.assertEqual(rendition.focal_point_key, focal_point_key)
+        self.assertIsNotNone(Rendition.get_from_cache(self.image, 'fill-100x100', focal_point_key))
+
+    def test_deleted_rendition_removed_from_cache(self):
+        rendition = self.image.get_rendition('width-400')
+        self.image.renditions.all().delete()
+
+        self.assertIsNone(Rendition.get_from_cache(self.image, 'width-400', ''))
+        self.assertNotEqual(self.image.get_rendition('width-400').id, rendition.id)
+
+    @override_settings(WAGTAILIMAGES_RENDITION_CACHE=None)
+    def test_disabled(self):
+        self.image.get_rendition('width-400')
+
+        self.assertIsNone(Rendition.get_from_cache(self.image, 'width-400', ''))
+        with self.assertNumQueries(1):
+            self.image.get_rendition('width-400')
+
 
 class TestUsageCount(TestCase):
     fixtures = ['test.json']
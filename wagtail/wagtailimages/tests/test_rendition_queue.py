@@ -0,0 +1,198 @@
+from __future__ import absolute_import, unicode_literals
+
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.utils.six import StringIO
+from mock import Mock, patch
+
+from wagtail.wagtailimages.management.commands import process_rendition_queue
+from wagtail.wagtailimages.models import Filter, QueuedRendition, Rendition
+from wagtail.wagtailimages.rendition_queue import (
+    DatabaseRenditionQueue, InvalidRenditionQueueError, ThreadPoolRenditionQueue, get_rendition_queue)
+from wagtail.wagtailimages.shortcuts import get_rendition_or_not_found
+
+from .utils import Image, get_test_image_file
+
+
+class TestFilterOutputSize(TestCase):
+    def setUp(self):
+        self.image = Image.objects.create(
+            title="Test image",
+            file=get_test_image_file(),
+        )
+
+    def test_get_output_size(self):
+        self.assertEqual(Filter(spec='width-400').get_output_size(self.image), (400, 300))
+        self.assertEqual(Filter(spec='max-100x100').get_output_size(self.image), (100, 75))
+        self.assertEqual(Filter(spec='fill-100x100').get_output_size(self.image), (100, 100))
+        self.assertEqual(Filter(spec='original|jpegquality-40').get_output_size(self.image), (640, 480))
+
+    def test_matches_generated_rendition(self):
+        for spec in ['min-120x120', 'fill-300x100-c50', 'height-100|format-png']:
+            rendition = self.image.get_rendition(spec)
+            self.assertEqual(Filter(spec=spec).get_output_size(self.image), (rendition.width, rendition.height))
+
+
+class TestGetRenditionQueue(TestCase):
+    def test_not_configured(self):
+        self.assertIsNone(get_rendition_queue())
+
+    @override_settings(WAGTAILIMAGES_RENDITION_QUEUE={
+        'BACKEND': 'wagtail.wagtailimages.rendition_queue.ThreadPoolRenditionQueue',
+        'WORKERS': 4,
+    })
+    def test_thread_pool(self):
+        queue = get_rendition_queue()
+        self.assertIsInstance(queue, ThreadPoolRenditionQueue)
+        self.assertEqual(queue.workers, 4)
+
+        # The same queue is used every time
+        self.assertIs(get_rendition_queue(), queue)
+
+    @override_settings(WAGTAILIMAGES_RENDITION_QUEUE={
+        'BACKEND': 'wagtail.wagtailimages.rendition_queue.NonExistentQueue',
+    })
+    def test_invalid_backend(self):
+        self.assertRaises(InvalidRenditionQueueError, get_rendition_queue)
+
+
+@override_settings(WAGTAILIMAGES_RENDITION_QUEUE={
+    'BACKEND': 'wagtail.wagtailimages.rendition_queue.DatabaseRenditionQueue',
+})
+class TestDatabaseRenditionQueue(TestCase):
+    def setUp(self):
+        self.image = Image.objects.create(
+            title="Test image",
+            file=get_test_image_file(),
+        )
+
+    def test_placeholder_returned(self):
+        rendition = get_rendition_or_not_found(self.image, 'width-400')
+
+        self.assertIsNone(rendition.pk)
+        self.assertEqual(rendition.url, self.image.file.url)
+        self.assertEqual(rendition.width, 400)
+        self.assertEqual(rendition.height, 300)
+        self.assertFalse(Rendition.objects.filter(image=self.image).exists())
+
+    def test_requests_are_coalesced(self):
+        get_rendition_or_not_found(self.image, 'width-400')
+        get_rendition_or_not_found(self.image, 'width-400')
+        get_rendition_or_not_found(self.image, 'height-100')
+
+        self.assertEqual(
+            sorted(QueuedRendition.objects.filter(image_id=self.image.id).values_list('filter_spec', flat=True)),
+            ['height-100', 'width-400']
+        )
+
+    def test_existing_rendition_returned(self):
+        rendition = self.image.get_rendition('width-400')
+
+        self.assertEqual(get_rendition_or_not_found(self.image, 'width-400'), rendition)
+        self.assertFalse(QueuedRendition.objects.exists())
+
+    def test_image_tag(self):
+        template = Template('{% load wagtailimages_tags %}{% image image width-400 %}')
+        html = template.render(Context({'image': self.image}))
+
+        self.assertIn('src="%s"' % self.image.file.url, html)
+        self.assertIn('width="400"', html)
+
+    def test_process_rendition_queue(self):
+        get_rendition_or_not_found(self.image, 'width-400')
+        get_rendition_or_not_found(self.image, 'height-100')
+        DatabaseRenditionQueue({}).enqueue(Mock(pk=self.image.id + 1), Filter(spec='width-400'))
+
+        call_command('process_rendition_queue', stdout=StringIO())
+
+        self.assertFalse(QueuedRendition.objects.exists())
+        self.assertEqual(
+            sorted(Rendition.objects.filter(image=self.image).values_list('filter_spec', flat=True)),
+            ['height-100', 'width-400']
+        )
+
+        rendition = get_rendition_or_not_found(self.image, 'width-400')
+        self.assertIsNotNone(rendition.pk)
+        self.assertNotEqual(rendition.url, self.image.file.url)
+
+    def test_process_rendition_queue_skips_claimed_renditions(self):
+        get_rendition_or_not_found(self.image, 'width-400')
+        get_rendition_or_not_found(self.image, 'height-100')
+        queued_renditions = list(QueuedRendition.objects.order_by('id'))
+
+        # Another worker has already taken the first rendition off the queue
+        queued_renditions[0].delete()
+        command = process_rendition_queue.Command(stdout=StringIO())
+
+        with patch.object(QueuedRendition.objects, 'order_by') as order_by:
+            order_by.return_value = queued_renditions
+            command.process_batch()
+
+        self.assertEqual(
+            list(Rendition.objects.filter(image=self.image).values_list('filter_spec', flat=True)),
+            ['height-100']
+        )
+
+
+@patch('wagtail.wagtailimages.rendition_queue.close_old_connections')
+class TestThreadPoolRenditionQueue(TestCase):
+    def setUp(self):
+        self.image = Image.objects.create(
+            title="Test image",
+            file=get_test_image_file(),
+        )
+        self.queue = ThreadPoolRenditionQueue({})
+        self.queue.pool = Mock()
+
+    def test_requests_are_coalesced(self, close_old_connections):
+        width_filter = Filter(spec='width-400')
+        self.queue.enqueue(self.image, width_filter)
+        self.queue.enqueue(self.image, width_filter)
+
+        self.assertEqual(self.queue.pool.apply_async.call_count, 1)
+        args = self.queue.pool.apply_async.call_args[0][1]
+
+        # Run the job, as a worker thread would
+        self.queue.generate(*args)
+        self.assertTrue(self.image.renditions.filter(filter_spec='width-400').exists())
+        self.assertTrue(close_old_connections.called)
+
+        # Once generation has finished, the rendition can be queued again
+        self.queue.enqueue(self.image, width_filter)
+        self.assertEqual(self.queue.pool.apply_async.call_count, 2)
+
+    def test_renditions_of_same_image_generated_together(self, close_old_connections):
+        other_image = Image.objects.create(
+            title="Other image",
+            file=get_test_image_file(),
+        )
+
+        self.queue.enqueue(self.image, Filter(spec='width-400'))
+        self.queue.enqueue(self.image, Filter(spec='height-100'))
+        self.queue.enqueue(other_image, Filter(spec='width-400'))
+
+        self.assertEqual(self.queue.pool.apply_async.call_count, 2)
+        args = self.queue.pool.apply_async.call_args_list[0][0][1]
+
+        with patch.object(Image, 'get_willow_image', side_effect=Image.get_willow_image, autospec=True) as get_willow_image:
+            self.queue.generate(*args)
+
+        self.assertEqual(get_willow_image.call_count, 1)
+        self.assertEqual(
+            sorted(self.image.renditions.values_list('filter_spec', flat=True)),
+            ['height-100', 'width-400']
+        )
+        self.assertFalse(other_image.renditions.exists())
+
+    def test_errors_are_logged(self, close_old_connections):
+        broken_filter = Filter(spec='width-400')
+        self.queue.enqueue(self.image, broken_filter)
+        args = self.queue.pool.apply_async.call_args[0][1]
+
+        with patch.object(Image, 'get_renditions', side_effect=ValueError):
+            with patch('wagtail.wagtailimages.rendition_queue.logger') as logger:
+                self.queue.generate(*args)
+
+        self.assertTrue(logger.exception.called)
+        self.assertEqual(self.queue.in_progress, set())
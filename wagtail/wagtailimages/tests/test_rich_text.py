@@ -50,3 +50,20 @@ class TestImageEmbedHandler(TestCase):
             '<img data-embedtype="image" data-id="1" data-format="left" '
             'data-alt="test-alt" class="richtext-image left"', result
         )
+
+    def test_bulk_expand_db_attributes(self):
+        Image.objects.create(id=1, title='Test', file=get_test_image_file())
+        Image.objects.create(id=2, title='Test 2', file=get_test_image_file())
+
+        result = ImageEmbedHandler.bulk_expand_db_attributes([
+            {'id': '1', 'alt': 'test-alt', 'format': 'left'},
+            {'id': '0', 'alt': 'missing', 'format': 'left'},
+            {'id': '2', 'alt': 'test-alt-2', 'format': 'right'},
+        ], False)
+
+        self.assertEqual(len(result), 3)
+        self.assertIn('<img class="richtext-image left"', result[0])
+        self.assertIn('alt="test-alt"', result[0])
+        self.assertEqual(result[1], '<img>')
+        self.assertIn('<img class="richtext-image right"', result[2])
+        self.assertIn('alt="test-alt-2"', result[2])
@@ -1,12 +1,15 @@
 
 from __future__ import absolute_import, unicode_literals
 
+from contextlib import contextmanager
+
 from django.db.models.lookups import Lookup
 from django.db.models.query import QuerySet
 from django.db.models.sql.where import SubqueryConstraint, WhereNode
 from django.utils.six import text_type
 
 from wagtail.wagtailsearch.index import class_is_indexed
+from wagtail.wagtailsearch.results_cache import get_cached_count, get_cached_results
 
 
 class FilterError(Exception):
@@ -94,6 +97,13 @@ class BaseSearchQuery(object):
     def _get_filters_from_queryset(self):
         return self._get_filters_from_where_node(self.queryset.query.where)
 
+    def get_suggestions(self, backend, field, limit):
+        """
+        Returns the primary keys and `field` values of up to `limit` objects that have
+        words starting with each of the terms of the query string.
+        """
+        raise NotImplementedError
+
 
 class BaseSearchResults(object):
     def __init__(self, backend, query, prefetch_related=None):
@@ -134,7 +144,7 @@ class BaseSearchResults(object):
 
     def results(self):
         if self._results_cache is None:
-            self._results_cache = self._do_search()
+            self._results_cache = get_cached_results(self)
         return self._results_cache
 
     def count(self):
@@ -142,7 +152,7 @@ class BaseSearchResults(object):
             if self._results_cache is not None:
                 self._count_cache = len(self._results_cache)
             else:
-                self._count_cache = self._do_count()
+                self._count_cache = get_cached_count(self)
         return self._count_cache
 
     def __getitem__(self, key):
@@ -179,6 +189,28 @@ class BaseSearchResults(object):
             data[-1] = "...(remaining elements truncated)..."
         return '<SearchResults %r>' % data
 
+    def _do_facet(self, field):
+        raise NotImplementedError
+
+    def facet(self, field_name):
+        """
+        Returns an OrderedDict mapping each value of the given FilterField to the number
+        of results that have it, with the most common values first. All results are
+        counted, however the results have been sliced. Results without a value for the
+        field are not counted.
+        """
+        model = self.query.queryset.model
+        for field in model.get_filterable_search_fields():
+            if field.field_name == field_name:
+                break
+        else:
+            raise FieldError(
+                'Cannot facet search results with field "' + field_name + '". Please add index.FilterField(\'' +
+                field_name + '\') to ' + model.__name__ + '.search_fields.'
+            )
+
+        return self._do_facet(field)
+
     def annotate_score(self, field_name):
         clone = self._clone()
         clone._score_field = field_name
@@ -196,6 +228,13 @@ class BaseSearchBackend(object):
     def get_index_for_model(self, model):
         return None
 
+    def get_cache_namespace(self):
+        """
+        Returns a string that distinguishes the results of this backend from those of
+        other backends in the search results cache.
+        """
+        return '%s.%s' % (self.__class__.__module__, self.__class__.__name__)
+
     def get_rebuilder(self):
         return None
 
@@ -217,6 +256,57 @@ class BaseSearchBackend(object):
     def delete(self, obj):
         raise NotImplementedError
 
+    def delete_bulk(self, model, obj_list):
+        for obj in obj_list:
+            self.delete(obj)
+
+    @contextmanager
+    def batch(self):
+        """
+        Changes made to the index inside this context manager may be held back and sent
+        to the search engine together when it exits. Backends that don't support this
+        send each change straight away.
+        """
+        yield
+
+    def suggest(self, query_string, model_or_queryset, field='title', limit=10):
+        """
+        Returns up to `limit` suggestions for completing `query_string`, for use in
+        type-ahead search boxes. Each word of the query string is matched against the
+        start of the words in the search fields that allow partial matches.
+
+        Only the primary key and the value of `field` (which must be a SearchField)
+        of each matching object are returned, as dicts with 'id' and 'title' keys.
+        """
+        # Find model/queryset
+        if isinstance(model_or_queryset, QuerySet):
+            model = model_or_queryset.model
+            queryset = model_or_queryset
+        else:
+            model = model_or_queryset
+            queryset = model_or_queryset.objects.all()
+
+        # Model must be a class that is in the index
+        if not class_is_indexed(model):
+            return []
+
+        # Check that theres something to complete
+        if not query_string.strip():
+            return []
+
+        if field not in {search_field.field_name for search_field in model.get_searchable_search_fields()}:
+            raise FieldError(
+                'Cannot suggest with field "' + field + '". Please add index.SearchField(\'' +
+                field + '\') to ' + model.__name__ + '.search_fields.'
+            )
+
+        # Suggest
+        search_query = self.query_class(queryset, query_string, operator='and')
+        return [
+            {'id': pk, 'title': title}
+            for pk, title in search_query.get_suggestions(self, field, limit)
+        ]
+
     def search(self, query_string, model_or_queryset, fields=None, filters=None,
                prefetch_related=None, operator=None, order_by_relevance=True):
         # Find model/queryset
@@ -0,0 +1,464 @@
+"""
+A search backend that keeps a search document for each indexed object in the
+database, and uses the database's own full-text search to rank the results.
+
+On PostgreSQL, documents are stored as a tsvector column with a GIN index, and on
+SQLite they are stored in an FTS5 table. Other databases, or SQLite libraries built
+without FTS5, fall back to the word matching of the basic database backend.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import re
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections, models, router, transaction
+from django.db.models.expressions import Value
+from django.utils.six import text_type
+
+from wagtail.wagtailsearch.backends.base import BaseSearchBackend
+from wagtail.wagtailsearch.backends.db import DatabaseSearchQuery, DatabaseSearchResults
+from wagtail.wagtailsearch.index import RelatedFields, SearchField, class_is_indexed
+from wagtail.wagtailsearch.models import IndexEntry
+
+# The weights of the text columns, as used by PostgreSQL's ts_rank. Partial matches
+# are given the lowest weight, 'D'
+WEIGHTS = (
+    ('text_a', 1.0),
+    ('text_b', 0.4),
+    ('text_c', 0.2),
+)
+AUTOCOMPLETE_WEIGHT = 0.1
+
+FTS_TABLE = 'wagtailsearch_indexentry_fts'
+
+# The number of entries to copy into the full-text index in each query (SQLite
+# allows 999 parameters per query)
+SYNC_CHUNK_SIZE = 500
+
+
+def get_weight_column(boost):
+    """
+    Rounds a SearchField boost to the column of one of the three weights
+    """
+    if boost is not None and boost >= 2:
+        return 'text_a'
+    elif boost is not None and boost > 1:
+        return 'text_b'
+    else:
+        return 'text_c'
+
+
+def get_text(value):
+    if value is None:
+        return ''
+    elif isinstance(value, (list, tuple)):
+        return ' '.join(get_text(item) for item in value)
+    else:
+        return text_type(value)
+
+
+def get_toplevel_model(model):
+    parent = model.indexed_get_parent()
+    while parent is not None:
+        model = parent
+        parent = model.indexed_get_parent()
+
+    return model
+
+
+def get_terms(query_string):
+    return re.findall(r'\w+', query_string, re.UNICODE)
+
+
+class DatabaseIndex(object):
+    """
+    All indexed models are kept in one index per database, which is named after the
+    database alias.
+    """
+    def __init__(self, backend, name):
+        self.backend = backend
+        self.name = name
+
+    @property
+    def connection(self):
+        return connections[self.name]
+
+    def get_vendor(self):
+        return self.backend.get_vendor(self.name)
+
+    def add_model(self, model):
+        pass  # Not needed
+
+    def get_entry(self, obj):
+        """
+        Returns the field values of the index entry of an object, as a dict
+        """
+        texts = {column: [] for column, weight in WEIGHTS}
+        autocomplete = []
+
+        def add_fields(fields, obj):
+            for field in fields:
+                if isinstance(field, SearchField):
+                    text = get_text(field.get_value(obj))
+                    if text:
+                        texts[get_weight_column(field.boost)].append(text)
+                        if field.partial_match:
+                            autocomplete.append(text)
+
+                elif isinstance(field, RelatedFields):
+                    value = field.get_value(obj)
+                    if isinstance(value, models.Manager):
+                        for related_obj in value.all():
+                            add_fields(field.fields, related_obj)
+                    elif isinstance(value, models.Model):
+                        add_fields(field.fields, value)
+
+        add_fields(type(obj).get_search_fields(), obj)
+
+        entry = {column: '\n'.join(text) for column, text in texts.items()}
+        entry['object_id'] = text_type(obj.pk)
+        entry['autocomplete'] = '\n'.join(autocomplete)
+        return entry
+
+    def prepare_items(self, model, items):
+        """
+        Returns the index entries of the given items as plain data, so they can be
+        built in another process and then saved with add_prepared_items.
+        """
+        if not class_is_indexed(model):
+            return []
+
+        # All objects of a model hierarchy share one entry for each primary key. Pages
+        # are only indexed as their specific class, so that a page indexed with the
+        # fields of its specific class isn't overwritten with those of the Page model
+        items = [item for item in items if getattr(item, 'specific_class', model) in (model, None)]
+        if not items:
+            return []
+
+        content_type = ContentType.objects.db_manager(self.name).get_for_model(get_toplevel_model(model))
+
+        return [
+            dict(self.get_entry(item), content_type_id=content_type.id)
+            for item in items
+        ]
+
+    def add_prepared_items(self, entries):
+        if not entries:
+            return
+
+        with transaction.atomic(using=self.name):
+            # Replace any existing entries for these objects
+            for content_type_id, object_ids in self._group_object_ids(entries).items():
+                self._delete_entries(content_type_id, object_ids)
+
+            IndexEntry.objects.using(self.name).bulk_create([IndexEntry(**entry) for entry in entries])
+
+            entry_ids = []
+            for content_type_id, object_ids in self._group_object_ids(entries).items():
+                entry_ids.extend(
+                    IndexEntry.objects.using(self.name)
+                    .filter(content_type_id=content_type_id, object_id__in=object_ids)
+                    .values_list('id', flat=True)
+                )
+
+            self._sync_full_text_index(entry_ids)
+
+    def add_item(self, item):
+        self.add_items(type(item), [item])
+
+    def add_items(self, model, items):
+        self.add_prepared_items(self.prepare_items(model, items))
+
+    def delete_item(self, item):
+        if not class_is_indexed(type(item)):
+            return
+
+        content_type = ContentType.objects.db_manager(self.name).get_for_model(get_toplevel_model(type(item)))
+
+        with transaction.atomic(using=self.name):
+            self._delete_entries(content_type.id, [text_type(item.pk)])
+
+    def refresh(self):
+        pass  # Not needed
+
+    def reset(self):
+        with transaction.atomic(using=self.name):
+            IndexEntry.objects.using(self.name).all().delete()
+
+            if self.get_vendor() == 'sqlite':
+                with self.connection.cursor() as cursor:
+                    cursor.execute("DELETE FROM %s" % FTS_TABLE)
+
+    def _group_object_ids(self, entries):
+        object_ids_by_content_type = {}
+        for entry in entries:
+            object_ids_by_content_type.setdefault(entry['content_type_id'], []).append(entry['object_id'])
+
+        return object_ids_by_content_type
+
+    def _delete_entries(self, content_type_id, object_ids):
+        entries = IndexEntry.objects.using(self.name).filter(content_type_id=content_type_id, object_id__in=object_ids)
+
+        if self.get_vendor() == 'sqlite':
+            entry_ids = list(entries.values_list('id', flat=True))
+            with self.connection.cursor() as cursor:
+                for i in range(0, len(entry_ids), SYNC_CHUNK_SIZE):
+                    chunk = entry_ids[i:i + SYNC_CHUNK_SIZE]
+                    cursor.execute(
+                        "DELETE FROM %s WHERE rowid IN (%s)" % (FTS_TABLE, ', '.join(['%s'] * len(chunk))),
+                        chunk
+                    )
+
+        entries.delete()
+
+    def _sync_full_text_index(self, entry_ids):
+        """
+        Copies the text of the given entries into the full-text index of the database
+        """
+        vendor = self.get_vendor()
+        if vendor is None:
+            return
+
+        with self.connection.cursor() as cursor:
+            if vendor == 'postgresql':
+                config = self.backend.search_config
+                cursor.execute(
+                    "UPDATE wagtailsearch_indexentry SET search_vector = "
+                    "setweight(to_tsvector(%s::regconfig, text_a), 'A') || "
+                    "setweight(to_tsvector(%s::regconfig, text_b), 'B') || "
+                    "setweight(to_tsvector(%s::regconfig, text_c), 'C') || "
+                    "setweight(to_tsvector('simple', autocomplete), 'D') "
+                    "WHERE id = ANY(%s)",
+                    [config, config, config, list(entry_ids)]
+                )
+
+            elif vendor == 'sqlite':
+                for i in range(0, len(entry_ids), SYNC_CHUNK_SIZE):
+                    chunk = entry_ids[i:i + SYNC_CHUNK_SIZE]
+                    cursor.execute(
+                        "INSERT INTO %s (rowid, text_a, text_b, text_c, autocomplete) "
+                        "SELECT id, text_a, text_b, text_c, autocomplete FROM wagtailsearch_indexentry "
+                        "WHERE id IN (%s)" % (FTS_TABLE, ', '.join(['%s'] * len(chunk))),
+                        chunk
+                    )
+
+
+class DatabaseIndexRebuilder(object):
+    def __init__(self, index):
+        self.index = index
+
+    def reset_index(self):
+        self.index.reset()
+
+    def start(self):
+        self.reset_index()
+
+        return self.index
+
+    def resume(self, index_name):
+        return self.index
+
+    def finish(self):
+        pass  # Not needed
+
+
+class DatabaseFullTextSearchQuery(DatabaseSearchQuery):
+    def get_match_sql(self, backend, vendor, terms, partial_only=False):
+        """
+        Returns the SQL condition that matches the search terms, the SQL expression that
+        scores the matched entries, and their parameters.
+
+        Each term matches either a whole word, after stemming, in any of the search
+        fields, or the start of a word in the fields that allow partial matches. If
+        partial_only is set, terms only match the start of words.
+        """
+        if vendor == 'postgresql':
+            config = backend.search_config
+            if partial_only:
+                term_sql = "to_tsquery('simple', %s)"
+            else:
+                term_sql = "(to_tsquery(%s::regconfig, %s) || to_tsquery('simple', %s))"
+            query_sql = (' && ' if self.operator == 'and' else ' || ').join([term_sql] * len(terms))
+            query_params = []
+            for term in terms:
+                # Partial matches are restricted to the autocomplete text, which has weight D
+                if partial_only:
+                    query_params.append(term + ':*D')
+                else:
+                    query_params.extend([config, term, term + ':*D'])
+
+            weights = '{%s, %s, %s, %s}' % ((AUTOCOMPLETE_WEIGHT, ) + tuple(weight for column, weight in reversed(WEIGHTS)))
+            match_sql = 'wagtailsearch_indexentry.search_vector @@ (%s)' % query_sql
+            score_sql = "ts_rank(%%s::float4[], wagtailsearch_indexentry.search_vector, (%s))" % query_sql
+            return match_sql, query_params, score_sql, [weights] + query_params
+
+        elif vendor == 'sqlite':
+            columns = ' '.join(column for column, weight in WEIGHTS)
+            if partial_only:
+                term_query = '{autocomplete} : "%(term)s" *'
+            else:
+                term_query = '({%(columns)s} : "%(term)s" OR {autocomplete} : "%(term)s" *)'
+            match_query = (' AND ' if self.operator == 'and' else ' OR ').join(
+                term_query % {'columns': columns, 'term': term}
+                for term in terms
+            )
+
+            match_sql = 'wagtailsearch_indexentry.id = %s.rowid AND %s MATCH %%s' % (FTS_TABLE, FTS_TABLE)
+            # bm25 scores are negative, with the best match lowest
+            score_sql = '-bm25(%s, %s, %s)' % (
+                FTS_TABLE, ', '.join(text_type(weight) for column, weight in WEIGHTS), AUTOCOMPLETE_WEIGHT
+            )
+            return match_sql, [match_query], score_sql, []
+
+    def get_queryset(self, backend, score_field=None, partial_only=False):
+        """
+        Returns the queryset of matching objects, with their scores in score_field if
+        given, and ordered by score if order_by_relevance is set.
+        """
+        queryset = self.queryset
+        model = queryset.model
+        vendor = backend.get_vendor(queryset.db)
+
+        if self.fields or (vendor is None and self.query_string is not None):
+            # The search document doesn't record which field text came from, so
+            # searches of particular fields use the basic database backend's matching
+            queryset = queryset.filter(self.get_extra_q()).distinct()
+            if score_field:
+                queryset = queryset.annotate(**{score_field: Value(None, output_field=models.FloatField())})
+            return queryset
+
+        # Check that the queryset is only filtered on FilterFields
+        self._get_filters_from_queryset()
+
+        quote_name = connections[queryset.db].ops.quote_name
+        content_type = ContentType.objects.db_manager(queryset.db).get_for_model(get_toplevel_model(model))
+
+        # Only return objects that are in the index
+        queryset = queryset.extra(
+            tables=['wagtailsearch_indexentry'],
+            where=[
+                'wagtailsearch_indexentry.content_type_id = %s',
+                'wagtailsearch_indexentry.object_id = CAST(%s.%s AS TEXT)' % (
+                    quote_name(model._meta.db_table), quote_name(model._meta.pk.column)
+                ),
+            ],
+            params=[content_type.id],
+        )
+
+        if self.query_string is None:
+            # Return all indexed objects
+            if score_field:
+                queryset = queryset.annotate(**{score_field: Value(None, output_field=models.FloatField())})
+            return queryset
+
+        terms = get_terms(self.query_string)
+        if not terms:
+            return queryset.none()
+
+        match_sql, match_params, score_sql, score_params = self.get_match_sql(
+            backend, vendor, terms, partial_only=partial_only
+        )
+
+        queryset = queryset.extra(
+            tables=[FTS_TABLE] if vendor == 'sqlite' else [],
+            where=[match_sql],
+            params=match_params,
+        )
+
+        if score_field or self.order_by_relevance:
+            score_field = score_field or '_search_score'
+            queryset = queryset.extra(select={score_field: score_sql}, select_params=score_params)
+
+            if self.order_by_relevance:
+                queryset = queryset.order_by('-' + score_field)
+
+        return queryset
+
+    def get_suggestions(self, backend, field, limit):
+        if backend.get_vendor(self.queryset.db) is None:
+            return super(DatabaseFullTextSearchQuery, self).get_suggestions(backend, field, limit)
+
+        # Check that the field can be fetched from the database
+        self.get_suggestion_fields(field)
+
+        # Only the prefix index of the autocomplete text is used to find suggestions
+        queryset = self.get_queryset(backend, score_field='_search_score', partial_only=True)
+        return [(pk, title) for pk, title, score in queryset.values_list('pk', field, '_search_score')[:limit]]
+
+
+class DatabaseFullTextSearchResults(DatabaseSearchResults):
+    def get_queryset(self):
+        return self.query.get_queryset(self.backend, self._score_field)[self.start:self.stop]
+
+    def _do_search(self):
+        return self.get_queryset()
+
+    def get_facet_queryset(self):
+        return self.query.get_queryset(self.backend)
+
+
+class DatabaseFullTextSearchBackend(BaseSearchBackend):
+    query_class = DatabaseFullTextSearchQuery
+    results_class = DatabaseFullTextSearchResults
+    index_class = DatabaseIndex
+    rebuilder_class = DatabaseIndexRebuilder
+
+    def __init__(self, params):
+        super(DatabaseFullTextSearchBackend, self).__init__(params)
+
+        # The PostgreSQL text search configuration, which sets the language used to
+        # stem words and the stop words that are ignored
+        self.search_config = params.pop('SEARCH_CONFIG', 'english')
+
+        self._vendors = {}
+
+    def get_vendor(self, using):
+        """
+        Returns the name of the full-text search implementation to use on the given
+        database, or None if it doesn't have one.
+        """
+        if using not in self._vendors:
+            connection = connections[using]
+            vendor = None
+
+            if connection.vendor == 'postgresql':
+                vendor = 'postgresql'
+            elif connection.vendor == 'sqlite':
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+                    if cursor.fetchone():
+                        vendor = 'sqlite'
+
+            self._vendors[using] = vendor
+
+        return self._vendors[using]
+
+    def get_index_for_model(self, model):
+        return self.get_index()
+
+    def get_index(self):
+        return self.index_class(self, router.db_for_write(IndexEntry))
+
+    def get_rebuilder(self):
+        return self.rebuilder_class(self.get_index())
+
+    def reset_index(self):
+        self.get_rebuilder().reset_index()
+
+    def add_type(self, model):
+        pass  # Not needed
+
+    def refresh_index(self):
+        pass  # Not needed
+
+    def add(self, obj):
+        self.get_index_for_model(type(obj)).add_item(obj)
+
+    def add_bulk(self, model, obj_list):
+        self.get_index_for_model(model).add_items(model, obj_list)
+
+    def delete(self, obj):
+        self.get_index_for_model(type(obj)).delete_item(obj)
+
+
+SearchBackend = DatabaseFullTextSearchBackend
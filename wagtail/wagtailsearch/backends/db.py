@@ -1,10 +1,12 @@
 from __future__ import absolute_import, unicode_literals
 
+from collections import OrderedDict
+
 from django.db import models
 from django.db.models.expressions import Value
 
 from wagtail.wagtailsearch.backends.base import (
-    BaseSearchBackend, BaseSearchQuery, BaseSearchResults)
+    BaseSearchBackend, BaseSearchQuery, BaseSearchResults, FieldError)
 
 
 class DatabaseSearchQuery(BaseSearchQuery):
@@ -65,6 +67,46 @@ class DatabaseSearchQuery(BaseSearchQuery):
 
         return q
 
+    def get_suggestion_fields(self, field):
+        """
+        Returns the names of the fields that suggestions are matched against: the
+        search fields that allow partial matches, or `field` if there are none.
+        """
+        model = self.queryset.model
+        concrete_field_names = {
+            model_field.name for model_field in model._meta.get_fields()
+            if model_field.concrete and not model_field.is_relation
+        }
+
+        if field not in concrete_field_names:
+            raise FieldError(
+                'Cannot suggest with field "' + field + '" as it is not a field of ' + model.__name__ + '.'
+            )
+
+        return [
+            search_field.field_name for search_field in model.get_searchable_search_fields()
+            if search_field.partial_match and search_field.field_name in concrete_field_names
+        ] or [field]
+
+    def get_suggestions(self, backend, field, limit):
+        # Run _get_filters_from_queryset to test that no fields that are not
+        # a FilterField have been used in the query.
+        self._get_filters_from_queryset()
+
+        fields = self.get_suggestion_fields(field)
+
+        q = models.Q()
+        for term in self.query_string.split():
+            term_query = models.Q()
+            for field_name in fields:
+                # Match the start of the field, or of any word after the first
+                term_query |= models.Q(**{'%s__istartswith' % field_name: term})
+                term_query |= models.Q(**{'%s__icontains' % field_name: ' ' + term})
+
+            q &= term_query
+
+        return self.queryset.filter(q).order_by(field).values_list('pk', field)[:limit]
+
 
 class DatabaseSearchResults(BaseSearchResults):
     def get_queryset(self):
@@ -84,6 +126,24 @@ class DatabaseSearchResults(BaseSearchResults):
     def _do_count(self):
         return self.get_queryset().count()
 
+    def get_facet_queryset(self):
+        """
+        Returns the queryset of all matching objects, ignoring the slicing of the results
+        """
+        return self.query.queryset.filter(self.query.get_extra_q())
+
+    def _do_facet(self, field):
+        attname = field.get_attname(self.query.queryset.model)
+        counts = (
+            self.get_facet_queryset().values(attname)
+            .annotate(count=models.Count('pk', distinct=True)).order_by('-count', attname)
+        )
+
+        return OrderedDict(
+            (row[attname], row['count'])
+            for row in counts if row[attname] is not None
+        )
+
 
 class DatabaseSearchBackend(BaseSearchBackend):
     query_class = DatabaseSearchQuery
@@ -1,19 +1,52 @@
 from __future__ import absolute_import, unicode_literals
 
 import copy
+import datetime
 import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from django.utils.crypto import get_random_string
 from django.utils.six.moves.urllib.parse import urlparse
 from elasticsearch import Elasticsearch, NotFoundError
-from elasticsearch.helpers import bulk
+from elasticsearch.helpers import BulkIndexError, bulk
 
 from wagtail.utils.utils import deep_update
 from wagtail.wagtailsearch.backends.base import (
     BaseSearchBackend, BaseSearchQuery, BaseSearchResults)
+from wagtail.wagtailsearch.change_log import CHANGE_LOG_MARGIN, replay_changes
 from wagtail.wagtailsearch.index import (
-    FilterField, Indexed, RelatedFields, SearchField, class_is_indexed)
+    FilterField, Indexed, RelatedFields, SearchField, class_is_indexed, get_field_timings,
+    get_indexed_models)
+
+
+# Elasticsearch clients, shared by all backends that connect in the same way
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(hosts, **options):
+    """
+    Returns an Elasticsearch client for the given hosts and options. Each process keeps
+    one client (and so one pool of connections) for each set of hosts and options,
+    rather than connecting again each time a backend is loaded.
+    """
+    # Clients aren't shared with processes forked from this one, as they would share
+    # its sockets
+    key = (os.getpid(), Elasticsearch, repr(hosts), repr(sorted(options.items())))
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = Elasticsearch(hosts=hosts, **options)
+
+    return client
 
 
 class ElasticsearchMapping(object):
@@ -144,57 +177,108 @@ class ElasticsearchMapping(object):
     def get_document_id(self, obj):
         return obj.indexed_get_toplevel_content_type() + ':' + str(obj.pk)
 
-    def _get_nested_document(self, fields, obj):
-        doc = {}
-        partials = []
-        model = type(obj)
-        mapping = type(self)(model)
-
-        for field in fields:
-            value = field.get_value(obj)
-            doc[mapping.get_field_column_name(field)] = value
-
-            # Check if this field should be added into _partials
-            if isinstance(field, SearchField) and field.partial_match:
-                partials.append(value)
+    def get_document_builder(self):
+        key = (type(self), self.model)
+        builder = _document_builders.get(key)
+        if builder is None:
+            builder = _document_builders[key] = ElasticsearchDocumentBuilder(type(self), self.model)
 
-        return doc, partials
+        return builder
 
     def get_document(self, obj):
         # Build document
         doc = dict(pk=str(obj.pk), content_type=self.model.indexed_get_content_type())
-        partials = []
-        for field in self.model.get_search_fields():
-            value = field.get_value(obj)
+        doc.update(self.get_document_builder().build(obj))
+
+        return doc
+
+    def __repr__(self):
+        return '<ElasticsearchMapping: %s>' % (self.model.__name__, )
+
+
+# Document builders for each mapping class and model, created when first used
+_document_builders = {}
+
+
+class ElasticsearchDocumentBuilder(object):
+    """
+    Builds the search fields of the documents of a model's objects (including the
+    nested documents of RelatedFields). The search fields, their column names and how
+    to get their values are all worked out when the builder is created, rather than
+    for each object.
+
+    If field timings are being recorded (see index.record_field_timings), the time
+    taken to get the value of each field is added to them.
+    """
+    def __init__(self, mapping_class, model):
+        self.fields = self.compile_fields(mapping_class, model, model.get_search_fields())
+
+    def compile_fields(self, mapping_class, model, fields, prefix=''):
+        """
+        Returns a list of (name, column name, value getter, partial match, nested fields)
+        tuples for the given search fields of the model. Nested fields are compiled in
+        the same way, and are None for fields that aren't RelatedFields.
+        """
+        mapping = mapping_class(model)
+        compiled_fields = []
+
+        for field in fields:
+            name = prefix + field.field_name
+            nested_fields = None
 
             if isinstance(field, RelatedFields):
-                if isinstance(value, models.Manager):
-                    nested_docs = []
+                related_model = field.get_field(model).related_model
+                if related_model is not None:
+                    nested_fields = self.compile_fields(mapping_class, related_model, field.fields, name + '.')
 
-                    for nested_obj in value.all():
-                        nested_doc, extra_partials = self._get_nested_document(field.fields, nested_obj)
-                        nested_docs.append(nested_doc)
-                        partials.extend(extra_partials)
+            compiled_fields.append((
+                name,
+                mapping.get_field_column_name(field),
+                field.get_value_getter(model),
+                isinstance(field, SearchField) and field.partial_match,
+                nested_fields,
+            ))
 
-                    value = nested_docs
+        return compiled_fields
+
+    def build_fields(self, fields, obj, partials, timings):
+        doc = {}
+
+        for name, column_name, get_value, partial_match, nested_fields in fields:
+            if timings is not None:
+                start_time = time.time()
+
+            value = get_value(obj)
+
+            if nested_fields is not None:
+                if isinstance(value, models.Manager):
+                    value = [
+                        self.build_fields(nested_fields, nested_obj, partials, timings)
+                        for nested_obj in value.all()
+                    ]
                 elif isinstance(value, models.Model):
-                    value, extra_partials = self._get_nested_document(field.fields, value)
-                    partials.extend(extra_partials)
+                    value = self.build_fields(nested_fields, value, partials, timings)
+
+            if timings is not None:
+                field_timing = timings.setdefault(name, [0, 0])
+                field_timing[0] += time.time() - start_time
+                field_timing[1] += 1
 
-            doc[self.get_field_column_name(field)] = value
+            doc[column_name] = value
 
             # Check if this field should be added into _partials
-            if isinstance(field, SearchField) and field.partial_match:
+            if partial_match:
                 partials.append(value)
 
-        # Add partials to document
+        return doc
+
+    def build(self, obj):
+        partials = []
+        doc = self.build_fields(self.fields, obj, partials, get_field_timings())
         doc['_partials'] = partials
 
         return doc
 
-    def __repr__(self):
-        return '<ElasticsearchMapping: %s>' % (self.model.__name__, )
-
 
 class ElasticsearchSearchQuery(BaseSearchQuery):
     mapping_class = ElasticsearchMapping
@@ -411,6 +495,33 @@ class ElasticsearchSearchQuery(BaseSearchQuery):
             # Order by pk field
             return ['pk']
 
+    def get_suggestions(self, backend, field, limit):
+        model = self.queryset.model
+        searchable_fields = {f.field_name: f for f in model.get_searchable_search_fields()}
+        column_name = self.mapping.get_field_column_name(searchable_fields[field])
+
+        # Match the terms against the edge ngrams of the fields that allow partial
+        # matches, and only fetch the primary key and the suggested field
+        query = type(self)(self.queryset, self.query_string, fields=['_partials'], operator=self.operator)
+        hits = backend.es.search(
+            index=backend.get_index_for_model(model).name,
+            body={
+                'query': query.get_query(),
+                '_source': ['pk', column_name],
+            },
+            size=limit,
+        )
+
+        # The primary key of a child model is a link to its parent
+        pk_field = model._meta.pk
+        while pk_field.is_relation:
+            pk_field = pk_field.target_field
+
+        return [
+            (pk_field.to_python(hit['_source']['pk']), hit['_source'].get(column_name))
+            for hit in hits['hits']['hits']
+        ]
+
     def __repr__(self):
         return json.dumps(self.get_query())
 
@@ -418,6 +529,9 @@ class ElasticsearchSearchQuery(BaseSearchQuery):
 class ElasticsearchSearchResults(BaseSearchResults):
     fields_param_name = 'fields'
 
+    # The number of values returned by terms aggregations. 0 returns all of them
+    facet_size = 0
+
     def _get_es_body(self, for_count=False):
         body = {
             'query': self.query.get_query()
@@ -481,6 +595,36 @@ class ElasticsearchSearchResults(BaseSearchResults):
 
         return max(hit_count, 0)
 
+    def _do_facet(self, field):
+        body = self._get_es_body(for_count=True)
+        body['aggregations'] = {
+            'facet': {
+                'terms': {
+                    'field': self.query.mapping.get_field_column_name(field),
+                    'size': self.facet_size,
+                }
+            }
+        }
+
+        response = self.backend.es.search(
+            index=self.backend.get_index_for_model(self.query.queryset.model).name,
+            body=body,
+            size=0,
+        )
+
+        is_boolean = field.get_type(self.query.queryset.model) in ('BooleanField', 'NullBooleanField')
+
+        facet = OrderedDict()
+        for bucket in response['aggregations']['facet']['buckets']:
+            key = bucket['key']
+            if is_boolean:
+                # Boolean terms are returned as "T"/"F" by Elasticsearch 1 and as 1/0 by later versions
+                key = key in ('T', 1)
+
+            facet[key] = bucket['doc_count']
+
+        return facet
+
 
 class ElasticsearchIndex(object):
     def __init__(self, backend, name):
@@ -501,6 +645,17 @@ class ElasticsearchIndex(object):
     def exists(self):
         return self.es.indices.exists(self.name)
 
+    def get_creation_date(self):
+        index_settings = self.es.indices.get_settings(index=self.name)[self.name]['settings']
+        created_at = datetime.datetime.fromtimestamp(
+            int(index_settings['index']['creation_date']) / 1000, timezone.utc
+        )
+
+        if not settings.USE_TZ:
+            created_at = timezone.make_naive(created_at)
+
+        return created_at
+
     def is_alias(self):
         return self.es.indices.exists_alias(self.name)
 
@@ -535,21 +690,16 @@ class ElasticsearchIndex(object):
         )
 
     def add_item(self, item):
-        # Make sure the object can be indexed
-        if not class_is_indexed(item.__class__):
-            return
-
-        # Get mapping
-        mapping = self.mapping_class(item.__class__)
-
-        # Add document to index
-        self.es.index(
-            self.name, mapping.get_document_type(), mapping.get_document(item), id=mapping.get_document_id(item)
-        )
+        self.add_items(item.__class__, [item])
 
-    def add_items(self, model, items):
+    def prepare_items(self, model, items):
+        """
+        Returns the list of bulk actions that add_items would send to Elasticsearch
+        for the given items. The actions are plain data, so they can be built in
+        another process and then sent with add_prepared_items.
+        """
         if not class_is_indexed(model):
-            return
+            return []
 
         # Get mapping
         mapping = self.mapping_class(model)
@@ -567,26 +717,36 @@ class ElasticsearchIndex(object):
             action.update(mapping.get_document(item))
             actions.append(action)
 
-        # Run the actions
-        bulk(self.es, actions)
+        return actions
 
-    def delete_item(self, item):
-        # Make sure the object can be indexed
-        if not class_is_indexed(item.__class__):
+    def add_prepared_items(self, actions):
+        with self.backend.batch() as writer:
+            writer.add_actions(actions)
+
+    def add_items(self, model, items):
+        self.add_prepared_items(self.prepare_items(model, items))
+
+    def delete_items(self, model, items):
+        if not class_is_indexed(model):
             return
 
         # Get mapping
-        mapping = self.mapping_class(item.__class__)
+        mapping = self.mapping_class(model)
+        doc_type = mapping.get_document_type()
 
-        # Delete document
-        try:
-            self.es.delete(
-                self.name,
-                mapping.get_document_type(),
-                mapping.get_document_id(item),
-            )
-        except NotFoundError:
-            pass  # Document doesn't exist, ignore this exception
+        with self.backend.batch() as writer:
+            writer.add_actions([
+                {
+                    '_op_type': 'delete',
+                    '_index': self.name,
+                    '_type': doc_type,
+                    '_id': mapping.get_document_id(item),
+                }
+                for item in items
+            ])
+
+    def delete_item(self, item):
+        self.delete_items(item.__class__, [item])
 
     def refresh(self):
         self.es.indices.refresh(self.name)
@@ -612,6 +772,16 @@ class ElasticsearchIndexRebuilder(object):
 
         return self.index
 
+    def resume(self, index_name):
+        """
+        Continues a rebuild that was interrupted, without resetting the index.
+        Returns None if the index being rebuilt no longer exists.
+        """
+        if not self.index.exists():
+            return
+
+        return self.index
+
     def finish(self):
         self.index.refresh()
 
@@ -623,6 +793,7 @@ class ElasticsearchAtomicIndexRebuilder(ElasticsearchIndexRebuilder):
             index.backend,
             self.alias.name + '_' + get_random_string(7).lower()
         )
+        self.started_at = None
 
     def reset_index(self):
         # Delete old index using the alias
@@ -636,12 +807,44 @@ class ElasticsearchAtomicIndexRebuilder(ElasticsearchIndexRebuilder):
         self.index.put_alias(self.alias.name)
 
     def start(self):
+        # Changes made from now on are written to the old index, and need to be
+        # replayed into the new one when it is finished
+        self.started_at = timezone.now()
+
         # Create the new index
         self.index.put()
 
         return self.index
 
+    def resume(self, index_name):
+        # Carry on filling the new index created by the interrupted rebuild
+        self.index = self.alias.backend.index_class(self.alias.backend, index_name)
+
+        index = super(ElasticsearchAtomicIndexRebuilder, self).resume(index_name)
+        if index is not None:
+            self.started_at = self.index.get_creation_date()
+
+        return index
+
+    def get_models(self):
+        backend = self.alias.backend
+        return [
+            model for model in get_indexed_models()
+            if backend.get_index_for_model(model).name == self.alias.name
+        ]
+
+    def replay_changes(self, since):
+        """
+        Indexes the objects that have changed since the given time into the new index
+        """
+        if since is not None:
+            replay_changes(self.index, self.get_models(), since - CHANGE_LOG_MARGIN)
+
     def finish(self):
+        # Index the objects that changed while the new index was being built
+        replayed_at = timezone.now()
+        self.replay_changes(self.started_at)
+
         self.index.refresh()
 
         if self.alias.is_alias():
@@ -672,6 +875,44 @@ class ElasticsearchAtomicIndexRebuilder(ElasticsearchIndexRebuilder):
             # Create the alias
             self.index.put_alias(self.alias.name)
 
+        # Changes made while the objects above were being indexed were written to the
+        # old index. From now on, they are written to the new one.
+        self.replay_changes(replayed_at)
+
+
+class ElasticsearchBulkWriter(object):
+    """
+    Collects the index and delete actions sent to a backend, and sends them to
+    Elasticsearch in bulk requests of up to ``chunk_size`` actions.
+    """
+    def __init__(self, es, chunk_size=500, request_timeout=None):
+        self.es = es
+        self.chunk_size = chunk_size
+        self.request_timeout = request_timeout
+        self.actions = []
+
+    def add_actions(self, actions):
+        self.actions.extend(actions)
+
+        if len(self.actions) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        actions, self.actions = self.actions, []
+        if not actions:
+            return
+
+        kwargs = {}
+        if self.request_timeout is not None:
+            kwargs['request_timeout'] = self.request_timeout
+
+        success, errors = bulk(self.es, actions, chunk_size=self.chunk_size, raise_on_error=False, **kwargs)
+
+        # Deleting a document that isn't in the index is not an error
+        errors = [error for error in errors if error.get('delete', {}).get('status') != 404]
+        if errors:
+            raise BulkIndexError('%i document(s) failed to index.' % len(errors), errors)
+
 
 class ElasticsearchSearchBackend(BaseSearchBackend):
     index_class = ElasticsearchIndex
@@ -725,6 +966,16 @@ class ElasticsearchSearchBackend(BaseSearchBackend):
         }
     }
 
+    # Connection settings, and the keyword arguments of the Elasticsearch client they are passed to
+    connection_params = {
+        'MAXSIZE': 'maxsize',
+        'MAX_RETRIES': 'max_retries',
+        'RETRY_ON_TIMEOUT': 'retry_on_timeout',
+        'SNIFF_ON_START': 'sniff_on_start',
+        'SNIFF_ON_CONNECTION_FAIL': 'sniff_on_connection_fail',
+        'SNIFFER_TIMEOUT': 'sniffer_timeout',
+    }
+
     def __init__(self, params):
         super(ElasticsearchSearchBackend, self).__init__(params)
 
@@ -732,6 +983,9 @@ class ElasticsearchSearchBackend(BaseSearchBackend):
         self.hosts = params.pop('HOSTS', None)
         self.index_name = params.pop('INDEX', 'wagtail')
         self.timeout = params.pop('TIMEOUT', 10)
+        self.bulk_timeout = params.pop('BULK_TIMEOUT', None)
+        self.bulk_chunk_size = params.pop('BULK_CHUNK_SIZE', 500)
+        self._writer = None
 
         if params.pop('ATOMIC_REBUILD', False):
             self.rebuilder_class = self.atomic_rebuilder_class
@@ -767,12 +1021,14 @@ class ElasticsearchSearchBackend(BaseSearchBackend):
 
         # Get Elasticsearch interface
         # Any remaining params are passed into the Elasticsearch constructor
-        options = params.pop('OPTIONS', {})
+        connection_options = {'timeout': self.timeout}
+        for param, option in self.connection_params.items():
+            if param in params:
+                connection_options[option] = params.pop(param)
 
-        self.es = Elasticsearch(
-            hosts=self.hosts,
-            timeout=self.timeout,
-            **options)
+        connection_options.update(params.pop('OPTIONS', {}))
+
+        self.es = get_client(self.hosts, **connection_options)
 
     def get_index_for_model(self, model):
         return self.index_class(self, self.index_name)
@@ -780,6 +1036,10 @@ class ElasticsearchSearchBackend(BaseSearchBackend):
     def get_index(self):
         return self.index_class(self, self.index_name)
 
+    def get_cache_namespace(self):
+        # Backends of the same class can use different indexes
+        return '%s:%s:%r' % (super(ElasticsearchSearchBackend, self).get_cache_namespace(), self.index_name, self.hosts)
+
     def get_rebuilder(self):
         return self.rebuilder_class(self.get_index())
 
@@ -802,5 +1062,27 @@ class ElasticsearchSearchBackend(BaseSearchBackend):
     def delete(self, obj):
         self.get_index_for_model(type(obj)).delete_item(obj)
 
+    def delete_bulk(self, model, obj_list):
+        self.get_index_for_model(model).delete_items(model, obj_list)
+
+    @contextmanager
+    def batch(self):
+        """
+        Collects the changes made inside this context manager, and sends them to
+        Elasticsearch in bulk requests when it exits. Outside of it, each change is
+        sent as soon as it is made.
+        """
+        if self._writer is not None:
+            # Already collecting changes
+            yield self._writer
+            return
+
+        self._writer = ElasticsearchBulkWriter(self.es, self.bulk_chunk_size, self.bulk_timeout)
+        try:
+            yield self._writer
+            self._writer.flush()
+        finally:
+            self._writer = None
+
 
 SearchBackend = ElasticsearchSearchBackend
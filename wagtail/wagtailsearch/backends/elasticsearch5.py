@@ -73,6 +73,9 @@ class Elasticsearch5SearchQuery(Elasticsearch2SearchQuery):
 class Elasticsearch5SearchResults(Elasticsearch2SearchResults):
     fields_param_name = 'stored_fields'
 
+    # Elasticsearch 5 no longer accepts 0 to return all values
+    facet_size = 2 ** 31 - 1
+
 
 class Elasticsearch5SearchBackend(Elasticsearch2SearchBackend):
     mapping_class = Elasticsearch5Mapping
@@ -0,0 +1,106 @@
+"""
+Tracking changes to indexed objects.
+
+When change tracking is enabled, the time that each indexed object was last saved or
+deleted is recorded in the IndexChange model. This is used to:
+
+ - index the objects that change while an Elasticsearch index is being rebuilt with
+   ATOMIC_REBUILD into the new index, as those changes are written to the old one
+ - index only the objects that have changed since a given time, with
+   update_index --since
+
+Change tracking is enabled by setting WAGTAILSEARCH_TRACK_CHANGES to True. It is off by
+default, as it adds a write to every save of an indexed object, and the records need to
+be removed by search_garbage_collect.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import datetime
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from wagtail.wagtailsearch.index import get_objects_to_reindex
+
+# Changes are replayed from a little before the time they are needed from, to allow
+# for transactions that were still open at that time and for differences between
+# the clocks of the servers involved
+CHANGE_LOG_MARGIN = datetime.timedelta(minutes=5)
+
+
+def change_tracking_enabled():
+    return getattr(settings, 'WAGTAILSEARCH_TRACK_CHANGES', False)
+
+
+def record_change(model, pk):
+    """
+    Records that the `model` object with primary key `pk` has just been saved or deleted.
+    """
+    # Import here to prevent models being imported before the app registry is ready
+    from django.contrib.contenttypes.models import ContentType
+    from wagtail.wagtailsearch.models import IndexChange
+
+    content_type = ContentType.objects.get_for_model(model, for_concrete_model=False)
+    object_id = str(pk)
+    now = timezone.now()
+
+    if not IndexChange.objects.filter(content_type=content_type, object_id=object_id).update(changed_at=now):
+        try:
+            with transaction.atomic():
+                IndexChange.objects.create(content_type=content_type, object_id=object_id, changed_at=now)
+        except IntegrityError:
+            # Recorded by another process in the meantime
+            IndexChange.objects.filter(content_type=content_type, object_id=object_id).update(changed_at=now)
+
+
+def get_changes(since, models=None):
+    """
+    Returns an ordered mapping of models to the primary keys of their objects that
+    have changed since the given time. If `models` is given, only changes to objects
+    of those models are returned.
+    """
+    from django.contrib.contenttypes.models import ContentType
+    from wagtail.wagtailsearch.models import IndexChange
+
+    changes = (
+        IndexChange.objects.filter(changed_at__gte=since)
+        .order_by('changed_at').values_list('content_type_id', 'object_id')
+    )
+
+    pks_by_model = OrderedDict()
+    for content_type_id, object_id in changes:
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if model is None or (models is not None and model not in models):
+            continue
+
+        # The primary key of a child model is a link to its parent
+        pk_field = model._meta.pk
+        while pk_field.is_relation:
+            pk_field = pk_field.target_field
+
+        pks_by_model.setdefault(model, []).append(pk_field.to_python(object_id))
+
+    return pks_by_model
+
+
+def replay_changes(index, models, since):
+    """
+    Brings the entries in `index` of the objects of the given models that have changed
+    since the given time up to date. Returns the number of objects updated.
+    """
+    object_count = 0
+
+    for model, pks in get_changes(since, models).items():
+        objects, removed_objects = get_objects_to_reindex(model, pks)
+
+        if objects:
+            index.add_items(model, objects)
+
+        if removed_objects:
+            index.delete_items(model, removed_objects)
+
+        object_count += len(pks)
+
+    return object_count
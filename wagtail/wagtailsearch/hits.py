@@ -0,0 +1,178 @@
+"""
+Buffered logging of search query hits.
+
+By default, each search made through the frontend search view is logged as soon as it
+is made, which takes several queries (and a write to a heavily contended row for
+popular searches). When WAGTAILSEARCH_HITS_FLUSH_INTERVAL is set, hits are instead
+counted in memory by each process, and written to the database in bulk once the given
+number of seconds have passed since they were last written (or when the process exits).
+The counts recorded in the database are the same, they are just brought up to date
+less often. If the hits can't be written, the error is logged and they are kept until
+the next time the hits are written, so searches don't fail because of it.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, models, transaction
+from django.utils import timezone
+
+from wagtail.wagtailsearch.utils import normalise_query_string
+
+logger = logging.getLogger('wagtail.search')
+
+# Hits are written early if this many different queries are waiting to be written
+MAX_BUFFERED_HITS = 1000
+
+
+def get_flush_interval():
+    return getattr(settings, 'WAGTAILSEARCH_HITS_FLUSH_INTERVAL', None)
+
+
+class HitBuffer(object):
+    """
+    Counts the hits of each query on each day until they are flushed to the database.
+    """
+    def __init__(self):
+        self.hits = Counter()
+        self.last_flush = time.time()
+        self.flush_failed = False
+        self.lock = threading.Lock()
+
+    def add(self, query_string, date):
+        with self.lock:
+            self.hits[(query_string, date)] += 1
+            flush_due = (
+                time.time() - self.last_flush >= get_flush_interval() or
+                # After a failure, wait for the interval rather than trying on every hit
+                (len(self.hits) >= MAX_BUFFERED_HITS and not self.flush_failed)
+            )
+
+        if flush_due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            hits, self.hits = self.hits, Counter()
+            self.last_flush = time.time()
+
+        if not hits:
+            return
+
+        try:
+            save_hits(hits)
+        except Exception:
+            logger.exception("Failed to save %d buffered search query hits", sum(hits.values()))
+
+            # Keep them for the next flush
+            with self.lock:
+                self.hits.update(hits)
+                self.flush_failed = True
+        else:
+            self.flush_failed = False
+
+
+hit_buffer = HitBuffer()
+
+
+@atexit.register
+def _flush_hits_at_exit():
+    # The connection of this thread may have been closed by the server, or timed out
+    close_old_connections()
+    hit_buffer.flush()
+
+
+def add_hit(query_string, date=None):
+    """
+    Logs a search for `query_string`. The hit is written to the database straight away,
+    unless buffering is enabled with WAGTAILSEARCH_HITS_FLUSH_INTERVAL.
+    """
+    if date is None:
+        date = timezone.now().date()
+
+    if get_flush_interval() is None:
+        # Import here to prevent models being imported before the app registry is ready
+        from wagtail.wagtailsearch.models import Query
+        Query.get(query_string).add_hit(date=date)
+    else:
+        hit_buffer.add(normalise_query_string(query_string), date)
+
+
+def flush_hits():
+    """
+    Writes any hits buffered by this process to the database.
+    """
+    hit_buffer.flush()
+
+
+def save_hits(hits):
+    """
+    Adds hit counts to the database in bulk. `hits` maps (normalised query string, date)
+    pairs to the number of hits to add.
+    """
+    from wagtail.wagtailsearch.models import QueryDailyHits
+
+    with transaction.atomic():
+        query_ids = get_query_ids(set(query_string for query_string, date in hits))
+
+        hits_by_query_and_date = {
+            (query_ids[query_string], date): count
+            for (query_string, date), count in hits.items()
+        }
+
+        # Add to the counts that already exist, with one update for each distinct increment
+        existing = QueryDailyHits.objects.filter(
+            query_id__in=set(query_ids.values()),
+            date__in=set(date for query_string, date in hits),
+        ).values_list('pk', 'query_id', 'date')
+
+        pks_by_increment = {}
+        for pk, query_id, date in existing:
+            count = hits_by_query_and_date.pop((query_id, date), None)
+            if count is not None:
+                pks_by_increment.setdefault(count, []).append(pk)
+
+        for count, pks in pks_by_increment.items():
+            QueryDailyHits.objects.filter(pk__in=pks).update(hits=models.F('hits') + count)
+
+        # Create the rest
+        try:
+            with transaction.atomic():
+                QueryDailyHits.objects.bulk_create([
+                    QueryDailyHits(query_id=query_id, date=date, hits=count)
+                    for (query_id, date), count in hits_by_query_and_date.items()
+                ])
+        except IntegrityError:
+            # Some of these were created by another process in the meantime
+            for (query_id, date), count in hits_by_query_and_date.items():
+                daily_hits, created = QueryDailyHits.objects.get_or_create(query_id=query_id, date=date)
+                QueryDailyHits.objects.filter(pk=daily_hits.pk).update(hits=models.F('hits') + count)
+
+
+def get_query_ids(query_strings):
+    """
+    Returns a dict mapping each of the given (normalised) query strings to the ID of
+    its Query record, creating the records that don't exist yet.
+    """
+    from wagtail.wagtailsearch.models import Query
+
+    query_ids = dict(Query.objects.filter(query_string__in=query_strings).values_list('query_string', 'id'))
+    missing = query_strings.difference(query_ids)
+
+    if missing:
+        try:
+            with transaction.atomic():
+                Query.objects.bulk_create([Query(query_string=query_string) for query_string in missing])
+        except IntegrityError:
+            # Some of these were created by another process in the meantime
+            for query_string in missing:
+                Query.objects.get_or_create(query_string=query_string)
+
+        query_ids.update(Query.objects.filter(query_string__in=missing).values_list('query_string', 'id'))
+
+    return query_ids
@@ -2,18 +2,25 @@ from __future__ import absolute_import, unicode_literals
 
 import inspect
 import logging
+import threading
+from contextlib import contextmanager
 
 from django.apps import apps
 from django.core import checks
+from django.core.exceptions import ObjectDoesNotExist
 from django.db import models
 from django.db.models.fields import FieldDoesNotExist
 from django.db.models.fields.related import ForeignObjectRel, OneToOneRel, RelatedField
 
 from wagtail.wagtailsearch.backends import get_search_backends_with_name
+from wagtail.wagtailsearch.results_cache import invalidate_results_cache
 
 
 logger = logging.getLogger('wagtail.search.index')
 
+# The number of objects to load from the database at a time in reindex_objects
+REINDEX_CHUNK_SIZE = 500
+
 
 class Indexed(object):
     @classmethod
@@ -151,6 +158,9 @@ def insert_or_update_object(instance):
                 # Catch and log all errors
                 logger.exception("Exception raised while adding %r into the '%s' search backend", indexed_instance, backend_name)
 
+        # Only once the index has changed, or searches in between would cache the old results
+        invalidate_results_cache(type(indexed_instance))
+
 
 def remove_object(instance):
     indexed_instance = get_indexed_instance(instance, check_exists=False)
@@ -163,6 +173,83 @@ def remove_object(instance):
                 # Catch and log all errors
                 logger.exception("Exception raised while deleting %r from the '%s' search backend", indexed_instance, backend_name)
 
+        invalidate_results_cache(type(indexed_instance))
+
+
+def get_objects_to_reindex(model, pks):
+    """
+    Loads the `model` objects with the given primary keys. Returns a list of the objects
+    to add to the index, and a list of (unsaved) objects standing in for the ones that
+    have been deleted or are excluded from the model's indexed objects, which should
+    be removed from it.
+    """
+    pks = list(pks)
+    objects = []
+    for i in range(0, len(pks), REINDEX_CHUNK_SIZE):
+        objects.extend(model.get_indexed_objects().filter(pk__in=pks[i:i + REINDEX_CHUNK_SIZE]))
+
+    found_pks = {obj.pk for obj in objects}
+    removed_objects = [model(pk=pk) for pk in pks if pk not in found_pks]
+
+    return objects, removed_objects
+
+
+def reindex_objects(model, pks):
+    """
+    Brings the search index entries of the given objects up to date, sending each
+    backend one bulk request for the objects that exist. Objects that have been deleted,
+    or that are excluded from the model's indexed objects, are removed from the index.
+
+    The objects must be instances of `model` exactly (as returned by get_indexed_instance),
+    rather than of a parent or child class.
+    """
+    pks = list(pks)
+    objects, removed_objects = get_objects_to_reindex(model, pks)
+
+    for backend_name, backend in get_search_backends_with_name(with_auto_update=True):
+        try:
+            # Send the additions and removals together, if the backend supports it
+            with backend.batch():
+                if objects:
+                    backend.add_bulk(model, objects)
+
+                if removed_objects:
+                    backend.delete_bulk(model, removed_objects)
+        except Exception:
+            # Catch and log all errors
+            logger.exception("Exception raised while updating %d %s objects in the '%s' search backend", len(pks), model.__name__, backend_name)
+
+    invalidate_results_cache(model)
+
+
+_field_timings = threading.local()
+
+
+@contextmanager
+def record_field_timings():
+    """
+    Records how long it takes to get the value of each search field while search
+    documents are built in this thread, inside this context manager. Yields a dict,
+    which is filled in with the total time in seconds and the number of values got for
+    each field, keyed by its name (with the names of the relations it is nested in).
+
+    Only the Elasticsearch backends record timings.
+    """
+    previous_timings = getattr(_field_timings, 'timings', None)
+    _field_timings.timings = timings = {}
+    try:
+        yield timings
+    finally:
+        _field_timings.timings = previous_timings
+
+
+def get_field_timings():
+    """
+    Returns the dict that field timings are being recorded in, or None if they aren't
+    being recorded.
+    """
+    return getattr(_field_timings, 'timings', None)
+
 
 class BaseField(object):
     def __init__(self, field_name, **kwargs):
@@ -200,17 +287,30 @@ class BaseField(object):
             return 'CharField'
 
     def get_value(self, obj):
+        return self.get_value_getter(obj.__class__)(obj)
+
+    def get_value_getter(self, cls):
+        """
+        Returns a function that gets the value of this field from an object of the
+        given class. This lets the field be looked up once for many objects.
+        """
         try:
-            field = self.get_field(obj.__class__)
-            value = field.value_from_object(obj)
-            if hasattr(field, 'get_searchable_content'):
-                value = field.get_searchable_content(value)
-            return value
+            field = self.get_field(cls)
         except models.fields.FieldDoesNotExist:
-            value = getattr(obj, self.field_name, None)
-            if hasattr(value, '__call__'):
-                value = value()
-            return value
+            field_name = self.field_name
+
+            def get_value(obj):
+                value = getattr(obj, field_name, None)
+                if hasattr(value, '__call__'):
+                    value = value()
+                return value
+
+            return get_value
+
+        if hasattr(field, 'get_searchable_content'):
+            return lambda obj: field.get_searchable_content(field.value_from_object(obj))
+
+        return field.value_from_object
 
     def __repr__(self):
         return '<%s: %s>' % (self.__class__.__name__, self.field_name)
@@ -240,38 +340,90 @@ class RelatedFields(object):
         return field.model
 
     def get_value(self, obj):
-        field = self.get_field(obj.__class__)
+        return self.get_value_getter(obj.__class__)(obj)
+
+    def get_value_getter(self, cls):
+        """
+        Returns a function that gets the related object (or manager of related objects)
+        of an object of the given class.
+        """
+        field = self.get_field(cls)
 
         if isinstance(field, RelatedField):
-            return getattr(obj, self.field_name)
+            field_name = self.field_name
+            return lambda obj: getattr(obj, field_name)
 
-    def select_on_queryset(self, queryset):
+        elif isinstance(field, ForeignObjectRel):
+            # Reverse relation
+            accessor_name = field.get_accessor_name()
+
+            def get_value(obj):
+                try:
+                    return getattr(obj, accessor_name)
+                except ObjectDoesNotExist:
+                    # Reverse OneToOneField with no related object
+                    return None
+
+            return get_value
+
+        return lambda obj: None
+
+    def get_related_lookups(self, cls, prefix='', many=False):
         """
-        This method runs either prefetch_related or select_related on the queryset
-        to improve indexing speed of the relation.
+        Returns two lists of lookups that fetch the objects of this relation, and of the
+        relations nested inside it, along with objects of the given class: one for
+        select_related and one for prefetch_related.
 
-        It decides which method to call based on the number of related objects:
-         - single (eg ForeignKey, OneToOne), it runs select_related
-         - multiple (eg ManyToMany, reverse ForeignKey) it runs prefetch_related
+        Relations to a single object (eg ForeignKey, OneToOne) are select_related, and
+        relations to multiple objects (eg ManyToMany, reverse ForeignKey) are
+        prefetch_related, as are any relations nested inside those.
         """
         try:
-            field = self.get_field(queryset.model)
+            relation = self.get_field(cls)
         except FieldDoesNotExist:
-            return queryset
+            return [], []
 
-        if isinstance(field, RelatedField):
-            if field.many_to_one or field.one_to_one:
-                queryset = queryset.select_related(self.field_name)
-            elif field.one_to_many or field.many_to_many:
-                queryset = queryset.prefetch_related(self.field_name)
-
-        elif isinstance(field, ForeignObjectRel):
-            # Reverse relation
-            if isinstance(field, OneToOneRel):
-                # select_related for reverse OneToOneField
-                queryset = queryset.select_related(self.field_name)
+        if isinstance(relation, RelatedField):
+            if relation.many_to_one or relation.one_to_one:
+                is_many = False
+            elif relation.one_to_many or relation.many_to_many:
+                is_many = True
             else:
-                # prefetch_related for anything else (reverse ForeignKey/ManyToManyField)
-                queryset = queryset.prefetch_related(self.field_name)
+                return [], []
+
+        elif isinstance(relation, ForeignObjectRel):
+            # Reverse relation. Only a reverse OneToOneField has a single object
+            is_many = not isinstance(relation, OneToOneRel)
+
+        else:
+            return [], []
+
+        lookup = prefix + self.field_name
+        many = many or is_many
+        select_related, prefetch_related = ([], [lookup]) if many else ([lookup], [])
+
+        for field in self.fields:
+            if isinstance(field, RelatedFields):
+                nested_select_related, nested_prefetch_related = field.get_related_lookups(
+                    relation.related_model, lookup + '__', many
+                )
+                select_related.extend(nested_select_related)
+                prefetch_related.extend(nested_prefetch_related)
+
+        return select_related, prefetch_related
+
+    def select_on_queryset(self, queryset):
+        """
+        This method runs select_related and prefetch_related on the queryset to
+        improve indexing speed of the relation, and of any relations nested in it.
+        See get_related_lookups.
+        """
+        select_related, prefetch_related = self.get_related_lookups(queryset.model)
+
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
 
         return queryset
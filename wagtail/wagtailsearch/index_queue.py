@@ -0,0 +1,119 @@
+"""
+Deferred search index updates.
+
+By default, the search index is updated as soon as an indexed object is saved or
+deleted, with one request to each backend per object. When WAGTAILSEARCH_INDEX_UPDATES
+is set to 'on_commit' or 'queue', changed objects are instead collected until the
+current transaction commits, so that each object is only indexed once however many
+times it was saved, and all of them are sent to the backends in bulk:
+
+ - 'on_commit' updates the index when the transaction commits
+ - 'queue' records the changed objects in the database, to be indexed by the
+   process_index_queue management command
+"""
+from __future__ import absolute_import, unicode_literals
+
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, router, transaction
+
+from wagtail.wagtailsearch.index import reindex_objects
+
+INDEX_UPDATE_MODES = ('immediate', 'on_commit', 'queue')
+
+_pending = threading.local()
+
+
+def get_index_update_mode():
+    mode = getattr(settings, 'WAGTAILSEARCH_INDEX_UPDATES', 'immediate')
+    if mode not in INDEX_UPDATE_MODES:
+        raise ImproperlyConfigured(
+            "WAGTAILSEARCH_INDEX_UPDATES must be one of %s (got %r)" % (', '.join(INDEX_UPDATE_MODES), mode)
+        )
+
+    return mode
+
+
+def get_pending_updates():
+    if not hasattr(_pending, 'updates'):
+        _pending.updates = OrderedDict()
+
+    return _pending.updates
+
+
+def add_pending_update(model, pk):
+    """
+    Records that the search index entry of the `model` object with primary key `pk` needs
+    updating once the current transaction commits.
+    """
+    get_pending_updates()[(model, pk)] = None
+
+    if hasattr(transaction, 'on_commit'):
+        # This is registered every time, because callbacks registered in a transaction
+        # that is rolled back are discarded. Once the updates are flushed, the
+        # remaining callbacks have nothing to do.
+        transaction.on_commit(flush_pending_updates, using=router.db_for_write(model))
+    else:
+        # Django 1.8 doesn't support on_commit hooks
+        flush_pending_updates()
+
+
+def group_by_model(model_pk_pairs):
+    pks_by_model = OrderedDict()
+    for model, pk in model_pk_pairs:
+        pks_by_model.setdefault(model, []).append(pk)
+
+    return pks_by_model
+
+
+def flush_pending_updates():
+    """
+    Sends all pending updates recorded by this thread to the search backends, or to the
+    index update queue.
+    """
+    updates = get_pending_updates()
+    if not updates:
+        return
+
+    pks_by_model = group_by_model(updates.keys())
+    updates.clear()
+
+    if get_index_update_mode() == 'queue':
+        for model, pks in pks_by_model.items():
+            queue_updates(model, pks)
+    else:
+        for model, pks in pks_by_model.items():
+            reindex_objects(model, pks)
+
+
+def queue_updates(model, pks):
+    # Import here to prevent models being imported before the app registry is ready
+    from django.contrib.contenttypes.models import ContentType
+    from wagtail.wagtailsearch.models import IndexUpdate
+
+    content_type = ContentType.objects.get_for_model(model, for_concrete_model=False)
+    object_ids = set(str(pk) for pk in pks)
+
+    # Skip objects that are already waiting to be indexed
+    object_ids.difference_update(
+        IndexUpdate.objects.filter(content_type=content_type, object_id__in=object_ids)
+        .values_list('object_id', flat=True)
+    )
+
+    try:
+        with transaction.atomic():
+            IndexUpdate.objects.bulk_create([
+                IndexUpdate(content_type=content_type, object_id=object_id)
+                for object_id in object_ids
+            ])
+    except IntegrityError:
+        # Some of these were queued by another process in the meantime
+        for object_id in object_ids:
+            try:
+                with transaction.atomic():
+                    IndexUpdate.objects.get_or_create(content_type=content_type, object_id=object_id)
+            except IntegrityError:
+                pass
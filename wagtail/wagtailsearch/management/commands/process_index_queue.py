@@ -0,0 +1,66 @@
+from __future__ import absolute_import, unicode_literals
+
+import time
+from collections import OrderedDict
+
+from django.core.management.base import BaseCommand
+
+from wagtail.wagtailsearch.index import reindex_objects
+from wagtail.wagtailsearch.models import IndexUpdate
+
+
+class Command(BaseCommand):
+
+    help = "Updates the search index entries of the objects queued when WAGTAILSEARCH_INDEX_UPDATES is 'queue'"
+
+    batch_size = 500
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', action='store', dest='interval', type=float, default=None,
+            help="Keep running, checking the queue every INTERVAL seconds while it is empty")
+
+    def process_batch(self):
+        index_updates = list(
+            IndexUpdate.objects.select_related('content_type').order_by('created_at', 'id')[:self.batch_size]
+        )
+
+        # Take the updates off the queue before the objects are reindexed, so that
+        # objects saved while this batch is being processed are queued again rather
+        # than being skipped as already queued. Errors are logged by reindex_objects,
+        # and the objects will be queued again the next time they are saved
+        IndexUpdate.objects.filter(id__in=[
+            index_update.id for index_update in index_updates
+        ]).delete()
+
+        object_ids_by_content_type = OrderedDict()
+        for index_update in index_updates:
+            object_ids_by_content_type.setdefault(index_update.content_type, []).append(index_update.object_id)
+
+        for content_type, object_ids in object_ids_by_content_type.items():
+            model = content_type.model_class()
+            if model is None:
+                # The model has been removed since the objects were queued
+                continue
+
+            # The primary key of a child model is a link to its parent
+            pk_field = model._meta.pk
+            while pk_field.is_relation:
+                pk_field = pk_field.target_field
+
+            reindex_objects(model, [pk_field.to_python(object_id) for object_id in object_ids])
+
+        return len(index_updates)
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+
+        while True:
+            count = self.process_batch()
+            if count:
+                if options['verbosity'] >= 2:
+                    self.stdout.write("Updated %d queued objects" % count)
+            elif interval is None:
+                break
+            else:
+                time.sleep(interval)
@@ -16,3 +16,8 @@ class Command(BaseCommand):
         self.stdout.write("Cleaning query records... ")
         models.Query.garbage_collect()
         self.stdout.write("Done")
+
+        # Clean index change log
+        self.stdout.write("Cleaning index change records... ")
+        models.IndexChange.garbage_collect()
+        self.stdout.write("Done")
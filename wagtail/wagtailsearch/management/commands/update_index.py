@@ -1,13 +1,24 @@
 from __future__ import absolute_import, unicode_literals
 
 import collections
+import datetime
+import json
+import os
+import time
+from multiprocessing import Pool
 
+from django.apps import apps
 from django.conf import settings
-from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 
 from wagtail.wagtailsearch.backends import get_search_backend
-from wagtail.wagtailsearch.index import get_indexed_models
+from wagtail.wagtailsearch.change_log import CHANGE_LOG_MARGIN, change_tracking_enabled, get_changes
+from wagtail.wagtailsearch.index import (
+    get_indexed_models, get_objects_to_reindex, record_field_timings)
+from wagtail.wagtailsearch.results_cache import invalidate_results_cache
 
 
 def group_models_by_index(backend, models):
@@ -51,11 +62,107 @@ def group_models_by_index(backend, models):
     ])
 
 
+def get_model_label(model):
+    return '%s.%s' % (model._meta.app_label, model.__name__)
+
+
+def prepare_index_items(job):
+    """
+    Builds the bulk actions that index a chunk of objects. Runs in a worker process,
+    so takes and returns plain data. Returns the actions, and the time spent on each
+    search field if field_timings is set (or None if not).
+    """
+    backend_name, index_name, model_label, field_timings, pks = job
+
+    backend = get_search_backend(backend_name)
+    index = backend.index_class(backend, index_name)
+    model = apps.get_model(model_label)
+    objects = model.get_indexed_objects().filter(pk__in=pks)
+
+    if not field_timings:
+        return index.prepare_items(model, objects), None
+
+    with record_field_timings() as timings:
+        actions = index.prepare_items(model, objects)
+
+    return actions, timings
+
+
+def add_field_timings(timings, other_timings):
+    for name, (seconds, count) in other_timings.items():
+        field_timing = timings.setdefault(name, [0, 0])
+        field_timing[0] += seconds
+        field_timing[1] += count
+
+
+class Checkpoint(object):
+    """
+    Records how far a rebuild of each index has got in a JSON file, so that the
+    rebuild can be resumed if it is interrupted. If no path is given, nothing is
+    recorded.
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self.data = {}
+
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.data = json.load(f)
+
+    def save(self):
+        if not self.path:
+            return
+
+        # Write to a temporary file first, so the checkpoint is never left half-written
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self.data, f)
+        os.rename(temp_path, self.path)
+
+    def get_index_state(self, backend_name, index_name):
+        return self.data.get(backend_name, {}).get(index_name)
+
+    def start_index(self, backend_name, index_name, rebuild_index_name):
+        self.data.setdefault(backend_name, {})[index_name] = {
+            'index': rebuild_index_name,
+            'models': {},
+        }
+        self.save()
+
+    def finish_index(self, backend_name, index_name):
+        self.data.get(backend_name, {}).pop(index_name, None)
+        if not self.data.get(backend_name, True):
+            del self.data[backend_name]
+
+        if self.path and not self.data:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        else:
+            self.save()
+
+    def get_model_state(self, backend_name, index_name, model):
+        return self.data[backend_name][index_name]['models'].get(get_model_label(model), {
+            'last_pk': None,
+            'count': 0,
+            'done': False,
+        })
+
+    def update_model(self, backend_name, index_name, model, **state):
+        model_state = self.get_model_state(backend_name, index_name, model)
+        model_state.update(state)
+        self.data[backend_name][index_name]['models'][get_model_label(model)] = model_state
+        self.save()
+
+
 class Command(BaseCommand):
-    def update_backend(self, backend_name, schema_only=False):
+    workers = 1
+    field_timings = False
+
+    def update_backend(self, backend_name, schema_only=False, chunk_size=1000, pool=None, checkpoint=None):
         self.stdout.write("Updating backend: " + backend_name)
 
         backend = get_search_backend(backend_name)
+        checkpoint = checkpoint or Checkpoint()
 
         if not backend.rebuilder_class:
             self.stdout.write("Backend '%s' doesn't require rebuilding" % backend_name)
@@ -66,11 +173,23 @@ class Command(BaseCommand):
             self.stdout.write(backend_name + ": No indices to rebuild")
 
         for index, models in models_grouped_by_index:
-            self.stdout.write(backend_name + ": Rebuilding index %s" % index.name)
-
-            # Start rebuild
+            index_name = index.name
             rebuilder = backend.rebuilder_class(index)
-            index = rebuilder.start()
+
+            # Resume an interrupted rebuild of this index, if one was recorded
+            index = None
+            index_state = checkpoint.get_index_state(backend_name, index_name)
+            if index_state is not None:
+                index = rebuilder.resume(index_state['index'])
+                if index is not None:
+                    self.stdout.write(backend_name + ": Resuming rebuild of index %s" % index_name)
+
+            if index is None:
+                self.stdout.write(backend_name + ": Rebuilding index %s" % index_name)
+
+                # Start rebuild
+                index = rebuilder.start()
+                checkpoint.start_index(backend_name, index_name, index.name)
 
             # Add models
             for model in models:
@@ -80,21 +199,147 @@ class Command(BaseCommand):
             object_count = 0
             if not schema_only:
                 for model in models:
-                    self.stdout.write('{}: {}.{} '.format(backend_name, model._meta.app_label, model.__name__).ljust(35), ending='')
-
-                    # Add items (1000 at a time)
-                    for chunk in self.print_iter_progress(self.queryset_chunks(model.get_indexed_objects())):
-                        index.add_items(model, chunk)
-                        object_count += len(chunk)
-
-                    self.print_newline()
+                    object_count += self.update_model(
+                        backend_name, index_name, index, model, chunk_size, pool, checkpoint
+                    )
 
             # Finish rebuild
             rebuilder.finish()
+            checkpoint.finish_index(backend_name, index_name)
+
+            for model in models:
+                invalidate_results_cache(model)
 
             self.stdout.write(backend_name + ": indexed %d objects" % object_count)
             self.print_newline()
 
+    def update_changes(self, backend_name, since):
+        """
+        Updates the index entries of the objects that have changed since the given time,
+        rather than rebuilding the whole index.
+        """
+        self.stdout.write("Updating backend: " + backend_name)
+
+        backend = get_search_backend(backend_name)
+
+        # Include changes made in transactions that were still open at that time
+        for model, pks in get_changes(since - CHANGE_LOG_MARGIN).items():
+            objects, removed_objects = get_objects_to_reindex(model, pks)
+
+            with backend.batch():
+                if objects:
+                    backend.add_bulk(model, objects)
+
+                if removed_objects:
+                    backend.delete_bulk(model, removed_objects)
+
+            invalidate_results_cache(model)
+
+            self.stdout.write("{}: {}.{}: indexed {} objects, removed {} objects".format(
+                backend_name, model._meta.app_label, model.__name__, len(objects), len(removed_objects)
+            ))
+
+        self.print_newline()
+
+    def update_model(self, backend_name, index_name, index, model, chunk_size, pool, checkpoint):
+        """
+        Adds the indexed objects of one model to the index, a chunk at a time, recording
+        the last primary key added in the checkpoint after each chunk. Returns the total
+        number of objects of the model in the index.
+        """
+        model_state = checkpoint.get_model_state(backend_name, index_name, model)
+        if model_state['done']:
+            return model_state['count']
+
+        self.stdout.write('{}: {}.{} '.format(backend_name, model._meta.app_label, model.__name__).ljust(35), ending='')
+
+        start_after = model_state['last_pk']
+        if start_after is not None:
+            start_after = model._meta.pk.to_python(start_after)
+
+        object_count = model_state['count']
+        start_time = time.time()
+        indexed_count = 0
+        field_timings = {}
+
+        if pool is None:
+            chunks = self.queryset_chunks(model.get_indexed_objects(), chunk_size, start_after)
+            for chunk in self.print_iter_progress(chunks):
+                if self.field_timings:
+                    with record_field_timings() as chunk_field_timings:
+                        index.add_items(model, chunk)
+                    add_field_timings(field_timings, chunk_field_timings)
+                else:
+                    index.add_items(model, chunk)
+
+                object_count += len(chunk)
+                indexed_count += len(chunk)
+                checkpoint.update_model(backend_name, index_name, model, last_pk=str(chunk[-1].pk), count=object_count)
+        else:
+            # Keep each worker busy while the results of the others are being sent
+            max_pending = self.workers * 2
+            jobs = (
+                (backend_name, index.name, get_model_label(model), self.field_timings, pks)
+                for pks in self.pk_chunks(model.get_indexed_objects(), chunk_size, start_after)
+            )
+            results = self.run_in_pool(pool, prepare_index_items, jobs, max_pending)
+            for pks, (actions, chunk_field_timings) in self.print_iter_progress(results):
+                index.add_prepared_items(actions)
+
+                if chunk_field_timings:
+                    add_field_timings(field_timings, chunk_field_timings)
+
+                object_count += len(actions)
+                indexed_count += len(actions)
+                checkpoint.update_model(backend_name, index_name, model, last_pk=str(pks[-1]), count=object_count)
+
+        checkpoint.update_model(backend_name, index_name, model, count=object_count, done=True)
+
+        self.print_newline()
+        elapsed = time.time() - start_time
+        self.stdout.write("{}: {}.{}: indexed {} objects in {:.1f} seconds ({:.1f} per second)".format(
+            backend_name, model._meta.app_label, model.__name__, indexed_count, elapsed,
+            indexed_count / elapsed if elapsed else 0
+        ))
+
+        if field_timings:
+            self.print_field_timings(backend_name, model, field_timings)
+
+        return object_count
+
+    def print_field_timings(self, backend_name, model, field_timings):
+        """
+        Prints the time spent getting the value of each search field of the model,
+        slowest first.
+        """
+        self.stdout.write("{}: {}.{}: time spent getting search fields:".format(
+            backend_name, model._meta.app_label, model.__name__
+        ))
+
+        for name, (seconds, count) in sorted(field_timings.items(), key=lambda item: -item[1][0]):
+            self.stdout.write("    {} {:.3f} seconds ({:.3f} ms per value)".format(
+                name.ljust(40), seconds, seconds * 1000 / count
+            ))
+
+    def run_in_pool(self, pool, func, jobs, max_pending):
+        """
+        Runs func on each job in the pool, yielding (job pks, result) pairs in the order
+        of the jobs. Only a few jobs are given to the pool at a time, so that results
+        don't pile up in memory while they are waiting to be sent.
+        """
+        pending = collections.deque()
+
+        for job in jobs:
+            pending.append((job[-1], pool.apply_async(func, (job, ))))
+
+            if len(pending) >= max_pending:
+                pks, result = pending.popleft()
+                yield pks, result.get()
+
+        while pending:
+            pks, result = pending.popleft()
+            yield pks, result.get()
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--backend', action='store', dest='backend_name', default=None,
@@ -102,6 +347,34 @@ class Command(BaseCommand):
         parser.add_argument(
             '--schema-only', action='store_true', dest='schema_only', default=False,
             help="Prevents loading any data into the index")
+        parser.add_argument(
+            '--chunk-size', action='store', dest='chunk_size', type=int, default=1000,
+            help="The number of objects to send to the search backend at a time")
+        parser.add_argument(
+            '--workers', action='store', dest='workers', type=int, default=1,
+            help="The number of processes to build search documents in")
+        parser.add_argument(
+            '--checkpoint', action='store', dest='checkpoint', default=None,
+            help="Record progress in this file, and resume the rebuild recorded in it if there is one")
+        parser.add_argument(
+            '--field-timings', action='store_true', dest='field_timings', default=False,
+            help="Show the time spent getting the value of each search field")
+        parser.add_argument(
+            '--since', action='store', dest='since', default=None,
+            help="Only index the objects that have changed since this date and time")
+
+    def parse_since(self, value):
+        since = parse_datetime(value)
+        if since is None:
+            date = parse_date(value)
+            if date is None:
+                raise CommandError("--since must be a date or date and time, such as '2017-06-01 12:00'")
+            since = datetime.datetime.combine(date, datetime.time())
+
+        if settings.USE_TZ and timezone.is_naive(since):
+            since = timezone.make_aware(since)
+
+        return since
 
     def handle(self, **options):
         # Get list of backends to index
@@ -115,9 +388,50 @@ class Command(BaseCommand):
             # index the 'default' backend only
             backend_names = ['default']
 
+        if options.get('since'):
+            if not change_tracking_enabled():
+                raise CommandError("--since requires WAGTAILSEARCH_TRACK_CHANGES to be enabled")
+
+            since = self.parse_since(options['since'])
+            started_at = timezone.now()
+
+            for backend_name in backend_names:
+                self.update_changes(backend_name, since)
+
+            self.stdout.write("To index the changes made from now on, run again with --since '%s'" % started_at.isoformat())
+            return
+
+        self.workers = workers = options.get('workers', 1)
+        self.field_timings = options.get('field_timings', False)
+        if workers > 1:
+            for backend_name in backend_names:
+                backend = get_search_backend(backend_name)
+                if backend.rebuilder_class and not hasattr(backend.index_class, 'prepare_items'):
+                    raise CommandError("Backend '%s' doesn't support --workers" % backend_name)
+
+            # Worker processes must open their own database connections, rather than
+            # sharing ours
+            connections.close_all()
+            pool = Pool(workers)
+        else:
+            pool = None
+
+        checkpoint = Checkpoint(options.get('checkpoint'))
+
         # Update backends
-        for backend_name in backend_names:
-            self.update_backend(backend_name, schema_only=options.get('schema_only', False))
+        try:
+            for backend_name in backend_names:
+                self.update_backend(
+                    backend_name,
+                    schema_only=options.get('schema_only', False),
+                    chunk_size=options.get('chunk_size', 1000),
+                    pool=pool,
+                    checkpoint=checkpoint,
+                )
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
 
     def print_newline(self):
         self.stdout.write('')
@@ -145,19 +459,36 @@ class Command(BaseCommand):
 
             self.stdout.flush()
 
-    # Atomic so the count of models doesnt change as it is iterated
-    @transaction.atomic
-    def queryset_chunks(self, qs, chunk_size=1000):
+    def queryset_chunks(self, qs, chunk_size=1000, start_after=None):
         """
-        Yield a queryset in chunks of at most ``chunk_size``. The chunk yielded
-        will be a list, not a queryset. Iterating over the chunks is done in a
-        transaction so that the order and count of items in the queryset
-        remains stable.
+        Yield a queryset in chunks of at most ``chunk_size``, in primary key order,
+        starting after the primary key ``start_after`` if given. The chunk yielded
+        will be a list, not a queryset.
+
+        Each chunk is fetched with a ``pk > last pk`` filter rather than an offset, so
+        later chunks are as quick to fetch as earlier ones, and no transaction needs
+        to be held open for the whole iteration.
         """
-        i = 0
+        qs = qs.order_by('pk')
+        last_pk = start_after
         while True:
-            items = list(qs[i * chunk_size:][:chunk_size])
+            items = list((qs if last_pk is None else qs.filter(pk__gt=last_pk))[:chunk_size])
             if not items:
                 break
             yield items
-            i += 1
+            last_pk = items[-1].pk
+
+    def pk_chunks(self, qs, chunk_size=1000, start_after=None):
+        """
+        Like queryset_chunks, but yields lists of primary keys.
+        """
+        # prefetch_related(None) clears the related objects that get_indexed_objects
+        # may have asked to be prefetched, which can't be fetched for primary keys
+        qs = qs.prefetch_related(None).order_by('pk').values_list('pk', flat=True)
+        last_pk = start_after
+        while True:
+            pks = list((qs if last_pk is None else qs.filter(pk__gt=last_pk))[:chunk_size])
+            if not pks:
+                break
+            yield pks
+            last_pk = pks[-1]
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.8 on 2026-10-16 22:40
+from __future__ import unicode_literals
+
+from django.db import OperationalError, migrations, models
+import django.db.models.deletion
+
+
+def create_search_structures(apps, schema_editor):
+    # The columns and tables used for full-text search aren't managed by Django,
+    # as they depend on the database
+    connection = schema_editor.connection
+
+    if connection.vendor == 'postgresql':
+        schema_editor.execute("ALTER TABLE wagtailsearch_indexentry ADD COLUMN search_vector tsvector")
+        schema_editor.execute(
+            "CREATE INDEX wagtailsearch_indexentry_search_vector ON wagtailsearch_indexentry USING GIN (search_vector)"
+        )
+
+    elif connection.vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                "CREATE VIRTUAL TABLE wagtailsearch_indexentry_fts "
+                "USING fts5(text_a, text_b, text_c, autocomplete, tokenize='porter unicode61')"
+            )
+        except OperationalError:
+            # This SQLite library was built without FTS5. The search backend falls
+            # back to matching words with LIKE
+            pass
+
+
+def drop_search_structures(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS wagtailsearch_indexentry_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('wagtailsearch', '0004_indexupdate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.CharField(max_length=255)),
+                ('text_a', models.TextField(blank=True)),
+                ('text_b', models.TextField(blank=True)),
+                ('text_c', models.TextField(blank=True)),
+                ('autocomplete', models.TextField(blank=True)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.ContentType')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='indexentry',
+            unique_together=set([('content_type', 'object_id')]),
+        ),
+        migrations.RunPython(create_search_structures, drop_search_structures),
+    ]
@@ -77,3 +77,68 @@ class QueryDailyHits(models.Model):
             ('query', 'date'),
         )
         verbose_name = _('Query Daily Hits')
+
+
+class IndexUpdate(models.Model):
+    """
+    An object waiting to be indexed by the process_index_queue management command.
+    Only used when WAGTAILSEARCH_INDEX_UPDATES is set to 'queue'.
+    """
+    content_type = models.ForeignKey('contenttypes.ContentType', on_delete=models.CASCADE, related_name='+')
+    object_id = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        unique_together = (
+            ('content_type', 'object_id'),
+        )
+
+
+class IndexEntry(models.Model):
+    """
+    The search document of an indexed object, used by the database full-text
+    search backend (wagtail.wagtailsearch.backends.database). The text of the
+    object's search fields is stored in one column for each weight that their
+    boosts are rounded to, along with the text of fields that allow partial matches.
+
+    On PostgreSQL, the text is also stored as a tsvector in the search_vector
+    column and on SQLite, it is copied into the wagtailsearch_indexentry_fts FTS5
+    table. Neither are managed by Django; see the 0005_indexentry migration.
+    """
+    content_type = models.ForeignKey('contenttypes.ContentType', on_delete=models.CASCADE, related_name='+')
+    object_id = models.CharField(max_length=255)
+    text_a = models.TextField(blank=True)
+    text_b = models.TextField(blank=True)
+    text_c = models.TextField(blank=True)
+    autocomplete = models.TextField(blank=True)
+
+    class Meta:
+        unique_together = (
+            ('content_type', 'object_id'),
+        )
+
+
+class IndexChange(models.Model):
+    """
+    Records when an indexed object was last saved or deleted, so that the objects that
+    changed during an atomic rebuild of an Elasticsearch index (or since a given time,
+    with update_index --since) can be indexed again. See wagtail.wagtailsearch.change_log.
+    """
+    content_type = models.ForeignKey('contenttypes.ContentType', on_delete=models.CASCADE, related_name='+')
+    object_id = models.CharField(max_length=255)
+    changed_at = models.DateTimeField(db_index=True)
+
+    @classmethod
+    def garbage_collect(cls, days=None):
+        """
+        Deletes all IndexChange records that are older than a set number of days
+        """
+        days = getattr(settings, 'WAGTAILSEARCH_CHANGE_LOG_MAX_AGE', 7) if days is None else days
+        min_date = timezone.now() - datetime.timedelta(days)
+
+        cls.objects.filter(changed_at__lt=min_date).delete()
+
+    class Meta:
+        unique_together = (
+            ('content_type', 'object_id'),
+        )
@@ -12,3 +12,11 @@ class SearchableQuerySetMixin(object):
         search_backend = get_search_backend(backend)
         return search_backend.search(query_string, self, fields=fields,
                                      operator=operator, order_by_relevance=order_by_relevance)
+
+    def suggest(self, query_string, field='title', limit=10, backend='default'):
+        """
+        This returns the ids and titles of the items in the QuerySet that could complete
+        the query string
+        """
+        search_backend = get_search_backend(backend)
+        return search_backend.suggest(query_string, self, field=field, limit=limit)
@@ -0,0 +1,167 @@
+"""
+An optional cache for search results.
+
+When the WAGTAILSEARCH_RESULTS_CACHE setting names a cache alias, the primary keys
+and scores of the results of each search are stored in that cache, so that repeating
+a popular search only needs the matching objects to be fetched from the database by
+primary key. Keys are made from the query string, the searched queryset (including
+its filters and ordering), the search options and the slice of the results.
+
+Each indexed model hierarchy has a generation token, which forms part of the keys of
+searches of that model. The token is changed after an object of the model has been
+added to or removed from the search index, and again when the transaction that made
+the change commits, so that results cached by searches made before the change could be
+seen are discarded. Backends that only make changes visible after a delay (such as
+Elasticsearch, which refreshes its indexes about once a second) may still have results
+from just before a change cached until WAGTAILSEARCH_RESULTS_CACHE_TIMEOUT expires.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import router, transaction
+from django.db.models.sql.datastructures import EmptyResultSet
+from django.utils.encoding import force_bytes
+
+RESULTS_GENERATION_KEY = 'wagtailsearch_results_generation:%s'
+
+
+def get_results_cache():
+    """
+    Returns the cache configured by WAGTAILSEARCH_RESULTS_CACHE, or None if search
+    results caching is disabled.
+    """
+    alias = getattr(settings, 'WAGTAILSEARCH_RESULTS_CACHE', None)
+    if alias is None:
+        return None
+    return caches[alias]
+
+
+def get_generation_key(model):
+    return RESULTS_GENERATION_KEY % model.indexed_get_toplevel_content_type()
+
+
+def get_results_generation(cache, model):
+    key = get_generation_key(model)
+    generation = cache.get(key)
+    if generation is None:
+        # Use add() so that concurrent processes agree on a single token
+        cache.add(key, uuid.uuid4().hex, None)
+        generation = cache.get(key)
+    return generation
+
+
+def _clear_results_generation(model):
+    cache = get_results_cache()
+    if cache is not None:
+        cache.delete(get_generation_key(model))
+
+
+def invalidate_results_cache(model):
+    """
+    Discards the cached results of all searches of the given model, and of the other
+    models in its hierarchy. Called after the search index of the model has changed.
+    """
+    _clear_results_generation(model)
+
+    if get_results_cache() is not None and hasattr(transaction, 'on_commit'):
+        # Searches made before the change is committed may cache results from before
+        # it, so discard them again once the change is committed
+        transaction.on_commit(lambda: _clear_results_generation(model), using=router.db_for_write(model))
+
+
+def get_results_cache_key(search_results, cache, kind):
+    """
+    Returns the cache key for the results (or the count, if kind is 'count') of the given
+    SearchResults object, or None if they can't be cached.
+    """
+    query = search_results.query
+    model = query.queryset.model
+
+    generation = get_results_generation(cache, model)
+    if generation is None:
+        # The cache is not storing anything (e.g. a dummy cache)
+        return
+
+    try:
+        sql, params = query.queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return
+
+    query_string = query.query_string
+    if query_string is not None:
+        # Backends don't distinguish between upper and lower case or amounts of whitespace
+        query_string = ' '.join(query_string.lower().split())
+
+    description = repr((
+        search_results.backend.get_cache_namespace(),
+        model._meta.app_label,
+        model._meta.model_name,
+        sql,
+        params,
+        query_string,
+        query.fields,
+        query.operator,
+        query.order_by_relevance,
+        search_results._score_field,
+        search_results.start,
+        search_results.stop,
+    ))
+    digest = hashlib.sha1(force_bytes(description)).hexdigest()
+
+    return 'wagtailsearch_results:%s:%s:%s' % (kind, generation, digest)
+
+
+def get_cached_results(search_results):
+    """
+    Returns the results of the given SearchResults object, going through the search
+    results cache if it is enabled.
+    """
+    cache = get_results_cache()
+    key = get_results_cache_key(search_results, cache, 'results') if cache is not None else None
+    if key is None:
+        return search_results._do_search()
+
+    score_field = search_results._score_field
+    cached_results = cache.get(key)
+    if cached_results is None:
+        results = list(search_results._do_search())
+        cache.set(key, [
+            (result.pk, getattr(result, score_field) if score_field else None)
+            for result in results
+        ], getattr(settings, 'WAGTAILSEARCH_RESULTS_CACHE_TIMEOUT', DEFAULT_TIMEOUT))
+        return results
+
+    # Fetch the objects by primary key, and put them in the order they were found in
+    objects = search_results.query.queryset.in_bulk([pk for pk, score in cached_results])
+    results = []
+    for pk, score in cached_results:
+        obj = objects.get(pk)
+        if obj is not None:
+            if score_field:
+                setattr(obj, score_field, score)
+            results.append(obj)
+
+    return results
+
+
+def get_cached_count(search_results):
+    """
+    Returns the number of results of the given SearchResults object, going through the
+    search results cache if it is enabled.
+    """
+    cache = get_results_cache()
+    key = get_results_cache_key(search_results, cache, 'count') if cache is not None else None
+    if key is None:
+        return search_results._do_count()
+
+    count = cache.get(key)
+    if count is None:
+        count = search_results._do_count()
+        cache.set(key, count, getattr(settings, 'WAGTAILSEARCH_RESULTS_CACHE_TIMEOUT', DEFAULT_TIMEOUT))
+
+    return count
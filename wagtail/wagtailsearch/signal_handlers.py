@@ -3,9 +3,34 @@ from __future__ import absolute_import, unicode_literals
 from django.db.models.signals import post_delete, post_save
 
 from wagtail.wagtailsearch import index
+from wagtail.wagtailsearch.change_log import change_tracking_enabled, record_change
+from wagtail.wagtailsearch.index_queue import add_pending_update, get_index_update_mode
+
+
+def defer_index_update(instance):
+    indexed_instance = index.get_indexed_instance(instance, check_exists=False)
+
+    if indexed_instance:
+        # The object is loaded from the database again when the update is flushed,
+        # so unsaved data and deletions are both picked up at that point
+        add_pending_update(type(indexed_instance), indexed_instance.pk)
+
+
+def record_index_change(instance):
+    indexed_instance = index.get_indexed_instance(instance, check_exists=False)
+
+    if indexed_instance:
+        record_change(type(indexed_instance), indexed_instance.pk)
 
 
 def post_save_signal_handler(instance, update_fields=None, **kwargs):
+    if change_tracking_enabled():
+        record_index_change(instance)
+
+    if get_index_update_mode() != 'immediate':
+        defer_index_update(instance)
+        return
+
     if update_fields is not None:
         # fetch a fresh copy of instance from the database to ensure
         # that we're not indexing any of the unsaved data contained in
@@ -16,6 +41,13 @@ def post_save_signal_handler(instance, update_fields=None, **kwargs):
 
 
 def post_delete_signal_handler(instance, **kwargs):
+    if change_tracking_enabled():
+        record_index_change(instance)
+
+    if get_index_update_mode() != 'immediate':
+        defer_index_update(instance)
+        return
+
     index.remove_object(instance)
 
 
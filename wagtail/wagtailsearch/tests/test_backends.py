@@ -2,6 +2,7 @@ from __future__ import absolute_import, unicode_literals
 
 import time
 import unittest
+from collections import OrderedDict
 
 from django.conf import settings
 from django.core import management
@@ -162,6 +163,60 @@ class BackendTests(WagtailTestUtils):
         results = self.backend.search(None, models.SearchTest)
         self.assertEqual(set(results), {self.testb, self.testc.searchtest_ptr, self.testd.searchtest_ptr})
 
+    def test_facet(self):
+        results = self.backend.search("Hello", models.SearchTest).facet('live')
+        self.assertEqual(results, OrderedDict([(True, 2), (False, 1)]))
+
+    def test_facet_with_string_field(self):
+        results = self.backend.search(None, models.SearchTest).facet('title')
+        self.assertEqual(results, OrderedDict([("Hello", 2), ("Hello World", 1), ("World", 1)]))
+
+    def test_facet_counts_all_results(self):
+        results = self.backend.search(None, models.SearchTest)[:1].facet('live')
+        self.assertEqual(results, OrderedDict([(False, 2), (True, 2)]))
+
+    def test_facet_child_model(self):
+        results = self.backend.search("Foo", models.SearchTestChild.objects.filter(live=True)).facet('live')
+        self.assertEqual(results, OrderedDict([(True, 1)]))
+
+    def test_facet_non_filter_field_gives_error(self):
+        results = self.backend.search("Hello", models.SearchTest)
+        self.assertRaises(FieldError, results.facet, 'content')
+
+    def test_suggest(self):
+        suggestions = self.backend.suggest("hel", models.SearchTest)
+        self.assertEqual(sorted(suggestions, key=lambda suggestion: suggestion['id']), [
+            {'id': self.testa.id, 'title': "Hello World"},
+            {'id': self.testb.id, 'title': "Hello"},
+            {'id': self.testc.id, 'title': "Hello"},
+        ])
+
+    def test_suggest_matches_start_of_any_word(self):
+        suggestions = self.backend.suggest("wor", models.SearchTest)
+        self.assertEqual({suggestion['id'] for suggestion in suggestions}, {self.testa.id, self.testd.id})
+
+    def test_suggest_matches_all_terms(self):
+        suggestions = self.backend.suggest("hello wo", models.SearchTest)
+        self.assertEqual(suggestions, [{'id': self.testa.id, 'title': "Hello World"}])
+
+    def test_suggest_with_filters(self):
+        suggestions = self.backend.suggest("hel", models.SearchTest.objects.filter(live=True))
+        self.assertEqual({suggestion['id'] for suggestion in suggestions}, {self.testb.id, self.testc.id})
+
+    def test_suggest_child_model(self):
+        suggestions = self.backend.suggest("hel", models.SearchTestChild)
+        self.assertEqual(suggestions, [{'id': self.testc.id, 'title': "Hello"}])
+
+    def test_suggest_limit(self):
+        suggestions = self.backend.suggest("hel", models.SearchTest, limit=2)
+        self.assertEqual(len(suggestions), 2)
+
+    def test_blank_suggest(self):
+        self.assertEqual(self.backend.suggest(" ", models.SearchTest), [])
+
+    def test_suggest_unknown_field_gives_error(self):
+        self.assertRaises(FieldError, self.backend.suggest, "hel", models.SearchTest, field='unknown')
+
     def test_update_index_command(self):
         # Reset the index, this should clear out the index
         self.reset_index()
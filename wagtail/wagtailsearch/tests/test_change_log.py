@@ -0,0 +1,190 @@
+from __future__ import absolute_import, unicode_literals
+
+import datetime
+
+import mock
+
+from django.core import management
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.six import StringIO
+
+from wagtail.tests.search import models
+from wagtail.wagtailsearch.backends.elasticsearch import (
+    ElasticsearchAtomicIndexRebuilder, ElasticsearchSearchBackend)
+from wagtail.wagtailsearch.change_log import change_tracking_enabled, get_changes, replay_changes
+from wagtail.wagtailsearch.models import IndexChange
+
+
+class TestChangeTrackingEnabled(TestCase):
+    def test_default(self):
+        self.assertFalse(change_tracking_enabled())
+
+    @override_settings(WAGTAILSEARCH_TRACK_CHANGES=True)
+    def test_enabled(self):
+        self.assertTrue(change_tracking_enabled())
+
+    @override_settings(WAGTAILSEARCH_BACKENDS={
+        'default': {
+            'BACKEND': 'wagtail.wagtailsearch.backends.elasticsearch',
+            'ATOMIC_REBUILD': True,
+        }
+    })
+    def test_not_enabled_by_atomic_rebuild(self):
+        # Existing atomic rebuild setups don't start writing to the change log on upgrade
+        self.assertFalse(change_tracking_enabled())
+
+    @override_settings(WAGTAILSEARCH_TRACK_CHANGES=False, WAGTAILSEARCH_BACKENDS={
+        'default': {
+            'BACKEND': 'wagtail.wagtailsearch.backends.elasticsearch',
+            'ATOMIC_REBUILD': True,
+        }
+    })
+    def test_disabled(self):
+        self.assertFalse(change_tracking_enabled())
+
+
+def make_old(obj, days=1):
+    IndexChange.objects.filter(object_id=str(obj.pk)).update(
+        changed_at=timezone.now() - datetime.timedelta(days=days)
+    )
+
+
+@override_settings(WAGTAILSEARCH_TRACK_CHANGES=True)
+class TestChangeLog(TestCase):
+    def test_changes_are_not_recorded_by_default(self):
+        with self.settings(WAGTAILSEARCH_TRACK_CHANGES=None):
+            models.SearchTest.objects.create(title="Test")
+
+        self.assertFalse(IndexChange.objects.exists())
+
+    def test_save(self):
+        obj = models.SearchTest.objects.create(title="Test")
+        make_old(obj)
+        obj.save()
+
+        change = IndexChange.objects.get()
+        self.assertEqual(change.object_id, str(obj.pk))
+        self.assertGreater(change.changed_at, timezone.now() - datetime.timedelta(minutes=1))
+
+    def test_delete(self):
+        obj = models.SearchTest.objects.create(title="Test")
+        pk = obj.pk
+        make_old(obj)
+        obj.delete()
+
+        self.assertEqual(get_changes(timezone.now() - datetime.timedelta(minutes=1)), {
+            models.SearchTest: [pk],
+        })
+
+    def test_get_changes(self):
+        old_obj = models.SearchTest.objects.create(title="Old")
+        make_old(old_obj)
+        obj = models.SearchTest.objects.create(title="New")
+        child = models.SearchTestChild.objects.create(title="Child")
+
+        since = timezone.now() - datetime.timedelta(minutes=1)
+        self.assertEqual(get_changes(since), {
+            models.SearchTest: [obj.pk],
+            models.SearchTestChild: [child.pk],
+        })
+        self.assertEqual(get_changes(since, models=[models.SearchTestChild]), {
+            models.SearchTestChild: [child.pk],
+        })
+
+    def test_replay_changes(self):
+        obj = models.SearchTest.objects.create(title="Test")
+        deleted_obj = models.SearchTest.objects.create(title="Deleted")
+        deleted_pk = deleted_obj.pk
+        deleted_obj.delete()
+        index = mock.Mock()
+
+        count = replay_changes(index, [models.SearchTest], timezone.now() - datetime.timedelta(minutes=1))
+
+        self.assertEqual(count, 2)
+        index.add_items.assert_called_once_with(models.SearchTest, [obj])
+        self.assertEqual([item.pk for item in index.delete_items.call_args[0][1]], [deleted_pk])
+
+    def test_garbage_collect(self):
+        old_obj = models.SearchTest.objects.create(title="Old")
+        make_old(old_obj, days=8)
+        obj = models.SearchTest.objects.create(title="New")
+
+        management.call_command('search_garbage_collect', stdout=StringIO())
+
+        self.assertEqual(list(IndexChange.objects.values_list('object_id', flat=True)), [str(obj.pk)])
+
+
+@mock.patch('wagtail.wagtailsearch.backends.elasticsearch.bulk', return_value=(0, []))
+@mock.patch('wagtail.wagtailsearch.backends.elasticsearch.Elasticsearch')
+@override_settings(WAGTAILSEARCH_TRACK_CHANGES=True)
+class TestAtomicRebuildReplaysChanges(TestCase):
+    def test_changes_during_rebuild_are_replayed(self, elasticsearch, bulk):
+        unchanged_obj = models.SearchTest.objects.create(title="Unchanged")
+        make_old(unchanged_obj)
+
+        backend = ElasticsearchSearchBackend(params={'ATOMIC_REBUILD': True})
+        rebuilder = ElasticsearchAtomicIndexRebuilder(backend.get_index())
+        index = rebuilder.start()
+
+        # Made while the rebuild is running, after the object would have been indexed
+        obj = models.SearchTest.objects.create(title="Test")
+
+        rebuilder.finish()
+
+        replayed = [
+            (action['_index'], action['_id'])
+            for args, kwargs in bulk.call_args_list
+            for action in args[1]
+        ]
+        self.assertIn((index.name, 'searchtests_searchtest:%d' % obj.pk), replayed)
+        self.assertNotIn((index.name, 'searchtests_searchtest:%d' % unchanged_obj.pk), replayed)
+
+
+@mock.patch('wagtail.wagtailsearch.tests.DummySearchBackend', create=True)
+@override_settings(WAGTAILSEARCH_BACKENDS={
+    'default': {
+        'BACKEND': 'wagtail.wagtailsearch.tests.DummySearchBackend'
+    }
+}, WAGTAILSEARCH_TRACK_CHANGES=True)
+class TestUpdateIndexSince(TestCase):
+    def run_command(self, **options):
+        output = StringIO()
+        management.call_command('update_index', backend_name='default', stdout=output, **options)
+        return output.getvalue()
+
+    def test_since(self, backend):
+        old_obj = models.SearchTest.objects.create(title="Old")
+        make_old(old_obj)
+        obj = models.SearchTest.objects.create(title="New")
+        deleted_obj = models.SearchTest.objects.create(title="Deleted")
+        deleted_pk = deleted_obj.pk
+        deleted_obj.delete()
+        backend().reset_mock()
+
+        since = timezone.now() - datetime.timedelta(hours=1)
+        output = self.run_command(since=since.isoformat())
+
+        backend().add_bulk.assert_called_once_with(models.SearchTest, [obj])
+        self.assertEqual([item.pk for item in backend().delete_bulk.call_args[0][1]], [deleted_pk])
+        self.assertFalse(backend().reset_index.called)
+        self.assertIn("searchtests.SearchTest: indexed 1 objects, removed 1 objects", output)
+        self.assertIn("run again with --since", output)
+
+    def test_since_date(self, backend):
+        obj = models.SearchTest.objects.create(title="New")
+        backend().reset_mock()
+
+        self.run_command(since=timezone.now().date().isoformat())
+
+        backend().add_bulk.assert_called_once_with(models.SearchTest, [obj])
+
+    def test_invalid_since(self, backend):
+        with self.assertRaises(CommandError):
+            self.run_command(since="yesterday")
+
+    @override_settings(WAGTAILSEARCH_TRACK_CHANGES=False)
+    def test_since_requires_change_tracking(self, backend):
+        with self.assertRaises(CommandError):
+            self.run_command(since="2017-01-01")
@@ -0,0 +1,109 @@
+from __future__ import absolute_import, unicode_literals
+
+import datetime
+
+from django.test import TestCase, override_settings
+
+from wagtail.tests.search import models
+from wagtail.tests.testapp.models import EventPage
+from wagtail.wagtailcore.models import Page
+from wagtail.wagtailsearch.backends.database import get_weight_column
+from wagtail.wagtailsearch.models import IndexEntry
+
+from .test_backends import BackendTests
+
+
+@override_settings(WAGTAILSEARCH_BACKENDS={
+    'default': {
+        'BACKEND': 'wagtail.wagtailsearch.backends.database',
+    }
+})
+class TestDatabaseFullTextBackend(BackendTests, TestCase):
+    backend_path = 'wagtail.wagtailsearch.backends.database'
+
+    def test_uses_full_text_search(self):
+        # The test database is SQLite, which should have been built with FTS5
+        self.assertEqual(self.backend.get_vendor('default'), 'sqlite')
+
+    def test_stemming(self):
+        obj = models.SearchTest.objects.create(title="Greetings", content="Two worlds collide")
+        self.backend.add(obj)
+
+        results = self.backend.search("world", models.SearchTest)
+        self.assertIn(obj, list(results))
+
+    def test_partial_match(self):
+        # The title field allows partial matches, but the content field doesn't
+        obj = models.SearchTest.objects.create(title="Greetings", content="Salutations")
+        self.backend.add(obj)
+
+        self.assertEqual(list(self.backend.search("Greet", models.SearchTest)), [obj])
+        self.assertEqual(list(self.backend.search("Salu", models.SearchTest)), [])
+
+    def test_annotate_score(self):
+        results = self.backend.search("Hello", models.SearchTest).annotate_score('_score')
+
+        for result in results:
+            self.assertGreater(result._score, 0)
+
+    def test_ordered_by_relevance(self):
+        obj = models.SearchTest.objects.create(title="Unrelated", content="Hello")
+        self.backend.add(obj)
+
+        # A match in the content field is ranked below matches in the title field
+        results = list(self.backend.search("Hello", models.SearchTest).annotate_score('_score'))
+        self.assertEqual(results[-1], obj)
+        self.assertEqual([result._score for result in results], sorted([result._score for result in results], reverse=True))
+
+    def test_facet_makes_one_query(self):
+        results = self.backend.search("Hello", models.SearchTest)
+
+        with self.assertNumQueries(1):
+            results.facet('live')
+
+    def test_related_fields(self):
+        obj = models.SearchTest.objects.create(title="Tagged")
+        obj.tags.add('zebra')
+        self.backend.add(obj)
+
+        self.assertEqual(list(self.backend.search("zebra", models.SearchTest)), [obj])
+
+    def test_update(self):
+        self.testa.title = "Goodbye"
+        self.testa.save()
+        self.backend.add(self.testa)
+
+        self.assertEqual(IndexEntry.objects.filter(object_id=str(self.testa.pk)).count(), 1)
+        self.assertNotIn(self.testa, list(self.backend.search("Hello", models.SearchTest)))
+        self.assertIn(self.testa, list(self.backend.search("Goodbye", models.SearchTest)))
+
+    def test_count(self):
+        results = self.backend.search("Hello", models.SearchTest)
+
+        self.assertEqual(results.count(), 3)
+        self.assertEqual(results[1:].count(), 2)
+
+    def test_pages_indexed_as_specific_class(self):
+        root_page = Page.objects.get(id=2)
+        page = root_page.add_child(instance=EventPage(
+            title="Event", slug="event", audience='public', location="aardvark", cost="Free",
+            date_from=datetime.date(2017, 1, 1)
+        ))
+
+        index = self.backend.get_index()
+        index.add_items(EventPage, [page])
+
+        # Indexing the page as a generic Page doesn't replace its entry
+        index.add_items(Page, [Page.objects.get(id=page.id)])
+
+        self.assertEqual(list(self.backend.search("aardvark", Page)), [page.page_ptr])
+        self.assertEqual(list(self.backend.search("aardvark", EventPage)), [page])
+
+
+class TestWeightColumns(TestCase):
+    def test_get_weight_column(self):
+        self.assertEqual(get_weight_column(None), 'text_c')
+        self.assertEqual(get_weight_column(0.5), 'text_c')
+        self.assertEqual(get_weight_column(1.5), 'text_b')
+        self.assertEqual(get_weight_column(2), 'text_a')
+        self.assertEqual(get_weight_column(10), 'text_a')
@@ -6,17 +6,21 @@ import json
 import os
 import time
 import unittest
+from collections import OrderedDict
 
 import mock
 from django.core import management
 from django.db.models import Q
 from django.test import TestCase
 from django.utils.six import StringIO
+from elasticsearch.helpers import BulkIndexError
 from elasticsearch.serializer import JSONSerializer
 
 from wagtail.tests.search import models
 from wagtail.wagtailsearch.backends import get_search_backend
-from wagtail.wagtailsearch.backends.elasticsearch import ElasticsearchSearchBackend
+from wagtail.wagtailsearch import index
+from wagtail.wagtailsearch.backends.elasticsearch import (
+    ElasticsearchDocumentBuilder, ElasticsearchMapping, ElasticsearchSearchBackend)
 
 from .test_backends import BackendTests
 
@@ -731,6 +735,54 @@ class TestElasticsearchSearchResults(TestCase):
         self.assertEqual(results[1], self.objects[1])
         self.assertEqual(results[2], self.objects[0])
 
+    @mock.patch('elasticsearch.Elasticsearch.search')
+    def test_facet(self, search):
+        search.return_value = {
+            'hits': {'hits': [], 'total': 3},
+            'aggregations': {
+                'facet': {
+                    'buckets': [
+                        {'key': "0", 'doc_count': 2},
+                        {'key': "1", 'doc_count': 1},
+                    ]
+                }
+            },
+        }
+        results = self.get_results()
+        results.query.mapping = ElasticsearchMapping(models.SearchTest)
+
+        facet = results[:1].facet('title')
+
+        self.assertEqual(facet, OrderedDict([("0", 2), ("1", 1)]))
+        search.assert_called_once_with(
+            body={
+                'query': 'QUERY',
+                'aggregations': {
+                    'facet': {'terms': {'field': 'title_filter', 'size': 0}},
+                },
+            },
+            index='wagtail',
+            size=0,
+        )
+
+    @mock.patch('elasticsearch.Elasticsearch.search')
+    def test_facet_boolean_field(self, search):
+        search.return_value = {
+            'hits': {'hits': [], 'total': 3},
+            'aggregations': {
+                'facet': {
+                    'buckets': [
+                        {'key': "F", 'doc_count': 2},
+                        {'key': "T", 'doc_count': 1},
+                    ]
+                }
+            },
+        }
+        results = self.get_results()
+        results.query.mapping = ElasticsearchMapping(models.SearchTest)
+
+        self.assertEqual(results.facet('live'), OrderedDict([(False, 2), (True, 1)]))
+
 
 class TestElasticsearchMapping(TestCase):
     def assertDictEqual(self, a, b):
@@ -813,6 +865,48 @@ class TestElasticsearchMapping(TestCase):
 
         self.assertDictEqual(document, expected_result)
 
+    def test_get_document_with_nested_related_fields(self):
+        related_fields = index.RelatedFields('tags', [
+            index.SearchField('name', partial_match=True),
+            index.RelatedFields('taggit_taggeditem_items', [
+                index.FilterField('object_id'),
+            ]),
+        ])
+
+        with mock.patch.object(models.SearchTest, 'search_fields', [index.SearchField('title'), related_fields]):
+            builder = ElasticsearchDocumentBuilder(ElasticsearchSearchBackend.mapping_class, models.SearchTest)
+            document = builder.build(self.obj)
+
+        self.assertEqual(document['tags'], [
+            {
+                'name': 'a tag',
+                'taggit_taggeditem_items': [
+                    {'object_id_filter': self.obj.pk},
+                ],
+            }
+        ])
+        self.assertEqual(document['_partials'], ['a tag'])
+
+    def test_document_builder_is_reused(self):
+        self.assertIs(
+            self.es_mapping.get_document_builder(),
+            ElasticsearchSearchBackend.mapping_class(models.SearchTest).get_document_builder()
+        )
+
+    def test_field_timings(self):
+        with index.record_field_timings() as timings:
+            self.es_mapping.get_document(self.obj)
+
+        self.assertEqual(
+            set(timings.keys()),
+            {'title', 'live', 'published_date', 'content', 'callable_indexed_field', 'tags', 'tags.name', 'tags.slug'}
+        )
+        self.assertEqual(timings['tags.name'][1], 1)
+
+        # Timings aren't recorded outside of record_field_timings
+        self.es_mapping.get_document(self.obj)
+        self.assertEqual(timings['tags.name'][1], 1)
+
 
 class TestElasticsearchMappingInheritance(TestCase):
     def assertDictEqual(self, a, b):
@@ -1008,6 +1102,163 @@ class TestBackendConfiguration(TestCase):
         self.assertEqual(backend.settings["settings"]["analysis"]["analyzer"]["edgengram_analyzer"]["tokenizer"], "standard")
         self.assertEqual(backend.settings["settings"]["analysis"]["analyzer"]["edgengram_analyzer"]["type"], "custom")  # Check if a default setting still exists
 
+    @mock.patch('wagtail.wagtailsearch.backends.elasticsearch.Elasticsearch')
+    def test_connection_settings(self, elasticsearch):
+        ElasticsearchSearchBackend(params={
+            'TIMEOUT': 5,
+            'MAXSIZE': 25,
+            'MAX_RETRIES': 2,
+            'RETRY_ON_TIMEOUT': True,
+            'SNIFF_ON_START': True,
+            'SNIFF_ON_CONNECTION_FAIL': True,
+            'SNIFFER_TIMEOUT': 60,
+            'OPTIONS': {
+                'max_retries': 5,
+            },
+        })
+
+        self.assertEqual(elasticsearch.call_args[1], {
+            'hosts': mock.ANY,
+            'timeout': 5,
+            'maxsize': 25,
+            'max_retries': 5,
+            'retry_on_timeout': True,
+            'sniff_on_start': True,
+            'sniff_on_connection_fail': True,
+            'sniffer_timeout': 60,
+        })
+
+    @mock.patch('wagtail.wagtailsearch.backends.elasticsearch.Elasticsearch')
+    def test_client_is_shared(self, elasticsearch):
+        backend = ElasticsearchSearchBackend(params={})
+        other_backend = ElasticsearchSearchBackend(params={})
+
+        self.assertIs(backend.es, other_backend.es)
+        self.assertEqual(elasticsearch.call_count, 1)
+
+        # Backends with different settings get their own client
+        ElasticsearchSearchBackend(params={'TIMEOUT': 5})
+        self.assertEqual(elasticsearch.call_count, 2)
+
+
+@mock.patch('wagtail.wagtailsearch.backends.elasticsearch.bulk', return_value=(0, []))
+@mock.patch('wagtail.wagtailsearch.backends.elasticsearch.Elasticsearch')
+class TestBulkWriter(TestCase):
+    def setUp(self):
+        self.obj = models.SearchTest.objects.create(title="Hello")
+        self.other_obj = models.SearchTest.objects.create(title="World")
+
+    def get_actions(self, bulk):
+        return [
+            (action.get('_op_type', 'index'), action['_id'])
+            for args, kwargs in bulk.call_args_list
+            for action in args[1]
+        ]
+
+    def test_add_and_delete(self, elasticsearch, bulk):
+        backend = ElasticsearchSearchBackend(params={})
+
+        backend.add(self.obj)
+        backend.delete(self.other_obj)
+
+        self.assertEqual(bulk.call_count, 2)
+        self.assertEqual(self.get_actions(bulk), [
+            ('index', 'searchtests_searchtest:%d' % self.obj.pk),
+            ('delete', 'searchtests_searchtest:%d' % self.other_obj.pk),
+        ])
+
+    def test_batch(self, elasticsearch, bulk):
+        backend = ElasticsearchSearchBackend(params={})
+
+        with backend.batch():
+            backend.add(self.obj)
+            backend.delete(self.other_obj)
+
+            self.assertFalse(bulk.called)
+
+        self.assertEqual(bulk.call_count, 1)
+        self.assertEqual(self.get_actions(bulk), [
+            ('index', 'searchtests_searchtest:%d' % self.obj.pk),
+            ('delete', 'searchtests_searchtest:%d' % self.other_obj.pk),
+        ])
+
+    def test_batch_sends_full_chunks(self, elasticsearch, bulk):
+        backend = ElasticsearchSearchBackend(params={'BULK_CHUNK_SIZE': 2, 'BULK_TIMEOUT': 30})
+
+        with backend.batch():
+            backend.add(self.obj)
+            backend.add(self.other_obj)
+
+            self.assertEqual(bulk.call_count, 1)
+
+            backend.add(self.obj)
+
+        self.assertEqual(bulk.call_count, 2)
+        self.assertEqual(bulk.call_args[1]['request_timeout'], 30)
+
+    def test_deleting_missing_document_is_ignored(self, elasticsearch, bulk):
+        bulk.return_value = (0, [{'delete': {'status': 404}}])
+        backend = ElasticsearchSearchBackend(params={})
+
+        backend.delete(self.obj)
+
+    def test_errors_are_raised(self, elasticsearch, bulk):
+        bulk.return_value = (0, [{'index': {'status': 400}}])
+        backend = ElasticsearchSearchBackend(params={})
+
+        self.assertRaises(BulkIndexError, backend.add, self.obj)
+
+
+@mock.patch('wagtail.wagtailsearch.backends.elasticsearch.Elasticsearch')
+class TestSuggest(TestCase):
+    def test_suggest(self, elasticsearch):
+        elasticsearch().search.return_value = {
+            'hits': {
+                'hits': [
+                    {'_source': {'pk': '2', 'title': "Hello World"}},
+                    {'_source': {'pk': '1', 'title': "Hello"}},
+                ]
+            }
+        }
+        backend = ElasticsearchSearchBackend(params={})
+
+        suggestions = backend.suggest("hel", models.SearchTest.objects.filter(live=True), limit=5)
+
+        self.assertEqual(suggestions, [
+            {'id': 2, 'title': "Hello World"},
+            {'id': 1, 'title': "Hello"},
+        ])
+        elasticsearch().search.assert_called_once_with(
+            index='wagtail',
+            body={
+                'query': {
+                    'filtered': {
+                        'query': {'match': {'_partials': {'query': "hel", 'operator': 'and'}}},
+                        'filter': {'and': [
+                            {'prefix': {'content_type': 'searchtests_searchtest'}},
+                            {'term': {'live_filter': True}},
+                        ]},
+                    }
+                },
+                '_source': ['pk', 'title'],
+            },
+            size=5,
+        )
+
+    def test_suggest_child_model(self, elasticsearch):
+        elasticsearch().search.return_value = {
+            'hits': {
+                'hits': [
+                    {'_source': {'pk': '3', 'subtitle': "Foo"}},
+                ]
+            }
+        }
+        backend = ElasticsearchSearchBackend(params={})
+
+        suggestions = backend.suggest("fo", models.SearchTestChild, field='subtitle')
+
+        self.assertEqual(suggestions, [{'id': 3, 'title': "Foo"}])
+
 
 @unittest.skipUnless(os.environ.get('ELASTICSEARCH_URL', False), "ELASTICSEARCH_URL not set")
 @unittest.skipUnless(os.environ.get('ELASTICSEARCH_VERSION', '1') == '1', "ELASTICSEARCH_VERSION not set to 1")
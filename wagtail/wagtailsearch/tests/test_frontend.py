@@ -1,5 +1,7 @@
 from __future__ import absolute_import, unicode_literals
 
+import json
+
 from django.core import paginator
 from django.core.urlresolvers import reverse
 from django.test import TestCase
@@ -119,7 +121,9 @@ class TestSearchView(TestCase):
         self.assertEqual(search_results.number, 10)
 
 
-class TestSuggestionsView(TestCase):
+class TestSuggestView(TestCase):
+    fixtures = ['test.json']
+
     def get(self, params={}):
         return self.client.get('/search/suggest/', params)
 
@@ -131,3 +135,36 @@ class TestSuggestionsView(TestCase):
     def test_search(self):
         response = self.get({'q': "Hello"})
         self.assertEqual(response.status_code, 200)
+
+    def test_returns_full_search_results(self):
+        response = self.get({'q': "Christmas"})
+
+        # The titles and URLs of the results of a full search, as before suggestions
+        # were added
+        christmas_event_page = Page.objects.get(url_path='/home/events/christmas/')
+        self.assertIn({'title': christmas_event_page.title, 'url': christmas_event_page.url},
+                      json.loads(response.content.decode('utf-8')))
+
+
+class TestSuggestionsView(TestCase):
+    fixtures = ['test.json']
+
+    def get(self, params={}):
+        return self.client.get(reverse('wagtailsearch_suggestions'), params)
+
+    def test_simple(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content.decode('utf-8')), [])
+
+    def test_suggest(self):
+        response = self.get({'q': "chris"})
+        self.assertEqual(response.status_code, 200)
+
+        christmas_event_page = Page.objects.get(url_path='/home/events/christmas/')
+        self.assertEqual(json.loads(response.content.decode('utf-8')), [
+            {'id': christmas_event_page.id, 'title': christmas_event_page.title},
+        ])
+
+        # Suggestions are not logged as searches
+        self.assertFalse(Query.objects.exists())
@@ -0,0 +1,212 @@
+from __future__ import absolute_import, unicode_literals
+
+import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils.six import StringIO
+
+from wagtail.tests.search import models
+from wagtail.tests.testapp.models import SimplePage
+from wagtail.wagtailcore.models import Page
+from wagtail.wagtailsearch import index
+from wagtail.wagtailsearch.index_queue import (
+    flush_pending_updates, get_index_update_mode, get_pending_updates)
+from wagtail.wagtailsearch.management.commands import process_index_queue
+from wagtail.wagtailsearch.models import IndexUpdate
+
+
+class TestGetIndexUpdateMode(TestCase):
+    def test_default(self):
+        self.assertEqual(get_index_update_mode(), 'immediate')
+
+    @override_settings(WAGTAILSEARCH_INDEX_UPDATES='sometime')
+    def test_invalid(self):
+        self.assertRaises(ImproperlyConfigured, get_index_update_mode)
+
+
+@mock.patch('wagtail.wagtailsearch.tests.DummySearchBackend', create=True)
+@override_settings(WAGTAILSEARCH_BACKENDS={
+    'default': {
+        'BACKEND': 'wagtail.wagtailsearch.tests.DummySearchBackend'
+    }
+})
+class TestReindexObjects(TestCase):
+    def test_adds_objects_in_bulk(self, backend):
+        obj1 = models.SearchTest.objects.create(title="Test 1")
+        obj2 = models.SearchTest.objects.create(title="Test 2")
+        backend().reset_mock()
+
+        index.reindex_objects(models.SearchTest, [obj1.pk, obj2.pk])
+
+        backend().add_bulk.assert_called_once_with(models.SearchTest, [obj1, obj2])
+        self.assertFalse(backend().add.called)
+        self.assertFalse(backend().delete_bulk.called)
+
+    def test_removes_deleted_objects(self, backend):
+        obj = models.SearchTest.objects.create(title="Test")
+        deleted_pk = obj.pk
+        obj.delete()
+        backend().reset_mock()
+
+        index.reindex_objects(models.SearchTest, [deleted_pk])
+
+        self.assertFalse(backend().add_bulk.called)
+        self.assertEqual([item.pk for item in backend().delete_bulk.call_args[0][1]], [deleted_pk])
+
+    def test_removes_objects_not_in_indexed_objects(self, backend):
+        obj = models.SearchTestChild.objects.create(title="Don't index me!")
+        backend().reset_mock()
+
+        index.reindex_objects(models.SearchTestChild, [obj.pk])
+
+        self.assertFalse(backend().add_bulk.called)
+        self.assertEqual([item.pk for item in backend().delete_bulk.call_args[0][1]], [obj.pk])
+
+    def test_catches_index_error(self, backend):
+        obj = models.SearchTest.objects.create(title="Test")
+        backend().reset_mock()
+
+        backend().add_bulk.side_effect = ValueError("Test")
+
+        with self.assertLogs('wagtail.search.index', level='ERROR') as cm:
+            index.reindex_objects(models.SearchTest, [obj.pk])
+
+        self.assertEqual(len(cm.output), 1)
+        self.assertIn("Exception raised while updating 1 SearchTest objects in the 'default' search backend", cm.output[0])
+
+
+@mock.patch('wagtail.wagtailsearch.tests.DummySearchBackend', create=True)
+@override_settings(WAGTAILSEARCH_BACKENDS={
+    'default': {
+        'BACKEND': 'wagtail.wagtailsearch.tests.DummySearchBackend'
+    }
+}, WAGTAILSEARCH_INDEX_UPDATES='on_commit')
+class TestOnCommitIndexUpdates(TestCase):
+    # Transactions are never committed within a TestCase, so on_commit callbacks don't
+    # run; these tests flush the pending updates themselves instead
+
+    def tearDown(self):
+        get_pending_updates().clear()
+
+    def test_updates_are_deferred(self, backend):
+        obj = models.SearchTest.objects.create(title="Test")
+
+        self.assertFalse(backend().add.called)
+        self.assertFalse(backend().add_bulk.called)
+        self.assertEqual(list(get_pending_updates()), [(models.SearchTest, obj.pk)])
+
+    def test_updates_are_deduplicated(self, backend):
+        obj = models.SearchTest.objects.create(title="Test")
+        obj.title = "Changed"
+        obj.save()
+        obj.save()
+        other_obj = models.SearchTest.objects.create(title="Other")
+        backend().reset_mock()
+
+        flush_pending_updates()
+
+        backend().add_bulk.assert_called_once_with(models.SearchTest, [obj, other_obj])
+        self.assertEqual(backend().add_bulk.call_args[0][1][0].title, "Changed")
+        self.assertEqual(get_pending_updates(), {})
+
+    def test_delete(self, backend):
+        obj = models.SearchTest.objects.create(title="Test")
+        pk = obj.pk
+        obj.delete()
+        backend().reset_mock()
+
+        flush_pending_updates()
+
+        self.assertFalse(backend().add_bulk.called)
+        self.assertEqual([item.pk for item in backend().delete_bulk.call_args[0][1]], [pk])
+
+    def test_converts_to_specific_page(self, backend):
+        root_page = Page.objects.get(id=1)
+        page = root_page.add_child(instance=SimplePage(title="test", slug="test", content="test"))
+        get_pending_updates().clear()
+
+        page.page_ptr.save()
+
+        self.assertEqual(list(get_pending_updates()), [(SimplePage, page.pk)])
+
+    @mock.patch('wagtail.wagtailsearch.index_queue.transaction.on_commit')
+    def test_flushed_on_commit(self, on_commit, backend):
+        obj = models.SearchTest.objects.create(title="Test")
+        backend().reset_mock()
+
+        on_commit.assert_called_with(flush_pending_updates, using='default')
+
+        on_commit.call_args[0][0]()
+        backend().add_bulk.assert_called_once_with(models.SearchTest, [obj])
+
+
+@mock.patch('wagtail.wagtailsearch.tests.DummySearchBackend', create=True)
+@override_settings(WAGTAILSEARCH_BACKENDS={
+    'default': {
+        'BACKEND': 'wagtail.wagtailsearch.tests.DummySearchBackend'
+    }
+}, WAGTAILSEARCH_INDEX_UPDATES='queue')
+class TestQueuedIndexUpdates(TestCase):
+    def tearDown(self):
+        get_pending_updates().clear()
+
+    def get_queued_object_ids(self):
+        return sorted(IndexUpdate.objects.values_list('object_id', flat=True))
+
+    def test_updates_are_queued(self, backend):
+        obj = models.SearchTest.objects.create(title="Test")
+        obj.save()
+        flush_pending_updates()
+
+        # Saving again in a later transaction doesn't queue the object twice
+        obj.save()
+        flush_pending_updates()
+
+        self.assertFalse(backend().add.called)
+        self.assertFalse(backend().add_bulk.called)
+        self.assertEqual(self.get_queued_object_ids(), [str(obj.pk)])
+
+    def test_process_index_queue(self, backend):
+        obj = models.SearchTest.objects.create(title="Test")
+        deleted_obj = models.SearchTest.objects.create(title="Deleted")
+        deleted_pk = deleted_obj.pk
+        deleted_obj.delete()
+        flush_pending_updates()
+        backend().reset_mock()
+
+        call_command('process_index_queue', stdout=StringIO())
+
+        backend().add_bulk.assert_called_once_with(models.SearchTest, [obj])
+        self.assertEqual([item.pk for item in backend().delete_bulk.call_args[0][1]], [deleted_pk])
+        self.assertFalse(IndexUpdate.objects.exists())
+
+    def test_process_index_queue_with_pages(self, backend):
+        # The primary keys of pages are links to Page, which must be converted from
+        # the queue's text column to integers to find the pages that exist
+        page = Page.objects.get(id=1).add_child(instance=SimplePage(title="Test", slug="test", content="hello"))
+        flush_pending_updates()
+        backend().reset_mock()
+
+        call_command('process_index_queue', stdout=StringIO())
+
+        backend().add_bulk.assert_called_once_with(SimplePage, [page])
+        self.assertFalse(backend().delete_bulk.called)
+
+    def test_objects_saved_while_processing_are_queued_again(self, backend):
+        obj = models.SearchTest.objects.create(title="Test")
+        flush_pending_updates()
+
+        def save_object_while_processing(model, pks):
+            obj.save()
+            flush_pending_updates()
+
+        with mock.patch(
+            'wagtail.wagtailsearch.management.commands.process_index_queue.reindex_objects',
+            side_effect=save_object_while_processing
+        ):
+            # Process a single batch, as the object would otherwise be saved each time
+            process_index_queue.Command().process_batch()
+
+        self.assertEqual(self.get_queued_object_ids(), [str(obj.pk)])
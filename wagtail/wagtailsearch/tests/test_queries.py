@@ -2,13 +2,16 @@ from __future__ import absolute_import, unicode_literals
 
 import datetime
 
+import mock
 from django.core import management
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils.six import StringIO
 
 from wagtail.contrib.wagtailsearchpromotions.models import SearchPromotion
 from wagtail.tests.utils import WagtailTestUtils
-from wagtail.wagtailsearch import models
+from wagtail.wagtailsearch import hits, models
 from wagtail.wagtailsearch.utils import normalise_query_string
 
 
@@ -110,6 +113,126 @@ class TestQueryPopularity(TestCase):
         self.assertEqual(popular_queries[2], models.Query.get("little popular query"))
 
 
+
+@override_settings(WAGTAILSEARCH_HITS_FLUSH_INTERVAL=60)
+class TestBufferedHits(TestCase):
+    def setUp(self):
+        hits.hit_buffer.flush()
+
+    def test_hits_are_buffered(self):
+        hits.add_hit("Hello")
+        hits.add_hit("hello!")
+
+        self.assertFalse(models.Query.objects.filter(query_string="hello").exists())
+
+        hits.flush_hits()
+
+        self.assertEqual(models.Query.get("Hello").hits, 2)
+
+    def test_flush_adds_to_existing_hits(self):
+        models.Query.get("Hello").add_hit()
+        models.Query.get("World").add_hit()
+
+        for i in range(3):
+            hits.add_hit("Hello")
+        for i in range(3):
+            hits.add_hit("World")
+        hits.add_hit("New query")
+
+        with CaptureQueriesContext(connection) as queries:
+            hits.flush_hits()
+
+        # Find queries, create queries, find their IDs, find daily hits,
+        # one update for each distinct increment and one insert
+        statements = [query['sql'] for query in queries if 'SAVEPOINT' not in query['sql']]
+        self.assertEqual(len(statements), 6)
+
+        self.assertEqual(models.Query.get("Hello").hits, 4)
+        self.assertEqual(models.Query.get("World").hits, 4)
+        self.assertEqual(models.Query.get("New query").hits, 1)
+        self.assertEqual(models.QueryDailyHits.objects.count(), 3)
+
+    def test_hits_on_different_days(self):
+        hits.add_hit("Hello", date=datetime.date(2017, 1, 1))
+        hits.add_hit("Hello", date=datetime.date(2017, 1, 2))
+        hits.add_hit("Hello", date=datetime.date(2017, 1, 2))
+        hits.flush_hits()
+
+        daily_hits = models.Query.get("Hello").daily_hits.order_by('date')
+        self.assertEqual([(day.date, day.hits) for day in daily_hits], [
+            (datetime.date(2017, 1, 1), 1),
+            (datetime.date(2017, 1, 2), 2),
+        ])
+
+    def test_flush_when_interval_has_passed(self):
+        hits.hit_buffer.last_flush -= 61
+        hits.add_hit("Hello")
+
+        self.assertEqual(models.Query.get("Hello").hits, 1)
+
+    def test_most_popular(self):
+        for i in range(3):
+            hits.add_hit("unpopular query")
+        for i in range(10):
+            hits.add_hit("popular query")
+        hits.flush_hits()
+
+        popular_queries = models.Query.get_most_popular()
+        self.assertEqual(list(popular_queries), [
+            models.Query.get("popular query"),
+            models.Query.get("unpopular query"),
+        ])
+
+    def test_failed_flush_keeps_hits(self):
+        hits.add_hit("Hello")
+
+        with mock.patch('wagtail.wagtailsearch.hits.save_hits', side_effect=Exception("Database is down")):
+            with mock.patch('wagtail.wagtailsearch.hits.logger') as logger:
+                hits.flush_hits()
+
+        self.assertTrue(logger.exception.called)
+        self.assertFalse(models.Query.objects.filter(query_string="hello").exists())
+
+        hits.add_hit("Hello")
+        hits.flush_hits()
+
+        self.assertEqual(models.Query.get("Hello").hits, 2)
+
+    def test_failed_flush_is_retried_after_interval(self):
+        hits.add_hit("Hello")
+
+        with mock.patch('wagtail.wagtailsearch.hits.save_hits', side_effect=Exception("Database is down")):
+            with mock.patch('wagtail.wagtailsearch.hits.logger'):
+                hits.flush_hits()
+
+        # A full buffer doesn't cause another attempt on every hit
+        with mock.patch('wagtail.wagtailsearch.hits.MAX_BUFFERED_HITS', 1):
+            with mock.patch('wagtail.wagtailsearch.hits.save_hits') as save_hits:
+                hits.add_hit("World")
+        self.assertFalse(save_hits.called)
+
+        hits.hit_buffer.last_flush -= 61
+        hits.add_hit("World")
+
+        self.assertEqual(models.Query.get("Hello").hits, 1)
+        self.assertEqual(models.Query.get("World").hits, 2)
+
+    def test_flush_at_exit_closes_old_connections(self):
+        hits.add_hit("Hello")
+
+        with mock.patch('wagtail.wagtailsearch.hits.close_old_connections') as close_old_connections:
+            hits._flush_hits_at_exit()
+
+        self.assertTrue(close_old_connections.called)
+        self.assertEqual(models.Query.get("Hello").hits, 1)
+
+    @override_settings(WAGTAILSEARCH_HITS_FLUSH_INTERVAL=None)
+    def test_unbuffered(self):
+        hits.add_hit("Hello")
+
+        self.assertEqual(models.Query.get("Hello").hits, 1)
+
+
 class TestGarbageCollectCommand(TestCase):
     def test_garbage_collect_command(self):
         nowdt = datetime.datetime.now()
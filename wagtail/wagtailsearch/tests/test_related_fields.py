@@ -50,8 +50,9 @@ class TestSelectOnQuerySet(TestCase):
 
         queryset = fields.select_on_queryset(ManyToManyBlogPage.objects.all())
 
-        # reverse ForeignKey should be prefetch_related
+        # reverse ForeignKey should be prefetch_related, along with the relations nested in it
         self.assertIn('categories', queryset._prefetch_related_lookups)
+        self.assertIn('categories__category', queryset._prefetch_related_lookups)
         self.assertFalse(queryset.query.select_related)
 
     def test_select_on_queryset_with_reverse_one_to_one(self):
@@ -86,3 +87,46 @@ class TestSelectOnQuerySet(TestCase):
         # Tags should be prefetch_related
         self.assertIn('tags', queryset._prefetch_related_lookups)
         self.assertFalse(queryset.query.select_related)
+
+    def test_select_on_queryset_with_nested_foreign_key(self):
+        fields = index.RelatedFields('page', [
+            index.RelatedFields('owner', [
+                index.SearchField('username'),
+            ]),
+        ])
+
+        queryset = fields.select_on_queryset(SearchTestChild.objects.all())
+
+        # Relations to single objects nested in each other should all be select_related
+        self.assertFalse(queryset._prefetch_related_lookups)
+        self.assertEqual(queryset.query.select_related, {'page': {'owner': {}}})
+
+
+class TestGetValue(TestCase):
+    def test_get_value_with_reverse_one_to_one(self):
+        fields = index.RelatedFields('searchtestchild', [
+            index.SearchField('subtitle'),
+        ])
+        obj = SearchTest.objects.create(title="Parent")
+        child = SearchTestChild.objects.create(title="Child", subtitle="Subtitle")
+
+        self.assertIsNone(fields.get_value(obj))
+        self.assertEqual(fields.get_value(SearchTest.objects.get(pk=child.pk)), child)
+
+    def test_get_value_with_reverse_foreign_key(self):
+        fields = index.RelatedFields('categories', [
+            index.RelatedFields('category', [
+                index.SearchField('name')
+            ])
+        ])
+        page = ManyToManyBlogPage(title="Test")
+
+        self.assertEqual(fields.get_value(page).model, ManyToManyBlogPage.categories.rel.related_model)
+
+    def test_get_value_getter(self):
+        title = index.SearchField('title').get_value_getter(SearchTest)
+        callable_field = index.SearchField('callable_indexed_field').get_value_getter(SearchTest)
+        obj = SearchTest(title="Hello")
+
+        self.assertEqual(title(obj), "Hello")
+        self.assertEqual(callable_field(obj), obj.callable_indexed_field())
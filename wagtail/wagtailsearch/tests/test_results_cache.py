@@ -0,0 +1,121 @@
+from __future__ import absolute_import, unicode_literals
+
+import mock
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from wagtail.tests.search import models
+from wagtail.wagtailsearch.backends import get_search_backend
+from wagtail.wagtailsearch.backends.db import DatabaseSearchResults
+from wagtail.wagtailsearch.results_cache import invalidate_results_cache
+
+
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'wagtailsearch-results-cache-tests-default',
+        },
+        'search': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'wagtailsearch-results-cache-tests',
+        },
+    },
+    WAGTAILSEARCH_RESULTS_CACHE='search',
+)
+class TestResultsCache(TestCase):
+    def setUp(self):
+        caches['search'].clear()
+        self.backend = get_search_backend('default')
+
+        self.hello = models.SearchTest.objects.create(title="Hello", live=True)
+        self.hello_world = models.SearchTest.objects.create(title="Hello World")
+        self.world = models.SearchTest.objects.create(title="World", live=True)
+
+    def search(self, *args, **kwargs):
+        return list(self.backend.search(*args, **kwargs))
+
+    def count_searches(self):
+        return mock.patch.object(
+            DatabaseSearchResults, '_do_search', autospec=True, side_effect=DatabaseSearchResults._do_search
+        )
+
+    def test_results_are_cached(self):
+        results = self.search("Hello", models.SearchTest)
+
+        with self.count_searches() as do_search:
+            self.assertEqual(self.search("Hello", models.SearchTest), results)
+
+        self.assertEqual(do_search.call_count, 0)
+
+    def test_normalised_query_string(self):
+        self.search("Hello", models.SearchTest)
+
+        with self.count_searches() as do_search:
+            self.search("  hello ", models.SearchTest)
+
+        self.assertEqual(do_search.call_count, 0)
+
+    def test_filters_and_slices_are_cached_separately(self):
+        self.assertEqual(set(self.search("Hello", models.SearchTest)), {self.hello, self.hello_world})
+        self.assertEqual(self.search("Hello", models.SearchTest.objects.filter(live=True)), [self.hello])
+        self.assertEqual(len(self.search("Hello", models.SearchTest)[1:]), 1)
+        self.assertEqual(self.search("Hello", models.SearchTest, operator='and'), self.search("Hello", models.SearchTest))
+        self.assertEqual(len(list(self.backend.search("Hello", models.SearchTest)[1:])), 1)
+
+    def test_count_is_cached(self):
+        self.assertEqual(self.backend.search("Hello", models.SearchTest).count(), 2)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.backend.search("Hello", models.SearchTest).count(), 2)
+
+    def test_annotate_score(self):
+        self.backend.search("Hello", models.SearchTest).annotate_score('_score').results()
+
+        results = self.backend.search("Hello", models.SearchTest).annotate_score('_score')
+        with self.assertNumQueries(1):
+            for result in results:
+                self.assertTrue(hasattr(result, '_score'))
+
+    def test_invalidated_when_index_changes(self):
+        self.search("Hello", models.SearchTest)
+
+        # Saving an object updates the index
+        hello_again = models.SearchTest.objects.create(title="Hello again")
+
+        self.assertIn(hello_again, self.search("Hello", models.SearchTest))
+
+    def search_before_change(self):
+        # Searches as if the index hadn't been changed yet, caching the old results
+        with mock.patch.object(DatabaseSearchResults, '_do_search', return_value=[self.hello, self.hello_world]):
+            self.search("Hello", models.SearchTest)
+
+    def test_search_while_index_is_updated_is_not_cached(self):
+        backend_class = type(self.backend)
+        with mock.patch.object(backend_class, 'add', autospec=True, side_effect=lambda *args: self.search_before_change()):
+            hello_again = models.SearchTest.objects.create(title="Hello again")
+
+        self.assertIn(hello_again, self.search("Hello", models.SearchTest))
+
+    def test_search_before_commit_is_not_cached(self):
+        with mock.patch('django.db.transaction.on_commit') as on_commit:
+            hello_again = models.SearchTest.objects.create(title="Hello again")
+
+        self.search_before_change()
+
+        # Commit
+        for call in on_commit.call_args_list:
+            call[0][0]()
+
+        self.assertIn(hello_again, self.search("Hello", models.SearchTest))
+
+    def test_invalidate_results_cache(self):
+        self.search("Hello", models.SearchTest)
+        invalidate_results_cache(models.SearchTestChild)
+
+        # The cache is shared by all models in the hierarchy, so this search is repeated
+        with self.count_searches() as do_search:
+            self.search("Hello", models.SearchTest)
+
+        self.assertEqual(do_search.call_count, 1)
@@ -0,0 +1,170 @@
+from __future__ import absolute_import, unicode_literals
+
+import json
+import os
+import shutil
+import tempfile
+
+import mock
+
+from django.core import management
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.utils.six import StringIO
+
+from wagtail.tests.search import models
+from wagtail.wagtailsearch.management.commands.update_index import Command
+
+
+class FakeAsyncResult(object):
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class FakePool(object):
+    def __init__(self, processes):
+        self.processes = processes
+
+    def apply_async(self, func, args):
+        return FakeAsyncResult(func(*args))
+
+    def terminate(self):
+        pass
+
+    def join(self):
+        pass
+
+
+class TestQuerysetChunks(TestCase):
+    def setUp(self):
+        self.objects = [models.SearchTest.objects.create(title="Test %d" % i) for i in range(5)]
+        self.pks = [obj.pk for obj in self.objects]
+
+    def test_queryset_chunks(self):
+        chunks = list(Command().queryset_chunks(models.SearchTest.objects.order_by('-title'), chunk_size=2))
+
+        self.assertEqual([[obj.pk for obj in chunk] for chunk in chunks], [self.pks[0:2], self.pks[2:4], self.pks[4:]])
+
+    def test_queryset_chunks_start_after(self):
+        chunks = list(Command().queryset_chunks(models.SearchTest.objects.all(), chunk_size=2, start_after=self.pks[2]))
+
+        self.assertEqual([[obj.pk for obj in chunk] for chunk in chunks], [self.pks[3:]])
+
+    def test_pk_chunks(self):
+        # get_indexed_objects prefetches tags, which must not be applied to primary keys
+        chunks = list(Command().pk_chunks(models.SearchTest.get_indexed_objects(), chunk_size=3))
+
+        self.assertEqual(chunks, [self.pks[0:3], self.pks[3:]])
+
+
+@mock.patch('wagtail.wagtailsearch.backends.elasticsearch.bulk', return_value=(0, []))
+@mock.patch('wagtail.wagtailsearch.backends.elasticsearch.Elasticsearch')
+@override_settings(WAGTAILSEARCH_BACKENDS={
+    'elasticsearch': {
+        'BACKEND': 'wagtail.wagtailsearch.backends.elasticsearch',
+        'AUTO_UPDATE': False,
+    }
+})
+class TestUpdateIndexCommand(TestCase):
+    def setUp(self):
+        self.objects = [models.SearchTest.objects.create(title="Test %d" % i) for i in range(5)]
+        self.temp_dir = tempfile.mkdtemp()
+        self.checkpoint_path = os.path.join(self.temp_dir, 'checkpoint.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def run_command(self, **options):
+        output = StringIO()
+        management.call_command('update_index', backend_name='elasticsearch', stdout=output, **options)
+        return output.getvalue()
+
+    def get_indexed_ids(self, bulk, doc_type='searchtests_searchtest'):
+        return [
+            action['_id']
+            for args, kwargs in bulk.call_args_list
+            for action in args[1]
+            if action['_type'] == doc_type
+        ]
+
+    def expected_ids(self):
+        return ['searchtests_searchtest:%d' % obj.pk for obj in self.objects]
+
+    def test_indexes_objects(self, elasticsearch, bulk):
+        output = self.run_command(chunk_size=2)
+
+        self.assertEqual(self.get_indexed_ids(bulk), self.expected_ids())
+        self.assertIn("searchtests.SearchTest: indexed 5 objects in", output)
+
+    @mock.patch('wagtail.wagtailsearch.management.commands.update_index.connections')
+    @mock.patch('wagtail.wagtailsearch.management.commands.update_index.Pool', FakePool)
+    def test_workers(self, connections, elasticsearch, bulk):
+        output = self.run_command(chunk_size=2, workers=4)
+
+        self.assertTrue(connections.close_all.called)
+        self.assertEqual(self.get_indexed_ids(bulk), self.expected_ids())
+        self.assertIn("searchtests.SearchTest: indexed 5 objects in", output)
+
+    def test_field_timings(self, elasticsearch, bulk):
+        output = self.run_command(chunk_size=2, field_timings=True)
+
+        self.assertIn("searchtests.SearchTest: time spent getting search fields:", output)
+        self.assertIn("    callable_indexed_field", output)
+        self.assertIn("    tags ", output)
+
+    @mock.patch('wagtail.wagtailsearch.management.commands.update_index.connections')
+    @mock.patch('wagtail.wagtailsearch.management.commands.update_index.Pool', FakePool)
+    def test_field_timings_with_workers(self, connections, elasticsearch, bulk):
+        output = self.run_command(chunk_size=2, workers=4, field_timings=True)
+
+        self.assertEqual(self.get_indexed_ids(bulk), self.expected_ids())
+        self.assertIn("searchtests.SearchTest: time spent getting search fields:", output)
+        self.assertIn("    callable_indexed_field", output)
+
+    @override_settings(WAGTAILSEARCH_BACKENDS={
+        'elasticsearch': {
+            'BACKEND': 'wagtail.wagtailsearch.tests.DummySearchBackend',
+        }
+    })
+    @mock.patch('wagtail.wagtailsearch.tests.DummySearchBackend', create=True)
+    def test_workers_unsupported_backend(self, backend, elasticsearch, bulk):
+        backend().index_class = object
+
+        with self.assertRaises(CommandError):
+            self.run_command(workers=4)
+
+    def test_resume(self, elasticsearch, bulk):
+        # Fail while sending the second chunk of SearchTest objects
+        def fail_on_second_chunk(es, actions, **kwargs):
+            if actions[0]['_type'] == 'searchtests_searchtest' and len(self.get_indexed_ids(bulk)) > 2:
+                raise ValueError("Interrupted")
+            return len(actions), []
+
+        bulk.side_effect = fail_on_second_chunk
+
+        with self.assertRaises(ValueError):
+            self.run_command(chunk_size=2, checkpoint=self.checkpoint_path)
+
+        with open(self.checkpoint_path) as f:
+            checkpoint = json.load(f)
+        model_state = checkpoint['elasticsearch']['wagtail']['models']['searchtests.SearchTest']
+        self.assertEqual(model_state['last_pk'], str(self.objects[1].pk))
+        self.assertFalse(model_state['done'])
+
+        bulk.reset_mock()
+        bulk.side_effect = None
+        elasticsearch().indices.reset_mock()
+
+        output = self.run_command(chunk_size=2, checkpoint=self.checkpoint_path)
+
+        # The index wasn't reset, and only the remaining objects were indexed
+        self.assertIn("Resuming rebuild of index wagtail", output)
+        self.assertFalse(elasticsearch().indices.delete.called)
+        self.assertEqual(self.get_indexed_ids(bulk), self.expected_ids()[2:])
+        self.assertIn("searchtests.SearchTest: indexed 3 objects in", output)
+
+        # The checkpoint is removed once the rebuild has finished
+        self.assertFalse(os.path.exists(self.checkpoint_path))
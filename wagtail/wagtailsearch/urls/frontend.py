@@ -2,9 +2,10 @@ from __future__ import absolute_import, unicode_literals
 
 from django.conf.urls import url
 
-from wagtail.wagtailsearch.views import search
+from wagtail.wagtailsearch.views import search, suggest
 
 urlpatterns = [
     url(r'^$', search, name='wagtailsearch_search'),
     url(r'^suggest/$', search, {'use_json': True}, name='wagtailsearch_suggest'),
+    url(r'^suggestions/$', suggest, name='wagtailsearch_suggestions'),
 ]
@@ -1 +1 @@
-from wagtail.wagtailsearch.views.frontend import search  # noqa
+from wagtail.wagtailsearch.views.frontend import search, suggest  # noqa
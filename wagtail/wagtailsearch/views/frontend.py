@@ -4,8 +4,10 @@ from django.conf import settings
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
 from django.http import JsonResponse
 from django.shortcuts import render
+from django.utils.functional import SimpleLazyObject
 
 from wagtail.wagtailcore import models
+from wagtail.wagtailsearch import hits
 from wagtail.wagtailsearch.models import Query
 
 
@@ -53,11 +55,11 @@ def search(
         else:
             search_results = pages.search(query_string)
 
-        # Get query object
-        query = Query.get(query_string)
-
         # Add hit
-        query.add_hit()
+        hits.add_hit(query_string)
+
+        # Get query object. This is only looked up if the template uses it
+        query = SimpleLazyObject(lambda: Query.get(query_string))
 
         # Pagination
         paginator = Paginator(search_results, results_per_page)
@@ -98,3 +100,19 @@ def search(
             is_ajax=request.is_ajax(),
             query=query
         ))
+
+
+def suggest(request, limit=10, show_unpublished=False, path=None):
+    """
+    Returns the ids and titles of the pages that could complete the query string in the
+    'q' GET parameter as JSON, for use by type-ahead search boxes. Unlike full searches,
+    suggestions are not recorded as search query hits.
+    """
+    query_string = request.GET.get('q', '')
+
+    pages = models.Page.objects.filter(path__startswith=(path or request.site.root_page.path))
+
+    if not show_unpublished:
+        pages = pages.live()
+
+    return JsonResponse(pages.suggest(query_string, limit=limit), safe=False)
@@ -1,8 +1,10 @@
 from __future__ import absolute_import, unicode_literals
 
 from django.core.urlresolvers import reverse
+from django.db.models.signals import post_delete, post_save
 
 from wagtail.wagtailadmin.utils import get_object_usage
+from wagtail.wagtailcore.render_cache import invalidate_render_cache
 
 SNIPPET_MODELS = []
 
@@ -17,9 +19,17 @@ def register_snippet(model):
         model.usage_url = get_snippet_usage_url
         SNIPPET_MODELS.append(model)
         SNIPPET_MODELS.sort(key=lambda x: x._meta.verbose_name)
+
+        # Cached StreamField renderings may include the snippet
+        post_save.connect(snippet_changed_invalidate_render_cache, sender=model)
+        post_delete.connect(snippet_changed_invalidate_render_cache, sender=model)
     return model
 
 
+def snippet_changed_invalidate_render_cache(sender, instance, **kwargs):
+    invalidate_render_cache()
+
+
 def get_snippet_usage_url(self):
     return reverse('wagtailsnippets:usage', args=(
         self._meta.app_label, self._meta.model_name, self.id))